@@ -0,0 +1,1467 @@
+# coding=utf8
+""" Async Storage Module
+
+Asyncio versions of the Storage connection handling and Document methods so
+that many independent queries can run concurrently from a single event loop.
+Requires Python 3.5 or higher
+"""
+
+# Import future
+from __future__ import print_function, absolute_import
+
+__author__		= "Chris Nasr"
+__copyright__	= "OuroborosCoding"
+__maintainer__	= "Chris Nasr"
+__email__		= "ouroboroscode@gmail.com"
+__created__		= "2026-10-16"
+
+# Import python modules
+import asyncio
+from collections import deque
+from itertools import islice
+import os
+from time import time
+
+# Include pip modules
+import rethinkdb as r
+
+# Include local modules
+from . import Storage
+from .Storage import StorageException
+
+# Init module variables
+__mdPools = {}
+__mtConnection = None
+
+# connection type function
+def _connectionType():
+	"""Connection Type
+
+	Returns the driver's asyncio connection class. The driver only exposes it
+	through set_loop_type(), which changes the type used by r.connect() for the
+	entire process, so the default is put back right after so that Storage
+	keeps working as is
+
+	Returns:
+		class
+	"""
+
+	# Pull in the global var
+	global __mtConnection
+
+	# If we don't have the class yet
+	if __mtConnection is None:
+		tDefault = r.net.connection_type
+		r.set_loop_type('asyncio')
+		__mtConnection = r.net.connection_type
+		r.net.connection_type = tDefault
+
+	# Return the class
+	return __mtConnection
+
+# connection function
+async def _connection(server):
+	"""Connection
+
+	Opens a new asyncio connection to the given server
+
+	Args:
+		server (str): A name representing details stored using Storage.server()
+
+	Returns:
+		rethinkdb.net_asyncio.Connection
+
+	Raises:
+		StorageException
+	"""
+
+	# Get the details
+	dDetails = dict(Storage._server(server)[0])
+
+	# The memory engine only works with Storage
+	if dDetails.get('engine') == 'memory':
+		raise StorageException('The memory engine is not supported by AsyncStorage')
+
+	# Fill in the same defaults r.connect() uses
+	iTimeout = dDetails.pop('timeout', 20)
+	lArgs = [
+		dDetails.pop('host', 'localhost'),
+		dDetails.pop('port', r.net.DEFAULT_PORT),
+		dDetails.pop('db', None),
+		dDetails.pop('auth_key', None),
+		dDetails.pop('user', 'admin'),
+		dDetails.pop('password', None),
+		iTimeout,
+		dDetails.pop('ssl', dict()),
+		dDetails.pop('_handshake_version', 10)
+	]
+
+	# Try to make a new connection, retrying as Storage does
+	for i in range(3):
+		try:
+			oCon = _connectionType()(*lArgs, **dDetails)
+			return await oCon.reconnect(timeout=iTimeout)
+		except r.errors.RqlDriverError as e:
+			if i == 2:
+				raise StorageException(*e.args)
+			await asyncio.sleep(1)
+
+# pool function
+def _pool(server):
+	"""Pool
+
+	Fetches the async connection pool for the given server and the running
+	event loop, creating it if it doesn't exist yet
+
+	Args:
+		server (str): A name representing details stored using Storage.server()
+
+	Returns:
+		_AsyncPool
+
+	Raises:
+		ValueError
+	"""
+
+	# Asyncio pools can only be used by the loop that created them
+	oLoop = asyncio.get_event_loop()
+	tKey = (server, id(oLoop), os.getpid())
+
+	# If the pool doesn't exist, or belongs to a closed loop that happened to
+	#	live at the same address, drop any dead pools and create it
+	if tKey not in __mdPools or __mdPools[tKey].loop is not oLoop:
+		_poolPrune()
+		__mdPools[tKey] = _AsyncPool(server, Storage._server(server)[1], oLoop)
+
+	# Return the pool
+	return __mdPools[tKey]
+
+# pool clear function
+def _poolClear(server):
+	"""Pool Clear
+
+	Removes the server's pools on every loop so that new connections pick up
+	any changes to its details, called by Storage._poolClear() whenever
+	Storage.server() updates a server. Idle connections are closed on their
+	own loop, borrowed ones when they're returned
+
+	Args:
+		server (str): A name representing details stored using Storage.server()
+
+	Returns:
+		None
+	"""
+
+	# Go through each pool belonging to the server
+	for tKey in [t for t in __mdPools if t[0] == server]:
+
+		# Remove it, and close it if it was made by this process
+		oPool = __mdPools.pop(tKey)
+		if tKey[2] == os.getpid():
+			oPool.close()
+
+	# Drop any other dead pools while we're at it
+	_poolPrune()
+
+# pool prune function
+def _poolPrune():
+	"""Pool Prune
+
+	Drops the pools whose loop has been closed, or that were inherited from
+	the parent of a fork. Their connections can't be closed without their
+	loop, so they're left for the garbage collector
+
+	Returns:
+		None
+	"""
+	iPid = os.getpid()
+	for tKey in list(__mdPools):
+		if tKey[2] != iPid or __mdPools[tKey].loop.is_closed():
+			del __mdPools[tKey]
+
+# Have Storage clear our pools along with its own
+Storage._poolClearAdd(_poolClear)
+
+# _AsyncPool class
+class _AsyncPool(object):
+	"""Async Pool
+
+	The asyncio version of Storage._Pool, using the same settings
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, server, conf, loop):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			server (str): A name representing details stored using
+				Storage.server()
+			conf (dict): The pool settings, see Storage._POOL_DEFAULTS
+			loop (asyncio.AbstractEventLoop): The loop the pool belongs to
+
+		Returns:
+			_AsyncPool
+		"""
+		self.server = server
+		self.conf = conf
+		self.loop = loop
+		self.cond = asyncio.Condition()
+		self.idle = deque()
+		self.created = {}
+		self.count = 0
+		self.closed = False
+
+	# close method
+	def close(self):
+		"""Close
+
+		Marks the pool as closed so borrowed connections are thrown away when
+		they're returned, and closes the idle ones on the pool's loop. Can be
+		called from any thread
+
+		Returns:
+			None
+		"""
+		self.closed = True
+
+		# If the loop is gone there's nothing we can close
+		try:
+			self.loop.call_soon_threadsafe(self._closeIdle)
+		except RuntimeError:
+			pass
+
+	# close idle method
+	def _closeIdle(self):
+		"""Close Idle
+
+		Forgets all the idle connections and closes them, must be called from
+		the pool's loop. Nothing is awaited before the idle list is emptied so
+		the lock isn't needed
+
+		Returns:
+			None
+		"""
+		lDead = []
+		while self.idle:
+			oCon = self.idle.popleft()[0]
+			self.created.pop(id(oCon), None)
+			self.count -= 1
+			lDead.append(oCon)
+		if lDead:
+			self.loop.create_task(self._close(lDead))
+
+	# close static method
+	@staticmethod
+	async def _close(cons):
+		"""Close
+
+		Closes connections the pool has forgotten, must be called without the
+		lock held so a slow close doesn't hold up the pool
+
+		Args:
+			cons (rethinkdb.net_asyncio.Connection[]): The connections to close
+
+		Returns:
+			None
+		"""
+		for oCon in cons:
+			try:
+				await oCon.close(noreply_wait=False)
+			except Exception:
+				pass
+
+	# forget method
+	def _forget(self, con, dead):
+		"""Forget
+
+		Removes a connection from the pool's accounting and adds it to the
+		connections to close once the lock is released, must be called with
+		the lock held
+
+		Args:
+			con (rethinkdb.net_asyncio.Connection): The connection to forget
+			dead (list): The connections to close with _close()
+
+		Returns:
+			None
+		"""
+		self.created.pop(id(con), None)
+		self.count -= 1
+		self.cond.notify()
+		dead.append(con)
+
+	# get method
+	async def get(self):
+		"""Get
+
+		Borrows a connection from the pool, opening a new one if there are no
+		idle connections and the pool isn't full, else waiting for one to be
+		returned
+
+		Returns:
+			rethinkdb.net_asyncio.Connection
+
+		Raises:
+			StorageException
+		"""
+
+		# Calculate the point at which we give up waiting
+		fDeadline = time() + self.conf['timeout']
+
+		# Loop until we have a usable connection
+		while True:
+
+			# Init the connections to close once we let go of the lock
+			lDead = []
+
+			try:
+
+				async with self.cond:
+
+					# Loop until we find a connection, or have room for a new one
+					while True:
+
+						# Get the current time
+						fNow = time()
+
+						# Retire the oldest idle connections if they've expired
+						while self.idle and fNow - self.idle[0][1] > self.conf['idle']:
+							self._forget(self.idle.popleft()[0], lDead)
+
+						# If there's an idle connection
+						if self.idle:
+
+							# Take the most recently used one
+							oCon, fLast = self.idle.pop()
+
+							# If it's closed or too old, throw it away and keep
+							#	looking
+							if not oCon.is_open() or \
+								fNow - self.created[id(oCon)] > self.conf['lifetime']:
+								self._forget(oCon, lDead)
+								continue
+
+							# Note if it's been sitting long enough to be checked
+							bCheck = fNow - fLast > self.conf['ping']
+							break
+
+						# Else, if there's room for a new connection
+						if self.count < self.conf['size']:
+							self.count += 1
+							oCon = None
+							break
+
+						# Else, wait for one to be returned
+						try:
+							await asyncio.wait_for(self.cond.wait(), fDeadline - fNow)
+						except asyncio.TimeoutError:
+							raise StorageException('Timed out waiting for a connection to "%s"' % self.server)
+
+			# Close any connections we threw away
+			finally:
+				await self._close(lDead)
+
+			# If we need a new connection
+			if oCon is None:
+
+				# Try to open it, freeing the slot if we can't
+				try:
+					oCon = await _connection(self.server)
+				except Exception:
+					async with self.cond:
+						self.count -= 1
+						self.cond.notify()
+					raise
+
+				# Note when it was created and return it
+				self.created[id(oCon)] = time()
+				return oCon
+
+			# If the connection needs to be checked
+			if bCheck:
+
+				# Ask the server for its info, if it fails throw away the
+				#	connection and try again
+				try:
+					await oCon.server()
+				except r.errors.RqlDriverError:
+					await self.put(oCon, True)
+					continue
+
+				# If anything else goes wrong, throw away the connection so
+				#	its slot is freed, and re-raise
+				except Exception:
+					await self.put(oCon, True)
+					raise
+
+			# Return the connection
+			return oCon
+
+	# put method
+	async def put(self, con, discard=False):
+		"""Put
+
+		Returns a borrowed connection to the pool
+
+		Args:
+			con (rethinkdb.net_asyncio.Connection): The connection to return
+			discard (bool): If true the connection is closed instead of being
+				made available again
+
+		Returns:
+			None
+		"""
+		# Init the connections to close once we let go of the lock
+		lDead = []
+
+		async with self.cond:
+
+			# If the connection can be reused, add it to the idle list
+			if not discard and not self.closed and con.is_open():
+				self.idle.append((con, time()))
+				self.cond.notify()
+
+			# Else, forget about it
+			else:
+				self._forget(con, lDead)
+
+		# Close it if we threw it away
+		await self._close(lDead)
+
+# connect_with class
+class connect_with(object):
+	"""Connect With
+
+	Used in conjunction with the python keywords "async with" in order to
+	borrow a connection from the server's pool and make sure it's returned
+	when the client is done with it
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, server):
+		self.pool = _pool(server)
+		self.con = None
+
+	# __aenter__ magic method
+	async def __aenter__(self):
+		self.con = await self.pool.get()
+		return Storage._instrumented(self.con, _InstrumentedConnection)
+
+	# __aexit__ magic method
+	async def __aexit__(self, exc_type, exc_value, traceback):
+
+		# Return the connection, throwing it away if the exception means it
+		#	can't be trusted, or a query was cancelled part way through
+		bDiscard = Storage._broken(exc_type) or (exc_type is not None and \
+			issubclass(exc_type, (asyncio.CancelledError, asyncio.TimeoutError)))
+		await self.pool.put(self.con, bDiscard)
+		if exc_type is not None:
+			return False
+
+# _InstrumentedConnection class
+class _InstrumentedConnection(Storage._InstrumentedConnection):
+	"""Instrumented Connection
+
+	The asyncio version of Storage._InstrumentedConnection, see
+	Storage.instrument()
+
+	Extends: Storage._InstrumentedConnection
+	"""
+
+	# start method
+	def _start(self, term, **optargs):
+		"""Start
+
+		Called by RqlQuery.run() to run the query on the connection
+
+		Args:
+			term (rethinkdb.ast.RqlQuery): The query
+			optargs (dict): The global options passed to run()
+
+		Returns:
+			awaitable
+		"""
+
+		# If we don't have to wait for the result, there's nothing to record
+		if optargs.get('noreply'):
+			return self.con._start(term, **optargs)
+
+		# Return the coroutine that runs and records it
+		return self._run(term, optargs)
+
+	# run method
+	async def _run(self, term, optargs):
+		"""Run
+
+		Runs the query and records it
+
+		Args:
+			term (rethinkdb.ast.RqlQuery): The query
+			optargs (dict): The global options passed to run()
+
+		Returns:
+			mixed
+		"""
+
+		# Init the record
+		dRecord, bProfile = Storage._instrumentBegin(term, optargs, self.conf)
+
+		# Run the query
+		fStart = time()
+		try:
+			mRes = await self.con._start(term, **optargs)
+
+		# If it fails, record the error and re-raise it
+		except Exception as e:
+			dRecord['duration'] = time() - fStart
+			dRecord['error'] = str(e)
+			Storage._instrumentRecord(dRecord, term)
+			raise
+
+		# Note how long it took, then record it and return the result
+		dRecord['duration'] = time() - fStart
+		return Storage._instrumentEnd(dRecord, term, mRes, bProfile, _InstrumentedCursor)
+
+# _InstrumentedCursor class
+class _InstrumentedCursor(Storage._InstrumentedCursor):
+	"""Instrumented Cursor
+
+	The asyncio version of Storage._InstrumentedCursor
+
+	Extends: Storage._InstrumentedCursor
+	"""
+
+	# __aiter__ magic method
+	def __aiter__(self):
+		return self
+
+	# __anext__ magic method
+	async def __anext__(self):
+		try:
+			return await self.next()
+		except r.errors.ReqlCursorEmpty:
+			raise StopAsyncIteration
+
+	# fetch next method
+	async def fetch_next(self, wait=True):
+		"""Fetch Next
+
+		Waits for a row to be available, recording the query once there are
+		no more
+
+		Args:
+			wait (bool|float): How long to wait, see the driver
+
+		Returns:
+			bool
+		"""
+
+		# Wait for the next row, noting how long it took
+		fStart = time()
+		try:
+			bMore = await self.cursor.fetch_next(wait)
+
+		# If it fails, record the error
+		except Exception as e:
+			self.record['duration'] += time() - fStart
+			self.record['error'] = str(e)
+			self._done()
+			raise
+
+		# If there's no more rows, the query is done
+		self.record['duration'] += time() - fStart
+		if not bMore:
+			self._done()
+		return bMore
+
+	# next method
+	async def next(self, wait=True):
+		"""Next
+
+		Returns the next row, adding it to the query's record
+
+		Args:
+			wait (bool|float): How long to wait, see the driver
+
+		Returns:
+			mixed
+		"""
+
+		# Get the next row, noting how long we waited for it
+		fStart = time()
+		try:
+			dRow = await self.cursor.next(wait)
+
+		# If there's no more rows, the query is done
+		except r.errors.ReqlCursorEmpty:
+			self.record['duration'] += time() - fStart
+			self._done()
+			raise
+
+		# If it fails, record the error
+		except Exception as e:
+			self.record['duration'] += time() - fStart
+			self.record['error'] = str(e)
+			self._done()
+			raise
+
+		# Add the row and return it
+		self.record['duration'] += time() - fStart
+		self.record['rows'] += 1
+		Storage._instrumentBytes(self.record, dRow)
+		return dRow
+
+	# close method
+	async def close(self):
+		"""Close
+
+		Closes the cursor and records the query
+
+		Returns:
+			None
+		"""
+		await self.cursor.close()
+		self._done()
+
+# run function
+async def _run(query, con, index=None):
+	"""Run
+
+	Runs a query and, if it returns a cursor, reads all the records from it
+
+	Args:
+		query (rethinkdb.ast.RqlQuery): The query to run
+		con (rethinkdb.net_asyncio.Connection): The connection to run it on
+		index (str): The index used by the query, if any
+
+	Returns:
+		mixed
+
+	Raises:
+		StorageException
+	"""
+
+	try:
+		# Run the request
+		mRes = await query.run(con)
+
+	except r.errors.ReqlOpFailedError as e:
+
+		# The index doesn't exist
+		if index and e.args[0][:5] == 'Index':
+			raise StorageException('no index', index, 'table')
+
+		# Else, re-raise
+		raise e
+
+	# If we got a cursor, read it
+	if isinstance(mRes, r.net.Cursor):
+		lRecords = []
+		while (await mRes.fetch_next()):
+			lRecords.append(await mRes.next())
+		return lRecords
+
+	# Return the result as is
+	return mRes
+
+# unavailable function
+def _unavailable(name):
+	"""Unavailable
+
+	Raises the error used by the Storage.Document methods AsyncDocument can't
+	offer because they work on their own threads and would block the event
+	loop
+
+	Args:
+		name (str): The name of the method
+
+	Raises:
+		StorageException
+	"""
+	raise StorageException('not implemented', 'AsyncDocument.%s would block the event loop, use Storage.Document.%s from a thread instead' % (name, name))
+
+# DB create function
+async def db_create(name, server = 'default'):
+	"""DB Create
+
+	Creates a new DB on the given server
+
+	Args:
+		name (str): The name of the DB to create
+		server (str): The name of the server to create the DB on
+
+	Returns:
+		bool
+	"""
+
+	try:
+
+		# Fetch the connection
+		async with connect_with(server) as oCon:
+
+			# Create the DB
+			dRes = await r.db_create(name).run(oCon)
+
+			# If the DB wasn't created
+			if 'dbs_created' not in dRes or not dRes['dbs_created']:
+				return False
+
+	# If there's already a DB with that name
+	except r.errors.ReqlOpFailedError:
+		return True
+
+	# If there's any other error
+	except r.errors.RqlRuntimeError:
+		return False
+
+	# Return ok
+	return True
+
+# DB drop function
+async def db_drop(name, server = 'default'):
+	"""DB Drop
+
+	Deletes an existing DB from the given server
+
+	Args:
+		name (str): The name of the DB to create
+		server (str): The name of the server to create the DB on
+
+	Returns:
+		bool
+	"""
+
+	try:
+
+		# Fetch the connection
+		async with connect_with(server) as oCon:
+
+			# Delete the DB
+			dRes = await r.db_drop(name).run(oCon)
+
+			# If the DB wasn't deleted
+			if 'dbs_dropped' not in dRes or not dRes['dbs_dropped']:
+				return False
+
+	# If there's no such DB
+	except r.errors.RqlRuntimeError:
+		return False
+
+	# Return ok
+	return True
+
+# AsyncDocument class
+class AsyncDocument(Storage.Document):
+	"""Async Document
+
+	Storage.Document with its DB methods turned into coroutines, e.g.
+
+		lUsers = await asyncio.gather(*[User.get(s) for s in lIDs])
+
+	The aggregation methods (count, sum, avg, min, max, group, and distinct)
+	return coroutines as well. Streaming is not available, and the methods
+	that run on their own threads, the read cache, the write-behind buffer, the
+	TTL sweeper thread, and table export and import, raise a StorageException
+
+	Extends: Storage.Document
+	"""
+
+	# aggregate static method
+	@classmethod
+	async def _aggregate(cls, reduce, _id, index, filter, contains, read_mode, db):
+		"""Aggregate
+
+		See Storage.Document._aggregate()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Create a cursor for the requested records, always as a sequence
+		oCur, bMultiple, mOrderable = cls._selection(dInfo, _id, index, False, read_mode)
+
+		# If there's any filters, the records can't use an index
+		if filter or contains:
+			mOrderable = False
+
+		# Add any additional filters and the aggregation
+		oCur = reduce(cls._where(oCur, filter, contains), mOrderable is True)
+
+		# Run the request and return the result
+		async with connect_with(dInfo['server']) as oCon:
+			return await _run(oCur, oCon, index)
+
+	# cache start static method
+	@classmethod
+	def cacheStart(cls, db={}, retry=1):
+		"""Cache Start
+
+		Not available, see Storage.Document.cacheStart()
+		"""
+		_unavailable('cacheStart')
+
+	# delete method
+	async def delete(self):
+		"""Delete
+
+		See Storage.Document.delete()
+		"""
+
+		# Get the info
+		dInfo = self._Document__dInfo
+
+		# If the instance lacks a primary key
+		if dInfo['conf']['primary'] not in self._dData:
+			raise StorageException('Can not delete document with no primary key')
+
+		# Fetch the DB connection
+		async with connect_with(dInfo['server']) as oCon:
+
+			# Try to delete the record by its primary key
+			dRes = await r \
+				.db(dInfo['db']) \
+				.table(dInfo['tree']._name) \
+				.get(self._dData[dInfo['conf']['primary']]) \
+				.delete() \
+				.run(oCon)
+
+		# If there was an error
+		if dRes['deleted'] != 1:
+			return False
+
+		# Remove the ID
+		del self._dData[dInfo['conf']['primary']]
+
+		# Return ok
+		return True
+
+	# delete get method
+	@classmethod
+	async def deleteGet(cls, _id, index=None, batch=0, rate=0, durability=None, progress=None, db={}):
+		"""Delete Get
+
+		See Storage.Document.deleteGet()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Create a cursor for the records, always reading from the primary
+		oCur = cls._selection(dInfo, _id, index, True, 'single')[0]
+
+		# Set the delete options
+		dOpts = {}
+		if durability:
+			dOpts['durability'] = durability
+
+		# If we're not batching, run the delete and return the number of
+		#	documents deleted
+		if not batch:
+			async with connect_with(dInfo['server']) as oCon:
+				dRes = await _run(oCur.delete(**dOpts), oCon, index)
+				return dRes['deleted']
+
+		# Batches default to soft durability
+		if not durability:
+			dOpts['durability'] = 'soft'
+
+		# Init the totals
+		dTotals = {'deleted': 0, 'errors': 0, 'batches': 0, 'seconds': 0}
+		fStart = time()
+
+		# Get the primary key and the table
+		sPrimary = dInfo['conf']['primary']
+		oTable = r.db(dInfo['db']).table(dInfo['tree']._name)
+
+		# Start at the beginning of the table
+		mLast = r.minval
+
+		# If we got primary keys, start at the beginning of the list
+		itIDs = None
+		if _id is not None and not index:
+			if isinstance(_id, (tuple,list)):
+				itIDs = iter(_id)
+			else:
+				itIDs = iter([_id])
+
+		# Get a connection to the server
+		async with connect_with(dInfo['server']) as oCon:
+
+			# Loop until there's nothing left
+			while True:
+
+				# If we have a list of IDs, take the next slice
+				if itIDs:
+					lKeys = list(islice(itIDs, batch))
+
+				# Else, find the keys of the next batch
+				else:
+
+					# If we want all documents, take the next primary key range,
+					#	else take whatever is left at the front of the index
+					if _id is None:
+						oKeys = oTable \
+							.between(mLast, r.maxval, left_bound='open', index=sPrimary) \
+							.order_by(index=sPrimary)
+					else:
+						oKeys = oCur
+
+					# Fetch the keys
+					lKeys = await _run(oKeys.limit(batch)[sPrimary].coerce_to('array'), oCon, index)
+
+				# If there's nothing left, we're done
+				if not lKeys:
+					break
+
+				# Delete the batch and add the results to the totals
+				dRes = await oTable.get_all(r.args(lKeys)).delete(**dOpts).run(oCon)
+				dTotals['deleted'] += dRes['deleted']
+				dTotals['errors'] += dRes['errors']
+				dTotals['batches'] += 1
+				dTotals['seconds'] = time() - fStart
+
+				# Let the caller know how far along we are
+				if progress:
+					progress(dict(dTotals))
+
+				# If we're deleting from the front of an index and nothing was
+				#	deleted, we'd only get the same keys again
+				if index and not dRes['deleted']:
+					break
+
+				# Note where the next range starts
+				mLast = lKeys[-1]
+
+				# If there's a rate limit, wait until we're back under it
+				if rate:
+					fWait = (dTotals['deleted'] / float(rate)) - (time() - fStart)
+					if fWait > 0:
+						await asyncio.sleep(fWait)
+
+		# Return the totals
+		dTotals['seconds'] = time() - fStart
+		return dTotals
+
+	# distinct static method
+	@classmethod
+	async def distinct(cls, field, _id=None, index=None, filter=None, contains=None, read_mode=None, db={}):
+		"""Distinct
+
+		See Storage.Document.distinct()
+		"""
+
+		# Check if the field is indexed
+		bIndexed = cls._indexed(field, db)
+
+		# Get the unique values
+		return list(await cls._aggregate(
+			lambda o, b: (b and bIndexed) and \
+				o.distinct(index=field) or \
+				o.get_field(field).distinct(),
+			_id, index, filter, contains, read_mode, db
+		))
+
+	# exists static method
+	@classmethod
+	async def exists(cls, _id, index=None, read_mode=None, db={}):
+		"""Exists
+
+		See Storage.Document.exists()
+		"""
+
+		# Use get to save repeating ourselves
+		if not (await cls.get(_id, index=index, raw=[cls.info(db)['conf']['primary']], read_mode=read_mode, db=db)):
+			return False
+
+		# If one or more primary keys were returned, return success
+		return True
+
+	# exists many static method
+	@classmethod
+	async def existsMany(cls, ids, index=None, chunk=1000, read_mode=None, db={}):
+		"""Exists Many
+
+		See Storage.Document.existsMany()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Get the index and the fields it's made of
+		index, lFields = cls._existsManyFields(dInfo, index)
+
+		# Init the set of found values
+		seFound = set()
+
+		# Make sure we have a list
+		lIDs = list(ids)
+
+		# Get a connection to the server
+		async with connect_with(dInfo['server']) as oCon:
+
+			# Go through the IDs a chunk at a time, adding the values found
+			for i in range(0, len(lIDs), chunk):
+				seFound.update(cls._existsManyResult(
+					await _run(cls._existsManyQuery(dInfo, lIDs[i:i+chunk], index, lFields, read_mode), oCon, index),
+					lFields
+				))
+
+		# Return the values found
+		return seFound
+
+	# filter static method
+	@classmethod
+	async def filter(cls, obj, raw=None, orderby=None, explain=False, read_mode=None, db={}):
+		"""Filter
+
+		See Storage.Document.filter()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Figure out how to find the records
+		dPlan = cls._plan(dInfo['conf'], dInfo['tree'].clean(obj))
+
+		# If we only want the plan, return it
+		if explain:
+			return dPlan
+
+		# Run the request
+		async with connect_with(dInfo['server']) as oCon:
+			lRes = await _run(cls._filterQuery(dInfo, dPlan, raw, orderby, read_mode), oCon)
+
+		# If Raw requested, return as is
+		if raw:
+			return lRes
+
+		# Else create instances for each
+		return [cls._hydrate(d, db) for d in lRes]
+
+	# get static method
+	@classmethod
+	async def get(cls, _id=None, index=None, filter=None, contains=None, raw=None, orderby=None, limit=0, read_mode=None, db={}):
+		"""Get
+
+		See Storage.Document.get()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# If there is an index passed
+		if index:
+
+			# If the index doesn't exist
+			if index not in dInfo['conf']['indexes']:
+				raise StorageException('no index', index, 'tree')
+
+		# Generate the query
+		oCur, bMultiple = cls._getQuery(dInfo, _id, index, filter, contains, raw, orderby, limit, read_mode)
+
+		# Run the request
+		async with connect_with(dInfo['server']) as oCon:
+			mRes = await _run(oCur, oCon, index)
+
+		# If we are expecting a single record
+		if not bMultiple or limit == 1:
+
+			# If we got a list, take the first record
+			if isinstance(mRes, list):
+				mRes = mRes and mRes[0] or None
+
+			# If there's nothing, or raw was requested, return as is
+			if mRes is None or raw:
+				return mRes
+
+			# Else create an instance
+			return cls._hydrate(mRes, db)
+
+		# If Raw requested, return as is
+		if raw:
+			return mRes
+
+		# Else create instances for each
+		return [cls._hydrate(d, db) for d in mRes]
+
+	# insert method
+	async def insert(self, conflict='error'):
+		"""Insert
+
+		See Storage.Document.insert()
+		"""
+
+		# Get the info
+		dInfo = self._Document__dInfo
+
+		# Clean conflict
+		if conflict not in ('error', 'replace', 'update'):
+			conflict = 'error'
+
+		# If revisions are turned on, generate a new value
+		if dInfo['conf']['revisions']:
+			self._revision(True)
+
+		# Get a connection to the server
+		async with connect_with(dInfo['server']) as oCon:
+
+			# Create a new document
+			dRes = await r \
+				.db(dInfo['db']) \
+				.table(dInfo['tree']._name) \
+				.insert(self._dData, conflict=conflict) \
+				.run(oCon)
+
+		# If there was an error
+		if dRes['inserted'] != 1 and dRes['replaced'] != 1:
+			return None
+
+		# Store the ID if necessary
+		if dInfo['conf']['auto_id']:
+			self._dData[dInfo['conf']['primary']] = dRes['generated_keys'][0]
+		self._bNew = False
+
+		# Return the ID
+		return self._dData[dInfo['conf']['primary']]
+
+	# insert many static method
+	@classmethod
+	async def insertMany(cls, docs, conflict='error', durability='hard', chunk=1000, db={}):
+		"""Insert Many
+
+		See Storage.Document.insertMany()
+		"""
+
+		# Clean conflict and durability
+		if conflict not in ('error', 'replace', 'update'):
+			conflict = 'error'
+		if durability not in ('hard', 'soft'):
+			durability = 'hard'
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Init the list of IDs
+		lIDs = []
+
+		# Get an iterator over the documents
+		itDocs = iter(docs)
+
+		# Get a connection to the server
+		async with connect_with(dInfo['server']) as oCon:
+
+			# Loop until we run out of documents
+			while True:
+
+				# Turn the next chunk into instances
+				lInst = [
+					isinstance(d, Storage.Document) and d or cls(d, db)
+					for d in islice(itDocs, chunk)
+				]
+
+				# If there's nothing left, we're done
+				if not lInst:
+					break
+
+				# Insert the entire chunk at once
+				dRes = await cls._insertManyQuery(dInfo, lInst, conflict, durability).run(oCon)
+
+				# Process the results and add the IDs to the list
+				lIDs.extend(cls._insertManyResult(dInfo, lInst, dRes))
+
+		# Return the IDs
+		return lIDs
+
+	# paginate static method
+	@classmethod
+	async def paginate(cls, index=None, page_size=100, after=None, filter=None, raw=None, db={}):
+		"""Paginate
+
+		See Storage.Document.paginate()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Generate the query
+		oCur, index, lFields = cls._paginateQuery(dInfo, index, page_size, after, filter, raw)
+
+		# Run the request
+		async with connect_with(dInfo['server']) as oCon:
+			lRows = await _run(oCur, oCon, index)
+
+		# Process the rows
+		return cls._paginateResult(lRows, lFields, page_size, raw, db)
+
+	# table create static method
+	@classmethod
+	async def tableCreate(cls, db={}):
+		"""Table Create
+
+		See Storage.Document.tableCreate()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Get a connection to the server
+		async with connect_with(dInfo['server']) as oCon:
+
+			try:
+
+				# Try to create the table
+				dRes = await r \
+					.db(dInfo['db']) \
+					.table_create(dInfo['tree']._name, **cls._tableOptions(dInfo)) \
+					.run(oCon)
+
+				# If the table wasn't created
+				if 'tables_created' not in dRes or not dRes['tables_created']:
+					return False
+
+				# If there are indexes
+				dIndexes = cls._tableIndexes(dInfo)
+				if dIndexes:
+
+					# Start building all of them at once
+					await asyncio.gather(*[
+						cls._indexCreate(dInfo, sIndex, mFields).run(oCon) \
+						for sIndex,mFields in dIndexes.items()
+					])
+
+					# Wait for all of them to be ready
+					await r \
+						.db(dInfo['db']) \
+						.table(dInfo['tree']._name) \
+						.index_wait() \
+						.run(oCon)
+
+			# If there's already a table with that name
+			except r.errors.RqlRuntimeError as e:
+				Storage.print_error(str(e))
+				return False
+
+		# Return OK
+		return True
+
+	# table delete static method
+	@classmethod
+	async def tableDelete(cls, db={}):
+		"""Table Delete
+
+		See Storage.Document.tableDelete()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Get a connection to the server
+		async with connect_with(dInfo['server']) as oCon:
+
+			try:
+
+				# Try to drop the table
+				dRes = await r \
+					.db(dInfo['db']) \
+					.table_drop(dInfo['tree']._name) \
+					.run(oCon)
+
+				# If the table wasn't dropped
+				if 'tables_dropped' not in dRes or not dRes['tables_dropped']:
+					return False
+
+			# If the table didn't exist
+			except r.errors.RqlRuntimeError:
+				return False
+
+		# Return ok
+		return True
+
+	# table export static method
+	@classmethod
+	def tableExport(cls, path, workers=4, compress=None, batch=1000, db={}):
+		"""Table Export
+
+		Not available, see Storage.Document.tableExport()
+		"""
+		_unavailable('tableExport')
+
+	# table import static method
+	@classmethod
+	def tableImport(cls, path, workers=4, compress=None, conflict='error', batch=1000, db={}):
+		"""Table Import
+
+		Not available, see Storage.Document.tableImport()
+		"""
+		_unavailable('tableImport')
+
+	# table reconfigure static method
+	@classmethod
+	async def tableReconfigure(cls, shards=None, replicas=None, primary_replica_tag=None, rebalance=False, db={}):
+		"""Table Reconfigure
+
+		See Storage.Document.tableReconfigure()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Get the table
+		oTable = r.db(dInfo['db']).table(dInfo['tree']._name)
+
+		# Get a connection to the server
+		async with connect_with(dInfo['server']) as oCon:
+
+			try:
+
+				# If anything is still missing, use the table's current setup
+				if shards is None or replicas is None:
+					dConf = await oTable.config().run(oCon)
+					if shards is None:
+						shards = len(dConf['shards'])
+					if replicas is None:
+						replicas = len(dConf['shards'][0]['replicas'])
+
+				# Set the options
+				dOpts = {'shards': shards, 'replicas': replicas}
+				if primary_replica_tag is not None:
+					dOpts['primary_replica_tag'] = primary_replica_tag
+
+				# Reconfigure the table
+				dRes = await oTable.reconfigure(**dOpts).run(oCon)
+
+				# If the table wasn't reconfigured
+				if 'reconfigured' not in dRes or not dRes['reconfigured']:
+					return False
+
+				# If we need to rebalance, wait for the new setup first
+				if rebalance:
+					await oTable.wait(wait_for='all_replicas_ready').run(oCon)
+					await oTable.rebalance().run(oCon)
+
+				# Wait for the table to be ready
+				await oTable.wait(wait_for='all_replicas_ready').run(oCon)
+
+			# If the table doesn't exist or the setup isn't possible
+			except r.errors.RqlRuntimeError as e:
+				Storage.print_error(str(e))
+				return False
+
+		# Return OK
+		return True
+
+	# ttl start static method
+	@classmethod
+	def ttlStart(cls, db={}, interval=60, batch=1000, rate=0):
+		"""TTL Start
+
+		Not available, see Storage.Document.ttlStart(), call ttlSweep() from a
+		task instead
+		"""
+		_unavailable('ttlStart')
+
+	# ttl sweep static method
+	@classmethod
+	async def ttlSweep(cls, batch=1000, rate=0, durability='soft', progress=None, db={}):
+		"""TTL Sweep
+
+		See Storage.Document.ttlSweep()
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Init the totals
+		dTotals = {'deleted': 0, 'errors': 0, 'batches': 0, 'seconds': 0}
+		fStart = time()
+
+		# Generate the query for the next batch of documents that expired
+		#	before now
+		oQuery, sField = cls._ttlQuery(dInfo, batch, durability, fStart)
+
+		# Get a connection to the server
+		async with connect_with(dInfo['server']) as oCon:
+
+			# Loop until there's nothing left
+			while True:
+
+				# Delete the batch and add the results to the totals
+				dRes = await _run(oQuery, oCon, sField)
+				dTotals['deleted'] += dRes['deleted']
+				dTotals['errors'] += dRes['errors']
+				dTotals['batches'] += 1
+				dTotals['seconds'] = time() - fStart
+
+				# Let the caller know how far along we are, and stop if asked
+				if progress and progress(dict(dTotals)) is False:
+					break
+
+				# If the batch wasn't full, there's nothing left
+				if dRes['deleted'] < batch:
+					break
+
+				# If there's a rate limit, wait until we're back under it
+				if rate:
+					fWait = (dTotals['deleted'] / float(rate)) - (time() - fStart)
+					if fWait > 0:
+						await asyncio.sleep(fWait)
+
+		# Return the totals
+		dTotals['seconds'] = time() - fStart
+		return dTotals
+
+	# update method
+	async def update(self, replace=False):
+		"""Update
+
+		See Storage.Document.update()
+		"""
+
+		# Generate the query, if there's none there's nothing to update
+		tQuery = self._updateQuery(replace)
+		if not tQuery:
+			return False
+
+		# Get a connection to the server and update the document, if it fails
+		#	put back the old revision
+		try:
+			async with connect_with(self._Document__dInfo['server']) as oCon:
+				dRes = await tQuery[0].run(oCon)
+		except Exception:
+			self._revisionRestore(tQuery[1])
+			raise
+
+		# Process the results
+		return self._updateResult(dRes, tQuery[1])
+
+	# write behind method
+	def writeBehind(self, timeout=None):
+		"""Write Behind
+
+		Not available, see Storage.Document.writeBehind()
+		"""
+		_unavailable('writeBehind')
+
+	# writer flush static method
+	@classmethod
+	def writerFlush(cls, db={}):
+		"""Writer Flush
+
+		Not available, see Storage.Document.writerFlush()
+		"""
+		_unavailable('writerFlush')
+
+	# writer start static method
+	@classmethod
+	def writerStart(cls, db={}, size=500, interval=1, limit=10000, durability='soft'):
+		"""Writer Start
+
+		Not available, see Storage.Document.writerStart()
+		"""
+		_unavailable('writerStart')
@@ -0,0 +1,2028 @@
+# coding=utf8
+""" Memory Storage Module
+
+An in process engine for Storage, selected by passing {"engine": "memory"} as
+the details to Storage.server(). Tables are kept in dicts keyed by primary
+key, along with a dict for each secondary index, and queries are answered by
+interpreting the same ReQL the Document methods send to RethinkDB
+"""
+
+# Import future
+from __future__ import print_function, absolute_import
+
+__author__		= "Chris Nasr"
+__copyright__	= "OuroborosCoding"
+__maintainer__	= "Chris Nasr"
+__email__		= "ouroboroscode@gmail.com"
+__created__		= "2026-10-16"
+
+# Import python modules
+from copy import deepcopy
+import json
+import numbers
+import random
+import threading
+from time import time
+from uuid import uuid4
+
+# Python 3 doesn't have basestring
+try:
+	basestring
+except NameError:
+	basestring = str
+
+# Include pip modules
+import rethinkdb as r
+from rethinkdb import ql2_pb2
+
+# Include local modules
+from .Storage import StorageException
+
+# Init module variables
+__mdStores = {}
+__moStoresLock = threading.Lock()
+
+# The names of the ReQL terms by type, used to find the method handling each
+_TERMS = dict([
+	(v, k) for k,v in vars(ql2_pb2.Term.TermType).items() if k.isupper()
+])
+
+# The key the implicit variable, r.row, is stored under in a scope
+_IMPLICIT = '__implicit'
+
+# get store function
+def _store(server):
+	"""Store
+
+	Returns the store holding the DBs for the given server, creating it if it
+	doesn't exist yet
+
+	Args:
+		server (str): A name representing details stored using
+			Storage.server()
+
+	Returns:
+		_Store
+	"""
+
+	# Create the store if no one beat us to it
+	with __moStoresLock:
+		if server not in __mdStores:
+			__mdStores[server] = _Store()
+		return __mdStores[server]
+
+# reset function
+def reset(server=None):
+	"""Reset
+
+	Throws away all the DBs, tables, and documents of the given server, or of
+	every server if none is passed. Useful between tests
+
+	Args:
+		server (str): A name representing details stored using
+			Storage.server()
+
+	Returns:
+		None
+	"""
+
+	# Remove the store, or all of them
+	with __moStoresLock:
+		if server is None:
+			__mdStores.clear()
+		else:
+			__mdStores.pop(server, None)
+
+# freeze function
+def _freeze(value):
+	"""Freeze
+
+	Turns a value into one that can be used as a dict key
+
+	Args:
+		value (mixed): The value to freeze
+
+	Returns:
+		mixed
+	"""
+
+	# Lists become tuples, dicts become sorted tuples of pairs
+	if isinstance(value, (list,tuple)):
+		return tuple([_freeze(m) for m in value])
+	if isinstance(value, dict):
+		return tuple(sorted(
+			[(k, _freeze(m)) for k,m in value.items()],
+			key=lambda t: t[0]
+		))
+
+	# Anything else is fine as is
+	return value
+
+# merge function
+def _merge(base, patch):
+	"""Merge
+
+	Merges the patch into the base the way ReQL's update and merge do it,
+	objects are merged recursively unless wrapped in r.literal()
+
+	Args:
+		base (mixed): The original value
+		patch (mixed): The changes
+
+	Returns:
+		mixed
+	"""
+
+	# If the patch is a literal, or either side isn't an object, the patch
+	#	replaces the base
+	if isinstance(patch, _Literal) or \
+		not isinstance(patch, dict) or \
+		not isinstance(base, dict):
+		return _resolve(patch)
+
+	# Go through each field in the patch
+	dRet = dict(base)
+	for k,v in patch.items():
+
+		# If it's an empty literal, remove the field
+		if isinstance(v, _Literal) and v.value is _Literal.NOTHING:
+			dRet.pop(k, None)
+
+		# Else, merge it
+		else:
+			dRet[k] = _merge(base.get(k), v)
+
+	# Return the merged object
+	return dRet
+
+# order function
+def _order(value):
+	"""Order
+
+	Returns a key which sorts values the way ReQL does, arrays before
+	booleans before null before numbers before objects before strings
+
+	Args:
+		value (mixed): The value to get the key for
+
+	Returns:
+		tuple
+	"""
+
+	# Bounds go to either end
+	if value is _MINVAL:
+		return (0,)
+	if value is _MAXVAL:
+		return (9,)
+
+	# Sort everything else by type, then value
+	if isinstance(value, (list,tuple)):
+		return (1, tuple([_order(m) for m in value]))
+	if isinstance(value, bool):
+		return (2, value)
+	if value is None:
+		return (3,)
+	if isinstance(value, numbers.Number):
+		return (4, value)
+	if isinstance(value, dict):
+		return (5, tuple(sorted(
+			[(k, _order(m)) for k,m in value.items()],
+			key=lambda t: t[0]
+		)))
+	return (7, value)
+
+# resolve function
+def _resolve(value):
+	"""Resolve
+
+	Removes any r.literal() wrappers from a value
+
+	Args:
+		value (mixed): The value to resolve
+
+	Returns:
+		mixed
+	"""
+
+	# If it's a literal, resolve what it holds
+	if isinstance(value, _Literal):
+		return _resolve(value.value)
+
+	# If it's an object, resolve each field, dropping empty literals
+	if isinstance(value, dict):
+		dRet = {}
+		for k,v in value.items():
+			if isinstance(v, _Literal) and v.value is _Literal.NOTHING:
+				continue
+			dRet[k] = _resolve(v)
+		return dRet
+
+	# If it's a list, resolve each element
+	if isinstance(value, list):
+		return [_resolve(m) for m in value]
+
+	# Return anything else as is
+	return value
+
+# truthy function
+def _truthy(value):
+	"""Truthy
+
+	ReQL only treats false and null as false
+
+	Args:
+		value (mixed): The value to check
+
+	Returns:
+		bool
+	"""
+	return value is not None and value is not False
+
+# _Bound class
+class _Bound(object):
+	"""Bound
+
+	r.minval and r.maxval
+
+	Extends: object
+	"""
+	# constructor
+	def __init__(self, name):
+		self.name = name
+	# __repr__ magic method
+	def __repr__(self):
+		return 'r.%s' % self.name
+
+# The bounds
+_MINVAL = _Bound('minval')
+_MAXVAL = _Bound('maxval')
+
+# _DB class
+class _DB(object):
+	"""DB
+
+	The result of r.db()
+
+	Extends: object
+	"""
+	# constructor
+	def __init__(self, name):
+		self.name = name
+
+# _Function class
+class _Function(object):
+	"""Function
+
+	The result of a ReQL function, can be called with the values of its
+	arguments
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, query, term, scope):
+		self.query = query
+		self.term = term
+		self.scope = scope
+
+	# __call__ magic method
+	def __call__(self, *args):
+
+		# Add the arguments to the scope, the first one is also r.row
+		dScope = dict(self.scope)
+		for o,m in zip(self.term._args[0]._args, args):
+			dScope[o.data] = m
+		if args:
+			dScope[_IMPLICIT] = args[0]
+
+		# Evaluate the body
+		return self.query.eval(self.term._args[1], dScope)
+
+# _Grouped class
+class _Grouped(object):
+	"""Grouped
+
+	The result of group(), a list of keys and the value for each
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, groups):
+		self.groups = groups
+
+	# map method
+	def map(self, f):
+		return _Grouped([(k, f(v)) for k,v in self.groups])
+
+# _Literal class
+class _Literal(object):
+	"""Literal
+
+	The result of r.literal()
+
+	Extends: object
+	"""
+
+	# Used when r.literal() is called with no value
+	NOTHING = object()
+
+	# constructor
+	def __init__(self, value):
+		self.value = value
+
+# _Order class
+class _Order(object):
+	"""Order
+
+	The result of r.asc() or r.desc()
+
+	Extends: object
+	"""
+	# constructor
+	def __init__(self, value, desc):
+		self.value = value
+		self.desc = desc
+
+# _Selection class
+class _Selection(object):
+	"""Selection
+
+	Documents taken from a table which can still be written to
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, table, docs, array=False, whole=False):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			table (_Table): The table the documents are from
+			docs (dict[]): The documents
+			array (bool): If true the result is an array instead of a stream
+			whole (bool): If true the selection is the entire table
+
+		Returns:
+			_Selection
+		"""
+		self.table = table
+		self.docs = docs
+		self.array = array
+		self.whole = whole
+
+# _Single class
+class _Single(object):
+	"""Single
+
+	The document, or lack of one, returned by get()
+
+	Extends: object
+	"""
+	# constructor
+	def __init__(self, table, key, doc):
+		self.table = table
+		self.key = key
+		self.doc = doc
+
+# _Stream class
+class _Stream(list):
+	"""Stream
+
+	A sequence that isn't an array or a selection
+
+	Extends: list
+	"""
+	pass
+
+# _Store class
+class _Store(object):
+	"""Store
+
+	All the DBs of one server
+
+	Extends: object
+	"""
+	# constructor
+	def __init__(self):
+		self.dbs = {'test': {}}
+		self.lock = threading.RLock()
+
+# _Table class
+class _Table(object):
+	"""Table
+
+	The documents of one table, by primary key, along with a dict for each
+	secondary index mapping each key to the primary keys of the documents
+	with it
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, db, name, primary, config):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			db (str): The name of the DB
+			name (str): The name of the table
+			primary (str): The primary key
+			config (dict): The shards and replicas the table was created with
+
+		Returns:
+			_Table
+		"""
+		self.db = db
+		self.name = name
+		self.primary = primary
+		self.config = config
+		self.records = {}
+		self.indexes = {}
+		self.index = {}
+
+	# index add method
+	def indexAdd(self, name, func, multi, geo=False):
+		"""Index Add
+
+		Adds a secondary index and fills it with the existing documents
+
+		Args:
+			name (str): The name of the index
+			func (_Function): The function returning the key, None to use the
+				field with the same name
+			multi (bool): If true, each element of the key is indexed
+			geo (bool): Only kept for the index's status, the memory engine
+				has no geospatial queries
+
+		Returns:
+			None
+		"""
+		self.indexes[name] = {"func": func, "multi": multi, "geo": geo}
+		self.index[name] = {}
+		for mKey,d in self.records.items():
+			for mValue in self.keys(name, d):
+				self.index[name].setdefault(_freeze(mValue), {})[mKey] = True
+
+	# keys method
+	def keys(self, name, doc):
+		"""Keys
+
+		Returns the keys the document has in the index, if the index can't be
+		calculated for it, it has none
+
+		Args:
+			name (str): The name of the index
+			doc (dict): The document
+
+		Returns:
+			list
+		"""
+
+		# The primary key has exactly one
+		if name == self.primary:
+			return [doc[self.primary]]
+
+		# Calculate the key
+		dIndex = self.indexes[name]
+		try:
+			if dIndex['func'] is None:
+				mKey = doc[name]
+			else:
+				mKey = dIndex['func'](doc)
+		except (KeyError, r.errors.ReqlError):
+			return []
+
+		# Null isn't indexed
+		if mKey is None:
+			return []
+
+		# If it's a multi index, each element is a key
+		if dIndex['multi'] and isinstance(mKey, list):
+			return mKey
+
+		# Return the key
+		return [mKey]
+
+	# remove method
+	def remove(self, key):
+		"""Remove
+
+		Removes a document from the table and its indexes
+
+		Args:
+			key (mixed): The frozen primary key
+
+		Returns:
+			dict: The document removed
+		"""
+
+		# Remove the document
+		dDoc = self.records.pop(key)
+
+		# Remove it from the indexes
+		for sName in self.indexes:
+			for mValue in self.keys(sName, dDoc):
+				dKeys = self.index[sName].get(_freeze(mValue))
+				if dKeys is not None:
+					dKeys.pop(key, None)
+					if not dKeys:
+						del self.index[sName][_freeze(mValue)]
+
+		# Return the document
+		return dDoc
+
+	# store method
+	def store(self, doc):
+		"""Store
+
+		Adds or replaces a document in the table and its indexes
+
+		Args:
+			doc (dict): The document
+
+		Returns:
+			None
+		"""
+
+		# If there's an existing version, remove it
+		mKey = _freeze(doc[self.primary])
+		if mKey in self.records:
+			self.remove(mKey)
+
+		# Store the document and add it to the indexes
+		self.records[mKey] = doc
+		for sName in self.indexes:
+			for mValue in self.keys(sName, doc):
+				self.index[sName].setdefault(_freeze(mValue), {})[mKey] = True
+
+# Cursor class
+class Cursor(r.net.Cursor):
+	"""Cursor
+
+	Returned in place of the driver's cursor for sequences
+
+	Extends: rethinkdb.net.Cursor
+	"""
+
+	# constructor
+	def __init__(self, rows):
+		self.rows = iter(rows)
+		self.error = None
+
+	# __iter__ magic method
+	def __iter__(self):
+		return self
+
+	# __next__ magic method
+	def __next__(self):
+		return next(self.rows)
+
+	# next method
+	def next(self, wait=True):
+		return next(self.rows)
+
+	# close method
+	def close(self):
+		self.rows = iter([])
+
+# Connection class
+class Connection(object):
+	"""Connection
+
+	Stands in for a connection to RethinkDB, running queries against the
+	server's store instead
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, server, details):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			server (str): A name representing details stored using
+				Storage.server()
+			details (dict): The details passed to Storage.server()
+
+		Returns:
+			Connection
+		"""
+		self.server_name = server
+		self.db = details.get('db') or 'test'
+		self.open = True
+
+	# close method
+	def close(self, noreply_wait=True):
+		self.open = False
+
+	# store property
+	@property
+	def store(self):
+		"""Store
+
+		Returns the server's store, looked up on every call so that
+		connections kept in a pool see a store replaced by reset()
+
+		Returns:
+			_Store
+		"""
+		return _store(self.server_name)
+
+	# is open method
+	def is_open(self):
+		return self.open
+
+	# noreply wait method
+	def noreply_wait(self):
+		pass
+
+	# reconnect method
+	def reconnect(self, noreply_wait=True, timeout=None):
+		self.open = True
+		return self
+
+	# server method
+	def server(self):
+		return {"id": self.server_name, "name": "memory", "proxy": False}
+
+	# use method
+	def use(self, db):
+		self.db = db
+
+	# start method
+	def _start(self, term, **optargs):
+		"""Start
+
+		Called by RqlQuery.run() to run the query on the connection
+
+		Args:
+			term (rethinkdb.ast.RqlQuery): The query
+			optargs (dict): The global options passed to run()
+
+		Returns:
+			mixed
+
+		Raises:
+			rethinkdb.errors.ReqlError
+		"""
+
+		# If the connection is closed
+		if not self.open:
+			raise r.errors.ReqlDriverError('Connection is closed.')
+
+		# Run the query with the store locked
+		fStart = time()
+		oStore = self.store
+		with oStore.lock:
+			mRes = _Query(oStore, optargs.get('db') or self.db).run(term)
+
+		# If no reply was requested
+		if optargs.get('noreply'):
+			return None
+
+		# If a profile was requested
+		if optargs.get('profile'):
+			return {
+				"value": mRes,
+				"profile": [{
+					"description": "Evaluated in memory.",
+					"duration(ms)": (time() - fStart) * 1000.0
+				}]
+			}
+
+		# Return the result
+		return mRes
+
+# _Query class
+class _Query(object):
+	"""Query
+
+	Evaluates a ReQL term against a store. Each term type is handled by the
+	method with the same name as the type, e.g. _GET_ALL
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, store, db):
+		self.store = store
+		self.db = db
+
+	# args method
+	def _args(self, term, scope, raw=False):
+		"""Args
+
+		Evaluates the arguments of the term, expanding any r.args()
+
+		Args:
+			term (rethinkdb.ast.RqlQuery): The term
+			scope (dict): The variables in scope
+			raw (bool): If true, the results of get() aren't unwrapped
+
+		Returns:
+			list
+		"""
+		lRet = []
+		for o in term._args:
+			if getattr(o, 'tt', None) == ql2_pb2.Term.TermType.ARGS:
+				lRet.extend(self._items(self.eval(o._args[0], scope)))
+			else:
+				lRet.append(self.eval(o, scope))
+		if not raw:
+			lRet = [self._val(m) for m in lRet]
+		return lRet
+
+	# eval method
+	def eval(self, term, scope):
+		"""Eval
+
+		Evaluates a term
+
+		Args:
+			term (rethinkdb.ast.RqlQuery): The term
+			scope (dict): The variables in scope
+
+		Returns:
+			mixed
+
+		Raises:
+			rethinkdb.errors.ReqlError
+			StorageException
+		"""
+
+		# Find the method for the term, datums are the only terms without a
+		#	type
+		try:
+			if isinstance(term, r.ast.Datum):
+				fHandler = self._DATUM
+			else:
+				fHandler = getattr(self, '_%s' % _TERMS[term.tt])
+		except (AttributeError, KeyError):
+			raise StorageException('not implemented', 'The memory engine does not support `%s`' % getattr(term, 'st', type(term).__name__))
+
+		# Run it
+		return fHandler(term, scope)
+
+	# items method
+	def _items(self, value):
+		"""Items
+
+		Returns the elements of a sequence
+
+		Args:
+			value (mixed): The sequence
+
+		Returns:
+			list
+
+		Raises:
+			rethinkdb.errors.ReqlQueryLogicError
+		"""
+		if isinstance(value, _Selection):
+			return value.docs
+		if isinstance(value, list):
+			return value
+		raise r.errors.ReqlQueryLogicError('Expected type SEQUENCE but found %s.' % type(value).__name__)
+
+	# like method
+	def _like(self, value, items, keep=True):
+		"""Like
+
+		Returns the items as the same kind of sequence as the value
+
+		Args:
+			value (mixed): The original sequence
+			items (list): The new items
+			keep (bool): If false, selections become plain streams
+
+		Returns:
+			mixed
+		"""
+		if isinstance(value, _Selection):
+			if keep:
+				return _Selection(value.table, items, value.array)
+			if value.array:
+				return list(items)
+			return _Stream(items)
+		if isinstance(value, _Stream):
+			return _Stream(items)
+		return list(items)
+
+	# opts method
+	def _opts(self, term, scope):
+		"""Opts
+
+		Evaluates the optional arguments of the term
+
+		Args:
+			term (rethinkdb.ast.RqlQuery): The term
+			scope (dict): The variables in scope
+
+		Returns:
+			dict
+		"""
+		return dict([(k, self.eval(v, scope)) for k,v in term.optargs.items()])
+
+	# output method
+	def _output(self, value):
+		"""Output
+
+		Converts a result into what the driver would return
+
+		Args:
+			value (mixed): The result
+
+		Returns:
+			mixed
+		"""
+		if isinstance(value, _Selection):
+			if value.array:
+				return deepcopy(value.docs)
+			return Cursor(deepcopy(value.docs))
+		if isinstance(value, _Stream):
+			return Cursor(deepcopy(list(value)))
+		if isinstance(value, _Single):
+			return deepcopy(value.doc)
+		if isinstance(value, _Grouped):
+			return dict([
+				(_freeze(k), self._output(v)) for k,v in value.groups
+			])
+		if isinstance(value, (_DB, _Function, _Literal, _Order)):
+			raise r.errors.ReqlQueryLogicError('Query result must be of type DATUM, GROUPED_DATA, or STREAM.')
+		return deepcopy(value)
+
+	# run method
+	def run(self, term):
+		"""Run
+
+		Evaluates the query and returns the result as the driver would
+
+		Args:
+			term (rethinkdb.ast.RqlQuery): The query
+
+		Returns:
+			mixed
+		"""
+		return self._output(self.eval(term, {}))
+
+	# table method
+	def _table(self, value):
+		"""Table
+
+		Returns the table a selection came from
+
+		Args:
+			value (mixed): The selection
+
+		Returns:
+			_Table
+
+		Raises:
+			rethinkdb.errors.ReqlQueryLogicError
+		"""
+		if isinstance(value, (_Selection, _Single)) and value.table:
+			return value.table
+		raise r.errors.ReqlQueryLogicError('Expected type TABLE but found %s.' % type(value).__name__)
+
+	# val method
+	def _val(self, value):
+		"""Val
+
+		Unwraps the document returned by get()
+
+		Args:
+			value (mixed): The value
+
+		Returns:
+			mixed
+		"""
+		if isinstance(value, _Single):
+			return value.doc
+		return value
+
+	# write result method
+	def _writeResult(self):
+		return {
+			"deleted": 0, "errors": 0, "inserted": 0,
+			"replaced": 0, "skipped": 0, "unchanged": 0
+		}
+
+	# write error method
+	def _writeError(self, result, message):
+		result['errors'] += 1
+		if 'first_error' not in result:
+			result['first_error'] = message
+
+	# datum term
+	def _DATUM(self, term, scope):
+		return term.data
+
+	# make array term
+	def _MAKE_ARRAY(self, term, scope):
+		return self._args(term, scope)
+
+	# make obj term
+	def _MAKE_OBJ(self, term, scope):
+		return dict([
+			(k, self._val(self.eval(v, scope))) for k,v in term.optargs.items()
+		])
+
+	# var term
+	def _VAR(self, term, scope):
+		return scope[term._args[0].data]
+
+	# implicit var term
+	def _IMPLICIT_VAR(self, term, scope):
+		try:
+			return scope[_IMPLICIT]
+		except KeyError:
+			raise r.errors.ReqlQueryLogicError('r.row is not in scope.')
+
+	# func term
+	def _FUNC(self, term, scope):
+		return _Function(self, term, scope)
+
+	# funcall term
+	def _FUNCALL(self, term, scope):
+		lArgs = self._args(term, scope)
+		return lArgs[0](*lArgs[1:])
+
+	# error term
+	def _ERROR(self, term, scope):
+		lArgs = self._args(term, scope)
+		raise r.errors.ReqlUserError(lArgs and lArgs[0] or 'Error.')
+
+	# uuid term
+	def _UUID(self, term, scope):
+		return str(uuid4())
+
+	# literal term
+	def _LITERAL(self, term, scope):
+		lArgs = self._args(term, scope)
+		if lArgs:
+			return _Literal(lArgs[0])
+		return _Literal(_Literal.NOTHING)
+
+	# minval term
+	def _MINVAL(self, term, scope):
+		return _MINVAL
+
+	# maxval term
+	def _MAXVAL(self, term, scope):
+		return _MAXVAL
+
+	# asc term
+	def _ASC(self, term, scope):
+		return _Order(self._args(term, scope)[0], False)
+
+	# desc term
+	def _DESC(self, term, scope):
+		return _Order(self._args(term, scope)[0], True)
+
+	# branch term
+	def _BRANCH(self, term, scope):
+
+		# Go through each test and value pair, only evaluating what's needed
+		lArgs = term._args
+		for i in range(0, len(lArgs) - 1, 2):
+			if _truthy(self._val(self.eval(lArgs[i], scope))):
+				return self.eval(lArgs[i+1], scope)
+
+		# Return the else value
+		return self.eval(lArgs[-1], scope)
+
+	# and term
+	def _AND(self, term, scope):
+		mRet = True
+		for o in term._args:
+			mRet = self._val(self.eval(o, scope))
+			if not _truthy(mRet):
+				return mRet
+		return mRet
+
+	# or term
+	def _OR(self, term, scope):
+		mRet = False
+		for o in term._args:
+			mRet = self._val(self.eval(o, scope))
+			if _truthy(mRet):
+				return mRet
+		return mRet
+
+	# not term
+	def _NOT(self, term, scope):
+		return not _truthy(self._args(term, scope)[0])
+
+	# compare method
+	def _compare(self, term, scope, f):
+		lArgs = [_order(m) for m in self._args(term, scope)]
+		for i in range(len(lArgs) - 1):
+			if not f(lArgs[i], lArgs[i+1]):
+				return False
+		return True
+
+	# eq term
+	def _EQ(self, term, scope):
+		return self._compare(term, scope, lambda a, b: a == b)
+
+	# ne term
+	def _NE(self, term, scope):
+		return not self._EQ(term, scope)
+
+	# lt term
+	def _LT(self, term, scope):
+		return self._compare(term, scope, lambda a, b: a < b)
+
+	# le term
+	def _LE(self, term, scope):
+		return self._compare(term, scope, lambda a, b: a <= b)
+
+	# gt term
+	def _GT(self, term, scope):
+		return self._compare(term, scope, lambda a, b: a > b)
+
+	# ge term
+	def _GE(self, term, scope):
+		return self._compare(term, scope, lambda a, b: a >= b)
+
+	# math method
+	def _math(self, term, scope, f):
+		lArgs = self._args(term, scope)
+		mRet = lArgs[0]
+		for m in lArgs[1:]:
+			mRet = f(mRet, m)
+		return mRet
+
+	# add term
+	def _ADD(self, term, scope):
+		return self._math(term, scope, lambda a, b: a + b)
+
+	# sub term
+	def _SUB(self, term, scope):
+		return self._math(term, scope, lambda a, b: a - b)
+
+	# mul term
+	def _MUL(self, term, scope):
+		return self._math(term, scope, lambda a, b: a * b)
+
+	# div term
+	def _DIV(self, term, scope):
+		return self._math(term, scope, lambda a, b: float(a) / b)
+
+	# mod term
+	def _MOD(self, term, scope):
+		return self._math(term, scope, lambda a, b: a % b)
+
+	# default term
+	def _DEFAULT(self, term, scope):
+
+		# Try to get the value, non-existence errors use the default
+		sError = None
+		try:
+			mValue = self.eval(term._args[0], scope)
+		except r.errors.ReqlNonExistenceError as e:
+			mValue = None
+			sError = e.message
+
+		# If we have a value, return it
+		if self._val(mValue) is not None:
+			return mValue
+
+		# Else, return the default, or call it with the error
+		mDefault = self._val(self.eval(term._args[1], scope))
+		if isinstance(mDefault, _Function):
+			return mDefault(sError)
+		return mDefault
+
+	# field method
+	def _field(self, value, field):
+
+		# If it's an object, return the field
+		if isinstance(value, dict):
+			try:
+				return value[field]
+			except KeyError:
+				raise r.errors.ReqlNonExistenceError('No attribute `%s` in object:\n%s' % (field, json.dumps(value, default=str)))
+
+		# If it's null
+		if value is None:
+			raise r.errors.ReqlNonExistenceError('Cannot perform bracket on a non-object non-sequence `null`.')
+
+		# Else, it's not something that has fields
+		raise r.errors.ReqlQueryLogicError('Cannot perform bracket on a non-object non-sequence `%s`.' % str(value))
+
+	# get field method
+	def _getField(self, value, field):
+
+		# If it's grouped, get the field in each group
+		if isinstance(value, _Grouped):
+			return value.map(lambda m: self._getField(m, field))
+
+		# If we got an index into an array
+		if isinstance(field, numbers.Number) and not isinstance(field, bool):
+			return self._nth(value, field)
+
+		# If it's a sequence, get the field from every object that has it
+		if isinstance(value, (list, _Selection)):
+			return self._like(value, [
+				d[field] for d in self._items(value) \
+				if isinstance(d, dict) and field in d
+			], False)
+
+		# Else, get the field from the object
+		return self._field(value, field)
+
+	# bracket term
+	def _BRACKET(self, term, scope):
+		lArgs = self._args(term, scope)
+		return self._getField(lArgs[0], lArgs[1])
+
+	# get field term
+	def _GET_FIELD(self, term, scope):
+		lArgs = self._args(term, scope)
+		return self._getField(lArgs[0], lArgs[1])
+
+	# nth method
+	def _nth(self, value, index):
+		try:
+			return self._items(value)[int(index)]
+		except IndexError:
+			raise r.errors.ReqlNonExistenceError('Index out of bounds.')
+
+	# nth term
+	def _NTH(self, term, scope):
+		lArgs = self._args(term, scope)
+		return self._nth(lArgs[0], lArgs[1])
+
+	# pluck method
+	def _pluck(self, doc, fields):
+
+		# Go through each field
+		dRet = {}
+		for mField in fields:
+
+			# If it's a list of fields, pluck each
+			if isinstance(mField, list):
+				dRet.update(self._pluck(doc, mField))
+
+			# If it's nested fields
+			elif isinstance(mField, dict):
+				for k,v in mField.items():
+					if k in doc:
+						if v is True:
+							dRet[k] = doc[k]
+						elif isinstance(doc[k], dict):
+							if not isinstance(v, list):
+								v = [v]
+							dRet[k] = self._pluck(doc[k], v)
+
+			# Else, it's a field name
+			elif mField in doc:
+				dRet[mField] = doc[mField]
+
+		# Return the plucked fields
+		return dRet
+
+	# pluck term
+	def _PLUCK(self, term, scope):
+		lArgs = self._args(term, scope)
+		return self._transform(lArgs[0], lambda d: self._pluck(d, lArgs[1:]), 'pluck')
+
+	# without term
+	def _WITHOUT(self, term, scope):
+		lArgs = self._args(term, scope)
+		return self._transform(lArgs[0], lambda d: dict([
+			(k, v) for k,v in d.items() if k not in lArgs[1:]
+		]), 'without')
+
+	# merge term
+	def _MERGE(self, term, scope):
+		lArgs = self._args(term, scope)
+		def fMerge(d):
+			for m in lArgs[1:]:
+				if isinstance(m, _Function):
+					m = m(d)
+				d = _merge(d, m)
+			return d
+		return self._transform(lArgs[0], fMerge, 'merge')
+
+	# transform method
+	def _transform(self, value, f, name):
+
+		# If it's grouped, transform each group
+		if isinstance(value, _Grouped):
+			return value.map(lambda m: self._transform(m, f, name))
+
+		# If it's an object, transform it
+		if isinstance(value, dict):
+			return f(value)
+
+		# If it's a sequence, transform every object in it
+		if isinstance(value, (list, _Selection)):
+			return self._like(value, [f(d) for d in self._items(value)], False)
+
+		# Else, we can't transform it
+		if value is None:
+			raise r.errors.ReqlNonExistenceError('Cannot perform %s on a non-object non-sequence `null`.' % name)
+		raise r.errors.ReqlQueryLogicError('Cannot perform %s on a non-object non-sequence `%s`.' % (name, str(value)))
+
+	# keys term
+	def _KEYS(self, term, scope):
+		return sorted(self._args(term, scope)[0].keys())
+
+	# has fields term
+	def _HAS_FIELDS(self, term, scope):
+		lArgs = self._args(term, scope)
+		if isinstance(lArgs[0], dict):
+			return all([f in lArgs[0] for f in lArgs[1:]])
+		return self._like(lArgs[0], [
+			d for d in self._items(lArgs[0]) \
+			if all([f in d for f in lArgs[1:]])
+		])
+
+	# contains term
+	def _CONTAINS(self, term, scope):
+		lArgs = self._args(term, scope)
+		lItems = self._items(lArgs[0])
+		for m in lArgs[1:]:
+			if isinstance(m, _Function):
+				if not any([_truthy(m(i)) for i in lItems]):
+					return False
+			elif _order(m) not in [_order(i) for i in lItems]:
+				return False
+		return True
+
+	# is empty term
+	def _IS_EMPTY(self, term, scope):
+		return not self._items(self._args(term, scope)[0])
+
+	# coerce to term
+	def _COERCE_TO(self, term, scope):
+		lArgs = self._args(term, scope)
+		sType = lArgs[1].lower()
+		if sType == 'array':
+			if isinstance(lArgs[0], dict):
+				return [[k, v] for k,v in lArgs[0].items()]
+			return list(self._items(lArgs[0]))
+		if sType == 'object':
+			if isinstance(lArgs[0], dict):
+				return lArgs[0]
+			return dict([(l[0], l[1]) for l in self._items(lArgs[0])])
+		if sType == 'string':
+			if isinstance(lArgs[0], basestring):
+				return lArgs[0]
+			return json.dumps(lArgs[0], default=str)
+		if sType == 'number':
+			return float(lArgs[0])
+		raise r.errors.ReqlQueryLogicError('Cannot coerce to %s.' % sType)
+
+	# sample term
+	def _SAMPLE(self, term, scope):
+		lArgs = self._args(term, scope)
+		lItems = self._items(lArgs[0])
+		return random.sample(lItems, min(int(lArgs[1]), len(lItems)))
+
+	# limit term
+	def _LIMIT(self, term, scope):
+		lArgs = self._args(term, scope)
+		return self._like(lArgs[0], self._items(lArgs[0])[:int(lArgs[1])])
+
+	# skip term
+	def _SKIP(self, term, scope):
+		lArgs = self._args(term, scope)
+		return self._like(lArgs[0], self._items(lArgs[0])[int(lArgs[1]):])
+
+	# map term
+	def _MAP(self, term, scope):
+		lArgs = self._args(term, scope)
+		return self._like(lArgs[0], [lArgs[1](d) for d in self._items(lArgs[0])], False)
+
+	# matches method
+	def _matches(self, doc, pattern):
+
+		# Every field in the pattern must match, objects are matched
+		#	recursively
+		if not isinstance(doc, dict):
+			return False
+		for k,v in pattern.items():
+			if k not in doc:
+				return False
+			if isinstance(v, dict) and isinstance(doc[k], dict):
+				if not self._matches(doc[k], v):
+					return False
+			elif _order(doc[k]) != _order(v):
+				return False
+		return True
+
+	# filter term
+	def _FILTER(self, term, scope):
+		lArgs = self._args(term, scope)
+		dOpts = self._opts(term, scope)
+		mDefault = dOpts.get('default', False)
+
+		# Go through each item
+		lRet = []
+		for d in self._items(lArgs[0]):
+
+			# Check it, missing fields use the default
+			try:
+				if isinstance(lArgs[1], _Function):
+					bKeep = _truthy(lArgs[1](d))
+				elif isinstance(lArgs[1], dict):
+					bKeep = self._matches(d, lArgs[1])
+				else:
+					bKeep = _truthy(lArgs[1])
+			except r.errors.ReqlNonExistenceError:
+				bKeep = _truthy(mDefault)
+
+			# Keep it if it passed
+			if bKeep:
+				lRet.append(d)
+
+		# Return what's left
+		return self._like(lArgs[0], lRet)
+
+	# order by term
+	def _ORDER_BY(self, term, scope):
+		lArgs = self._args(term, scope)
+		dOpts = self._opts(term, scope)
+		lItems = list(self._items(lArgs[0]))
+
+		# Sort by each field, last to first, so the first field wins
+		for mField in reversed(lArgs[1:]):
+			bDesc = False
+			if isinstance(mField, _Order):
+				bDesc = mField.desc
+				mField = mField.value
+			lItems.sort(
+				key=lambda d: self._sortKey(d, mField),
+				reverse=bDesc
+			)
+
+		# If there's an index, it's applied first
+		if 'index' in dOpts:
+			mIndex = dOpts['index']
+			bDesc = False
+			if isinstance(mIndex, _Order):
+				bDesc = mIndex.desc
+				mIndex = mIndex.value
+			oTable = self._table(lArgs[0])
+			self._indexCheck(oTable, mIndex)
+			lItems = [d for d in lItems if oTable.keys(mIndex, d)]
+			lItems.sort(
+				key=lambda d: _order(oTable.keys(mIndex, d)[0]),
+				reverse=bDesc
+			)
+
+		# If it was ordered by an index only, it's still a stream
+		if isinstance(lArgs[0], _Selection):
+			return _Selection(
+				lArgs[0].table,
+				lItems,
+				lArgs[0].array or len(lArgs) > 1 or 'index' not in dOpts
+			)
+
+		# Else, it's an array
+		return list(lItems)
+
+	# sort key method
+	def _sortKey(self, doc, field):
+		try:
+			if isinstance(field, _Function):
+				return _order(field(doc))
+			return _order(self._field(doc, field))
+		except r.errors.ReqlNonExistenceError:
+			return _order(None)
+
+	# reduce method
+	def _reduce(self, term, scope, f):
+		lArgs = self._args(term, scope)
+		dOpts = self._opts(term, scope)
+		if isinstance(lArgs[0], _Grouped):
+			return lArgs[0].map(lambda m: f(m, lArgs[1:], dOpts))
+		return f(lArgs[0], lArgs[1:], dOpts)
+
+	# values method
+	def _values(self, items, args):
+
+		# If there's no field or function, use the items as is
+		if not args:
+			return list(items)
+
+		# If it's a function, call it on each
+		if isinstance(args[0], _Function):
+			return [args[0](d) for d in items]
+
+		# Else, use the field from each object that has it
+		return [d[args[0]] for d in items if isinstance(d, dict) and args[0] in d]
+
+	# count term
+	def _COUNT(self, term, scope):
+		def fCount(value, args, opts):
+			lItems = self._items(value)
+			if not args:
+				return len(lItems)
+			if isinstance(args[0], _Function):
+				return len([d for d in lItems if _truthy(args[0](d))])
+			return len([d for d in lItems if _order(d) == _order(args[0])])
+		return self._reduce(term, scope, fCount)
+
+	# sum term
+	def _SUM(self, term, scope):
+		def fSum(value, args, opts):
+			return sum(self._values(self._items(value), args))
+		return self._reduce(term, scope, fSum)
+
+	# avg term
+	def _AVG(self, term, scope):
+		def fAvg(value, args, opts):
+			lValues = self._values(self._items(value), args)
+			if not lValues:
+				raise r.errors.ReqlNonExistenceError('Cannot perform avg on an empty stream.')
+			return sum(lValues) / float(len(lValues))
+		return self._reduce(term, scope, fAvg)
+
+	# extreme method
+	def _extreme(self, term, scope, name, pick):
+		def fExtreme(value, args, opts):
+			lItems = self._items(value)
+
+			# Get the key for each item
+			if 'index' in opts:
+				oTable = self._table(value)
+				self._indexCheck(oTable, opts['index'])
+				lPairs = [
+					(_order(min([_order(k) for k in oTable.keys(opts['index'], d)])), d) \
+					for d in lItems if oTable.keys(opts['index'], d)
+				]
+			elif not args:
+				lPairs = [(_order(d), d) for d in lItems]
+			elif isinstance(args[0], _Function):
+				lPairs = [(_order(args[0](d)), d) for d in lItems]
+			else:
+				lPairs = [
+					(_order(d[args[0]]), d) for d in lItems \
+					if isinstance(d, dict) and args[0] in d
+				]
+
+			# If there's nothing
+			if not lPairs:
+				raise r.errors.ReqlNonExistenceError('Cannot take the %s of an empty stream.' % name)
+
+			# Return the item with the smallest or largest key
+			return pick(lPairs, key=lambda t: t[0])[1]
+		return self._reduce(term, scope, fExtreme)
+
+	# min term
+	def _MIN(self, term, scope):
+		return self._extreme(term, scope, 'min', min)
+
+	# max term
+	def _MAX(self, term, scope):
+		return self._extreme(term, scope, 'max', max)
+
+	# distinct term
+	def _DISTINCT(self, term, scope):
+		def fDistinct(value, args, opts):
+
+			# Get the values
+			if 'index' in opts:
+				oTable = self._table(value)
+				self._indexCheck(oTable, opts['index'])
+				lValues = []
+				for d in self._items(value):
+					lValues.extend(oTable.keys(opts['index'], d))
+			else:
+				lValues = self._items(value)
+
+			# Remove duplicates and sort them
+			dUnique = {}
+			for m in lValues:
+				dUnique[_order(m)] = m
+			return [dUnique[k] for k in sorted(dUnique.keys())]
+		return self._reduce(term, scope, fDistinct)
+
+	# group term
+	def _GROUP(self, term, scope):
+		lArgs = self._args(term, scope)
+		dOpts = self._opts(term, scope)
+
+		# Go through each item
+		dGroups = {}
+		for d in self._items(lArgs[0]):
+
+			# Get the keys, by index
+			if 'index' in dOpts:
+				oTable = self._table(lArgs[0])
+				self._indexCheck(oTable, dOpts['index'])
+				lKeys = oTable.keys(dOpts['index'], d)
+
+			# Or by fields and functions, missing fields are null
+			else:
+				lValues = []
+				for m in lArgs[1:]:
+					try:
+						if isinstance(m, _Function):
+							lValues.append(m(d))
+						else:
+							lValues.append(self._field(d, m))
+					except r.errors.ReqlNonExistenceError:
+						lValues.append(None)
+				if len(lValues) == 1:
+					mKey = lValues[0]
+				else:
+					mKey = lValues
+				if dOpts.get('multi') and isinstance(mKey, list):
+					lKeys = mKey
+				else:
+					lKeys = [mKey]
+
+			# Add the item to each group
+			for mKey in lKeys:
+				dGroups.setdefault(_order(mKey), (mKey, []))[1].append(d)
+
+		# Return the groups sorted by key
+		return _Grouped([dGroups[k] for k in sorted(dGroups.keys())])
+
+	# ungroup term
+	def _UNGROUP(self, term, scope):
+		mValue = self._args(term, scope)[0]
+		return [{"group": k, "reduction": v} for k,v in mValue.groups]
+
+	# index check method
+	def _indexCheck(self, table, name):
+		if name != table.primary and name not in table.indexes:
+			raise r.errors.ReqlOpFailedError('Index `%s` was not found on table `%s.%s`.' % (name, table.db, table.name))
+
+	# db term
+	def _DB(self, term, scope):
+		return _DB(self._args(term, scope)[0])
+
+	# table args method
+	def _tableArgs(self, term, scope):
+		lArgs = self._args(term, scope)
+		if lArgs and isinstance(lArgs[0], _DB):
+			return (lArgs[0].name, lArgs[1:])
+		return (self.db, lArgs)
+
+	# db get method
+	def _dbGet(self, name):
+		try:
+			return self.store.dbs[name]
+		except KeyError:
+			raise r.errors.ReqlOpFailedError('Database `%s` does not exist.' % name)
+
+	# table term
+	def _TABLE(self, term, scope):
+		sDB, lArgs = self._tableArgs(term, scope)
+		try:
+			oTable = self._dbGet(sDB)[lArgs[0]]
+		except KeyError:
+			raise r.errors.ReqlOpFailedError('Table `%s.%s` does not exist.' % (sDB, lArgs[0]))
+		return _Selection(oTable, list(oTable.records.values()), whole=True)
+
+	# get term
+	def _GET(self, term, scope):
+		lArgs = self._args(term, scope)
+		oTable = self._table(lArgs[0])
+		return _Single(oTable, lArgs[1], oTable.records.get(_freeze(lArgs[1])))
+
+	# get all term
+	def _GET_ALL(self, term, scope):
+		lArgs = self._args(term, scope)
+		dOpts = self._opts(term, scope)
+		oTable = self._table(lArgs[0])
+		sIndex = dOpts.get('index', oTable.primary)
+		self._indexCheck(oTable, sIndex)
+
+		# Find the documents with each key
+		lDocs = []
+		for mKey in lArgs[1:]:
+			if sIndex == oTable.primary:
+				if _freeze(mKey) in oTable.records:
+					lDocs.append(oTable.records[_freeze(mKey)])
+			else:
+				dKeys = oTable.index[sIndex].get(_freeze(mKey), {})
+				lDocs.extend([
+					oTable.records[k] for k in sorted(dKeys.keys(), key=_order)
+				])
+
+		# Return the selection
+		return _Selection(oTable, lDocs)
+
+	# between term
+	def _BETWEEN(self, term, scope):
+		lArgs = self._args(term, scope)
+		dOpts = self._opts(term, scope)
+		oTable = self._table(lArgs[0])
+		sIndex = dOpts.get('index', oTable.primary)
+		self._indexCheck(oTable, sIndex)
+
+		# Get the bounds
+		tLower = _order(lArgs[1])
+		tUpper = _order(lArgs[2])
+		bLeftOpen = dOpts.get('left_bound', 'closed') == 'open'
+		bRightClosed = dOpts.get('right_bound', 'open') == 'closed'
+
+		# Range check function
+		def fIn(key):
+			tKey = _order(key)
+			if tKey < tLower or (bLeftOpen and tKey == tLower):
+				return False
+			if tKey > tUpper or (not bRightClosed and tKey == tUpper):
+				return False
+			return True
+
+		# Find the documents in range
+		if sIndex == oTable.primary:
+			lDocs = [
+				d for d in self._items(lArgs[0]) \
+				if fIn(d[oTable.primary])
+			]
+		else:
+			seIn = set([
+				k for k,d in oTable.records.items() \
+				if [m for m in oTable.keys(sIndex, d) if fIn(m)]
+			])
+			lDocs = [
+				d for d in self._items(lArgs[0]) \
+				if _freeze(d[oTable.primary]) in seIn
+			]
+
+		# Return the selection
+		return _Selection(oTable, lDocs)
+
+	# docs method
+	def _docs(self, value):
+		if isinstance(value, _Single):
+			if value.doc is None:
+				return []
+			return [value.doc]
+		return list(self._items(value))
+
+	# insert term
+	def _INSERT(self, term, scope):
+		lArgs = self._args(term, scope)
+		dOpts = self._opts(term, scope)
+		oTable = self._table(lArgs[0])
+		mConflict = dOpts.get('conflict', 'error')
+		sPrimary = oTable.primary
+
+		# Get the documents
+		lDocs = isinstance(lArgs[1], dict) and [lArgs[1]] or self._items(lArgs[1])
+
+		# Go through each one
+		dRes = self._writeResult()
+		lChanges = []
+		lGenerated = []
+		for dNew in lDocs:
+
+			# Make sure it's an object
+			if not isinstance(dNew, dict):
+				self._writeError(dRes, 'Expected type OBJECT but found %s.' % type(dNew).__name__)
+				continue
+
+			# Copy it, and generate the primary key if it's missing
+			dNew = _resolve(deepcopy(dNew))
+			if sPrimary not in dNew:
+				dNew[sPrimary] = str(uuid4())
+				lGenerated.append(dNew[sPrimary])
+
+			# If there's no existing document, insert it
+			dOld = oTable.records.get(_freeze(dNew[sPrimary]))
+			if dOld is None:
+				oTable.store(dNew)
+				dRes['inserted'] += 1
+				lChanges.append({"old_val": None, "new_val": dNew})
+				continue
+
+			# Else, handle the conflict
+			if mConflict == 'replace':
+				pass
+			elif mConflict == 'update':
+				dNew = _merge(dOld, dNew)
+			elif isinstance(mConflict, _Function):
+				try:
+					dNew = _resolve(mConflict(dNew[sPrimary], dOld, dNew))
+				except r.errors.ReqlError as e:
+					self._writeError(dRes, e.message)
+					continue
+			else:
+				self._writeError(dRes, 'Duplicate primary key `%s`:\n%s\n%s' % (
+					sPrimary,
+					json.dumps(dOld, default=str),
+					json.dumps(dNew, default=str)
+				))
+				continue
+
+			# Store it
+			if dNew == dOld:
+				dRes['unchanged'] += 1
+			else:
+				oTable.store(dNew)
+				dRes['replaced'] += 1
+				lChanges.append({"old_val": dOld, "new_val": dNew})
+
+		# Return the result
+		if lGenerated:
+			dRes['generated_keys'] = lGenerated
+		if dOpts.get('return_changes'):
+			dRes['changes'] = deepcopy(lChanges)
+		return dRes
+
+	# update term
+	def _UPDATE(self, term, scope):
+		lArgs = self._args(term, scope, True)
+		dOpts = self._opts(term, scope)
+		oTable = self._table(lArgs[0])
+		sPrimary = oTable.primary
+		mPatch = self._val(lArgs[1])
+
+		# If it's a single document that doesn't exist, skip it
+		dRes = self._writeResult()
+		if isinstance(lArgs[0], _Single) and lArgs[0].doc is None:
+			dRes['skipped'] += 1
+
+		# Go through each document
+		lChanges = []
+		for dOld in self._docs(lArgs[0]):
+
+			# Generate the new version
+			try:
+				mChanges = mPatch
+				if isinstance(mPatch, _Function):
+					mChanges = mPatch(dOld)
+				if mChanges is None:
+					dRes['unchanged'] += 1
+					continue
+				dNew = _merge(dOld, mChanges)
+				if not isinstance(dNew, dict) or sPrimary not in dNew or _freeze(dNew[sPrimary]) != _freeze(dOld[sPrimary]):
+					raise r.errors.ReqlQueryLogicError('Primary key `%s` cannot be changed.' % sPrimary)
+			except r.errors.ReqlError as e:
+				self._writeError(dRes, e.message)
+				continue
+
+			# Store it
+			if dNew == dOld:
+				dRes['unchanged'] += 1
+			else:
+				oTable.store(deepcopy(dNew))
+				dRes['replaced'] += 1
+				lChanges.append({"old_val": dOld, "new_val": dNew})
+
+		# Return the result
+		if dOpts.get('return_changes'):
+			dRes['changes'] = deepcopy(lChanges)
+		return dRes
+
+	# replace term
+	def _REPLACE(self, term, scope):
+		lArgs = self._args(term, scope, True)
+		dOpts = self._opts(term, scope)
+		oTable = self._table(lArgs[0])
+		sPrimary = oTable.primary
+		mReplace = self._val(lArgs[1])
+
+		# Get the documents, a single one may not exist
+		if isinstance(lArgs[0], _Single):
+			lDocs = [(lArgs[0].key, lArgs[0].doc)]
+		else:
+			lDocs = [(d[sPrimary], d) for d in self._items(lArgs[0])]
+
+		# Go through each document
+		dRes = self._writeResult()
+		lChanges = []
+		for mKey,dOld in lDocs:
+
+			# Generate the new version
+			try:
+				mNew = mReplace
+				if isinstance(mReplace, _Function):
+					mNew = mReplace(dOld)
+				mNew = _resolve(mNew)
+				if mNew is not None and (not isinstance(mNew, dict) or sPrimary not in mNew or _freeze(mNew[sPrimary]) != _freeze(mKey)):
+					raise r.errors.ReqlQueryLogicError('Primary key `%s` cannot be changed.' % sPrimary)
+			except r.errors.ReqlError as e:
+				self._writeError(dRes, e.message)
+				continue
+
+			# If there's no new version, delete the document
+			if mNew is None:
+				if dOld is None:
+					dRes['skipped'] += 1
+				else:
+					oTable.remove(_freeze(mKey))
+					dRes['deleted'] += 1
+					lChanges.append({"old_val": dOld, "new_val": None})
+
+			# Else, if there was no document
+			elif dOld is None:
+				oTable.store(deepcopy(mNew))
+				dRes['inserted'] += 1
+				lChanges.append({"old_val": None, "new_val": mNew})
+
+			# Else, replace it
+			elif mNew == dOld:
+				dRes['unchanged'] += 1
+			else:
+				oTable.store(deepcopy(mNew))
+				dRes['replaced'] += 1
+				lChanges.append({"old_val": dOld, "new_val": mNew})
+
+		# Return the result
+		if dOpts.get('return_changes'):
+			dRes['changes'] = deepcopy(lChanges)
+		return dRes
+
+	# delete term
+	def _DELETE(self, term, scope):
+		lArgs = self._args(term, scope, True)
+		dOpts = self._opts(term, scope)
+		oTable = self._table(lArgs[0])
+
+		# If it's a single document that doesn't exist, skip it
+		dRes = self._writeResult()
+		if isinstance(lArgs[0], _Single) and lArgs[0].doc is None:
+			dRes['skipped'] += 1
+
+		# Remove each document
+		lChanges = []
+		for d in self._docs(lArgs[0]):
+			mKey = _freeze(d[oTable.primary])
+			if mKey in oTable.records:
+				oTable.remove(mKey)
+				dRes['deleted'] += 1
+				lChanges.append({"old_val": d, "new_val": None})
+
+		# Return the result
+		if dOpts.get('return_changes'):
+			dRes['changes'] = deepcopy(lChanges)
+		return dRes
+
+	# db create term
+	def _DB_CREATE(self, term, scope):
+		sName = self._args(term, scope)[0]
+		if sName in self.store.dbs:
+			raise r.errors.ReqlOpFailedError('Database `%s` already exists.' % sName)
+		self.store.dbs[sName] = {}
+		return {"dbs_created": 1, "config_changes": [{"old_val": None, "new_val": {"name": sName}}]}
+
+	# db drop term
+	def _DB_DROP(self, term, scope):
+		sName = self._args(term, scope)[0]
+		dTables = self._dbGet(sName)
+		del self.store.dbs[sName]
+		return {"dbs_dropped": 1, "tables_dropped": len(dTables)}
+
+	# db list term
+	def _DB_LIST(self, term, scope):
+		return sorted(self.store.dbs.keys())
+
+	# table config method
+	def _tableConfig(self, table):
+
+		# Replicas by tag are counted together, they're all this process
+		mReplicas = table.config.get('replicas', 1)
+		if isinstance(mReplicas, dict):
+			mReplicas = sum(mReplicas.values())
+
+		# Return the config as the server does
+		return {
+			"db": table.db,
+			"name": table.name,
+			"primary_key": table.primary,
+			"indexes": sorted(table.indexes.keys()),
+			"shards": [
+				{"primary_replica": "memory", "replicas": ["memory"] * mReplicas}
+				for i in range(table.config.get('shards', 1))
+			],
+			"durability": "hard",
+			"write_acks": "majority"
+		}
+
+	# table create term
+	def _TABLE_CREATE(self, term, scope):
+		sDB, lArgs = self._tableArgs(term, scope)
+		dOpts = self._opts(term, scope)
+		dTables = self._dbGet(sDB)
+		if lArgs[0] in dTables:
+			raise r.errors.ReqlOpFailedError('Table `%s.%s` already exists.' % (sDB, lArgs[0]))
+		dTables[lArgs[0]] = _Table(sDB, lArgs[0], dOpts.get('primary_key', 'id'), dOpts)
+		return {"tables_created": 1, "config_changes": [{"old_val": None, "new_val": self._tableConfig(dTables[lArgs[0]])}]}
+
+	# table drop term
+	def _TABLE_DROP(self, term, scope):
+		sDB, lArgs = self._tableArgs(term, scope)
+		dTables = self._dbGet(sDB)
+		if lArgs[0] not in dTables:
+			raise r.errors.ReqlOpFailedError('Table `%s.%s` does not exist.' % (sDB, lArgs[0]))
+		del dTables[lArgs[0]]
+		return {"tables_dropped": 1}
+
+	# table list term
+	def _TABLE_LIST(self, term, scope):
+		sDB = self._tableArgs(term, scope)[0]
+		return sorted(self._dbGet(sDB).keys())
+
+	# index create term
+	def _INDEX_CREATE(self, term, scope):
+		lArgs = self._args(term, scope)
+		dOpts = self._opts(term, scope)
+		oTable = self._table(lArgs[0])
+		if lArgs[1] in oTable.indexes:
+			raise r.errors.ReqlOpFailedError('Index `%s` already exists on table `%s.%s`.' % (lArgs[1], oTable.db, oTable.name))
+		oTable.indexAdd(lArgs[1], len(lArgs) > 2 and lArgs[2] or None, dOpts.get('multi', False), dOpts.get('geo', False))
+		return {"created": 1}
+
+	# index drop term
+	def _INDEX_DROP(self, term, scope):
+		lArgs = self._args(term, scope)
+		oTable = self._table(lArgs[0])
+		self._indexCheck(oTable, lArgs[1])
+		del oTable.indexes[lArgs[1]]
+		del oTable.index[lArgs[1]]
+		return {"dropped": 1}
+
+	# index list term
+	def _INDEX_LIST(self, term, scope):
+		return sorted(self._table(self._args(term, scope)[0]).indexes.keys())
+
+	# index status term
+	def _INDEX_STATUS(self, term, scope):
+		lArgs = self._args(term, scope)
+		oTable = self._table(lArgs[0])
+		lNames = lArgs[1:] or sorted(oTable.indexes.keys())
+		lRet = []
+		for sName in lNames:
+			if sName not in oTable.indexes:
+				raise r.errors.ReqlOpFailedError('Index `%s` was not found on table `%s.%s`.' % (sName, oTable.db, oTable.name))
+			lRet.append({
+				"index": sName,
+				"ready": True,
+				"multi": oTable.indexes[sName]['multi'],
+				"geo": oTable.indexes[sName]['geo'],
+				"outdated": False
+			})
+		return lRet
+
+	# index wait term
+	def _INDEX_WAIT(self, term, scope):
+		return self._INDEX_STATUS(term, scope)
+
+	# config term
+	def _CONFIG(self, term, scope):
+		mValue = self._args(term, scope)[0]
+		if isinstance(mValue, _DB):
+			return {"name": mValue.name}
+		return self._tableConfig(self._table(mValue))
+
+	# status term
+	def _STATUS(self, term, scope):
+		oTable = self._table(self._args(term, scope)[0])
+		return {
+			"db": oTable.db,
+			"name": oTable.name,
+			"status": {
+				"all_replicas_ready": True,
+				"ready_for_outdated_reads": True,
+				"ready_for_reads": True,
+				"ready_for_writes": True
+			}
+		}
+
+	# wait term
+	def _WAIT(self, term, scope):
+		return {"ready": 1}
+
+	# reconfigure term
+	def _RECONFIGURE(self, term, scope):
+		oTable = self._table(self._args(term, scope)[0])
+		dOpts = self._opts(term, scope)
+		dOld = self._tableConfig(oTable)
+		if not dOpts.get('dry_run'):
+			for k in ('shards', 'replicas', 'primary_replica_tag'):
+				if k in dOpts:
+					oTable.config[k] = dOpts[k]
+		return {
+			"reconfigured": 1,
+			"config_changes": [{"old_val": dOld, "new_val": self._tableConfig(oTable)}],
+			"status_changes": []
+		}
+
+	# rebalance term
+	def _REBALANCE(self, term, scope):
+		return {"rebalanced": 1, "status_changes": []}
+
+	# sync term
+	def _SYNC(self, term, scope):
+		return {"synced": 1}
+
+	# changes term
+	def _CHANGES(self, term, scope):
+		raise StorageException('not implemented', 'The memory engine does not support `changes`')
@@ -14,13 +14,38 @@ __email__		= "ouroboroscode@gmail.com"
 __created__		= "2017-06-18"
 
 # Import python modules
+from collections import deque
+from copy import deepcopy
 import json
+import gzip
 from hashlib import md5
+from itertools import islice
+import os
+from random import random
+import socket
 import sys
-from time import sleep
+import threading
+from time import sleep, time
+from uuid import uuid4
+
+# Python 3 renamed Queue
+try:
+	from queue import Queue
+except ImportError:
+	from Queue import Queue
+
+# Python 3 doesn't have basestring
+try:
+	basestring
+except NameError:
+	basestring = str
 
 # Include pip modules
 import rethinkdb as r
+try:
+	import xxhash
+except ImportError:
+	xxhash = None
 
 # Include local modules
 from . import Dictionaries as Dict
@@ -28,7 +53,36 @@ from .OS import print_error
 
 # Init module variables
 __mdServers = {}
+__mdPoolConf = {}
+__mdPools = {}
+__miPoolPid = os.getpid()
+__moPoolLock = threading.Lock()
+__mlPoolClears = []
 __msPrefix = ''
+__mfHasher = None
+__moSessions = threading.local()
+__mdInstrument = None
+__mdInstrumentStats = {}
+__moInstrumentLock = threading.Lock()
+
+# Default connection pool settings, all times are in seconds
+_POOL_DEFAULTS = {
+	"size": 10,			# The max number of connections open at once
+	"idle": 300,		# How long an unused connection is kept around
+	"lifetime": 3600,	# How long a connection lives before it's retired
+	"ping": 30,			# How long a connection can sit before it's checked
+	"timeout": 10		# How long to wait for a free connection
+}
+
+# The errors that mean a connection itself is broken, as opposed to the server
+#	refusing a query sent on it
+_CON_ERRORS = (r.errors.ReqlDriverError, r.errors.ReqlAvailabilityError, socket.error)
+
+# The upper bounds, in seconds, of the instrumentation duration buckets
+_INSTRUMENT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# The error returned when a revisioned document was updated by someone else
+_REV_CONFLICT = 'Document can not be updated because it is out of sync with the DB'
 
 # DB create function
 def db_create(name, server = 'default'):
@@ -120,19 +174,351 @@ def globalPrefix(v = None):
 	if not v:
 		return __msPrefix
 
-	# Else, store the new prefix
+	# Else, store the new prefix and forget any info generated with the old
+	#	one
 	else:
 		__msPrefix = v
+		Document._dInfoCache.clear()
+		_cachesRestart()
+
+# revision hash function
+def _revisionHash(s):
+	"""Revision Hash
+
+	The default revision hasher, uses xxHash if it's installed, else the first
+	64 bits of an MD5
+
+	Args:
+		s (str): The string to hash
+
+	Returns:
+		uint
+	"""
+
+	# Make sure we have bytes
+	if not isinstance(s, bytes):
+		s = s.encode('utf-8')
+
+	# If we have xxHash, use it
+	if xxhash:
+		return xxhash.xxh64(s).intdigest()
+
+	# Else, fall back to MD5
+	return int(md5(s).hexdigest()[:16], 16)
+
+# get/set revision hasher
+def revisionHasher(f = None):
+	"""Revision Hasher
+
+	Call with no arguments to get the current function used to hash document
+	fields for revisions, call with an argument to set the function to the
+	argument
+
+	Args:
+		f (callable): Takes a string and returns an unsigned 64 bit int
+
+	Returns:
+		None|callable
+	"""
+
+	# Pull in the global var
+	global __mfHasher
+
+	# If nothing was passed
+	if not f:
+		return __mfHasher or _revisionHash
+
+	# Else, store the new hasher
+	else:
+		__mfHasher = f
+
+# instrument function
+def instrument(on=True, hook=None, slow=None, sample=0, size=False):
+	"""Instrument
+
+	Turns on, or off, instrumentation of every query run through a pooled
+	connection, by Storage or AsyncStorage. Each query is recorded as a dict
+	with the table, the operation, the duration in seconds, the rows
+	returned, the size of those rows as JSON if size is set, else None, and,
+	if it was sampled, the server's profile. The records are added to the
+	histograms returned by instrumentStats() and passed to the hook. Queries
+	returning cursors are recorded once the cursor is exhausted or closed,
+	with the time spent waiting on it
+
+	Args:
+		on (bool): Set to false to turn instrumentation off
+		hook (callable): Called with each record
+		slow (float): The seconds after which a query is logged as slow
+		sample (float): The fraction of queries, from 0 to 1, to run with
+			profile=True so the server's timings can be captured
+		size (bool): If true the rows are converted to JSON to measure them,
+			which costs about as much as the driver decoding them did
+
+	Returns:
+		None
+	"""
+
+	# Pull in the global var
+	global __mdInstrument
+
+	# If we're turning it off
+	if not on:
+		__mdInstrument = None
+
+	# Else, store the settings
+	else:
+		__mdInstrument = {
+			"hook": hook,
+			"slow": slow,
+			"sample": sample,
+			"size": size
+		}
+
+# instrument begin function
+def _instrumentBegin(term, optargs, conf):
+	"""Instrument Begin
+
+	Creates the record of a query about to be run, and if it was picked to be
+	profiled, asks the server for the profile
+
+	Args:
+		term (rethinkdb.ast.RqlQuery): The query
+		optargs (dict): The global options passed to run(), changed in place
+		conf (dict): The instrumentation settings, see instrument()
+
+	Returns:
+		tuple: The record, and whether the profile was added to the options
+	"""
+
+	# Init the record, bytes are only counted if they were asked for
+	sTable, sOp = _termInfo(term)
+	dRecord = {
+		"table": sTable,
+		"op": sOp,
+		"duration": 0.0,
+		"rows": 0,
+		"bytes": 0 if conf['size'] else None,
+		"profile": None,
+		"error": None
+	}
+
+	# If the query was picked to be profiled, and the caller didn't ask for it
+	#	themselves
+	bProfile = False
+	if not optargs.get('profile') and _instrumentSample(conf['sample']):
+		optargs['profile'] = True
+		bProfile = True
+
+	# Return the record and whether we asked for the profile
+	return (dRecord, bProfile)
+
+# instrument bytes function
+def _instrumentBytes(record, value):
+	"""Instrument Bytes
+
+	Adds the size of a result as JSON to the record if bytes are being
+	counted, setting it to None if the result can't be converted, e.g.
+	grouped results keyed by tuples
+
+	Args:
+		record (dict): The record of the query
+		value (mixed): The result, or a single row of it
+
+	Returns:
+		None
+	"""
+	if record['bytes'] is not None:
+		try:
+			record['bytes'] += len(json.dumps(value, default=str))
+		except Exception:
+			record['bytes'] = None
+
+# instrument end function
+def _instrumentEnd(record, term, res, profile, cursor):
+	"""Instrument End
+
+	Handles the result of a query once the server has answered, recording it,
+	or if it's a cursor, wrapping it so it's recorded once it's done
+
+	Args:
+		record (dict): The record of the query
+		term (rethinkdb.ast.RqlQuery): The query
+		res (mixed): The result
+		profile (bool): If the profile was asked for by _instrumentBegin()
+		cursor (class): The class used to wrap cursors
+
+	Returns:
+		mixed
+	"""
+
+	# If we asked for the profile, pull it out of the result
+	if profile:
+		record['profile'] = res['profile']
+		res = res['value']
+
+	# If we got a cursor, it will record the query once it's done
+	if isinstance(res, r.net.Cursor):
+		return cursor(res, record, term)
+
+	# Count the rows and bytes and record the query
+	if isinstance(res, list):
+		record['rows'] = len(res)
+	elif res is not None:
+		record['rows'] = 1
+	_instrumentBytes(record, res)
+	_instrumentRecord(record, term)
+
+	# Return the result
+	return res
+
+# instrumented function
+def _instrumented(con, wrapper=None):
+	"""Instrumented
+
+	Wraps the connection so its queries are recorded if instrumentation is
+	on, else returns it as is
+
+	Args:
+		con (rethinkdb.net.Connection): The connection to wrap
+		wrapper (class): The class used to wrap it, defaults to
+			_InstrumentedConnection
+
+	Returns:
+		rethinkdb.net.Connection|_InstrumentedConnection
+	"""
+
+	# If instrumentation is off, return the connection as is
+	if not __mdInstrument:
+		return con
+
+	# Return the wrapped connection
+	return (wrapper or _InstrumentedConnection)(con, __mdInstrument)
+
+# instrument record function
+def _instrumentRecord(record, term):
+	"""Instrument Record
+
+	Adds the record of a query to the histograms, logs it if it's slow, and
+	passes it to the hook
+
+	Args:
+		record (dict): The record of the query
+		term (rethinkdb.ast.RqlQuery): The query
+
+	Returns:
+		None
+	"""
+
+	# Get the settings, if instrumentation was turned off since the query
+	#	started, do nothing
+	dConf = __mdInstrument
+	if not dConf:
+		return
+
+	# Find the bucket for the duration
+	iBucket = len(_INSTRUMENT_BUCKETS)
+	for i in range(len(_INSTRUMENT_BUCKETS)):
+		if record['duration'] <= _INSTRUMENT_BUCKETS[i]:
+			iBucket = i
+			break
+
+	# Add the record to the stats for the table and operation
+	with __moInstrumentLock:
+		dTable = __mdInstrumentStats.setdefault(record['table'], {})
+		if record['op'] not in dTable:
+			dTable[record['op']] = {
+				"count": 0,
+				"errors": 0,
+				"seconds": 0.0,
+				"rows": 0,
+				"bytes": 0,
+				"buckets": [0] * (len(_INSTRUMENT_BUCKETS) + 1)
+			}
+		dStats = dTable[record['op']]
+		dStats['count'] += 1
+		dStats['seconds'] += record['duration']
+		dStats['rows'] += record['rows']
+		if record['bytes'] is not None:
+			dStats['bytes'] += record['bytes']
+		dStats['buckets'][iBucket] += 1
+		if record['error']:
+			dStats['errors'] += 1
+
+	# If the query was slow, log it, but don't let printing it break the
+	#	query
+	if dConf['slow'] is not None and record['duration'] >= dConf['slow']:
+		try:
+			sTerm = str(term)[:500]
+		except Exception:
+			sTerm = '?'
+		print_error('Storage slow query on "%s" (%s) took %.3fs: %s' % (
+			record['table'], record['op'], record['duration'], sTerm
+		))
+
+	# If there's a hook, pass it the record, but don't let it break the query
+	if dConf['hook']:
+		try:
+			dConf['hook'](record)
+		except Exception as e:
+			print_error('Storage instrument hook failed: %s' % str(e))
+
+# instrument stats function
+def instrumentStats(reset=False):
+	"""Instrument Stats
+
+	Returns the stats collected since instrumentation was turned on, by table
+	and then by operation. Each has the count, errors, total seconds, rows,
+	and bytes, if instrument() was asked to measure them, and the count of queries in each duration bucket, the upper
+	bounds of which are in _INSTRUMENT_BUCKETS, the last bucket holding
+	everything slower
+
+	Args:
+		reset (bool): If true the stats are cleared after being returned
+
+	Returns:
+		dict
+	"""
+
+	# Pull in the global var
+	global __mdInstrumentStats
+
+	# Copy the stats, and clear them if requested
+	with __moInstrumentLock:
+		dRet = deepcopy(__mdInstrumentStats)
+		if reset:
+			__mdInstrumentStats = {}
+
+	# Return the copy
+	return dRet
+
+# instrument sample function
+def _instrumentSample(rate):
+	"""Instrument Sample
+
+	Returns True if the next query should be profiled
+
+	Args:
+		rate (float): The fraction of queries to profile
+
+	Returns:
+		bool
+	"""
+	return rate > 0 and random() < rate
 
 # server function
-def server(name, details, update=False):
+def server(name, details, update=False, pool=None):
 	"""Server
 
 	Adds a server to the list so that we can use it with Tables
 
 	Args:
 		name (str): Will be used to store the details
-		details (dict): The credentials necessary to connect to the server
+		details (dict): The credentials necessary to connect to the server,
+			or {"engine": "memory"} to keep the DBs in process, see
+			MemoryStorage
+		update (bool): Overwrite the details if the name already exists
+		pool (dict): Optional connection pool settings, any of 'size',
+			'idle', 'lifetime', 'ping', and 'timeout', see _POOL_DEFAULTS
 
 	Returns:
 		bool
@@ -144,12 +530,56 @@ def server(name, details, update=False):
 		# Store the details under the name
 		__mdServers[name] = details
 
+		# Store the pool settings merged with the defaults
+		__mdPoolConf[name] = Dict.merge(dict(_POOL_DEFAULTS), pool or {})
+
+		# Close any pool still using the old details
+		_poolClear(name)
+
+		# Forget any info that might point to the old details, and reload any
+		#	cache using them
+		Document._dInfoCache.clear()
+		_cachesRestart(name)
+
 		# Return that the details were stored
 		return True
 
 	# We did nothing, return False
 	return False
 
+# caches restart function
+def _cachesRestart(server=None):
+	"""Caches Restart
+
+	Replaces running Document caches with new ones using fresh info, so they
+	follow changes to the global prefix or to a server's details
+
+	Args:
+		server (str): Only restart the caches on this server, None for all
+
+	Returns:
+		None
+	"""
+
+	# Go through each running cache
+	for tKey,oCache in list(Document._dCaches.items()):
+
+		# If it's on another server, leave it alone
+		if server is not None and oCache.info['server'] != server:
+			continue
+
+		# Rebuild the DB info from the key
+		dDB = {}
+		if tKey[1] is not None:
+			dDB['server'] = tKey[1]
+		if tKey[2] is not None:
+			dDB['postfix'] = tKey[2]
+
+		# Stop the old cache and start a new one
+		oCache.stop()
+		Document._dCaches[tKey] = _Cache(tKey[0].info(dDB), oCache.retry)
+		Document._dCaches[tKey].start()
+
 # connection function
 def _connection(server, errcnt=0):
 	"""Connection
@@ -170,6 +600,11 @@ def _connection(server, errcnt=0):
 	if server not in __mdServers:
 		raise ValueError('%s: no such server "%s"' % (sys._getframe().f_code.co_name, str(server)))
 
+	# If the server is kept in memory, return a connection to its store
+	if __mdServers[server].get('engine') == 'memory':
+		from .MemoryStorage import Connection
+		return Connection(server, __mdServers[server])
+
 	# Try to make a new connection
 	try:
 		oCon = r.connect(**__mdServers[server])
@@ -191,975 +626,5144 @@ def _connection(server, errcnt=0):
 	# Return the connection
 	return oCon
 
-# connect_with class
-class connect_with(object):
-	"""Connect With
-
-	Used in conjunction with the python keyword "with" in order to make sure
-	open connections are closed when the client is done with it
+# server details function
+def _server(name):
+	"""Server
 
-	Extends: object
-	"""
+	Returns the details and pool settings stored for a server using server()
 
-	# constructor
-	def __init__(self, server):
-		self.con = _connection(server)
+	Args:
+		name (str): A name representing details stored using server()
 
-	# __enter__ magic method
-	def __enter__(self):
-		return self.con
+	Returns:
+		tuple: The details and the pool settings
 
-	# __exit__ magic method
-	def __exit__(self, exc_type, exc_value, traceback):
-		self.con.close()
-		if exc_type is not None:
-			return False
+	Raises:
+		ValueError
+	"""
 
-# StorageException class
-class StorageException(Exception):
-	"""Storage Exception
+	# If we can't find the server in the list
+	if name not in __mdServers:
+		raise ValueError('%s: no such server "%s"' % (sys._getframe().f_code.co_name, str(name)))
 
-	Used when critical errors happen in the Storage module
+	# Return the details and settings
+	return (__mdServers[name], __mdPoolConf[name])
 
-	Extends: Exception
-	"""
-	pass
+# session connection function
+def _sessionCon(server):
+	"""Session Connection
 
-# Document class
-class Document(object):
-	"""Table
+	Returns the connection pinned to the server by a session open in the
+	current thread, if there is one
 
-	Handles all interaction with RethinkDB tables
+	Args:
+		server (str): A name representing details stored using server()
 
-	Extends: object
+	Returns:
+		rethinkdb.net.Connection|None
 	"""
 
-	# constructor
-	def __init__(self, data={}, db={}):
-		"""Constructor
-
-		Initialises the instance and returns it
+	# Look for a session on the server
+	try:
+		dSession = __moSessions.servers[server]
+	except (AttributeError, KeyError):
+		return None
 
-		Args:
-			data (dict): The current state of the record
-			db (dict): Optional DB info
-				'server' for the name of the host info passed to server()
-				'postfix' for the postfix added to the DB name
+	# If it was opened before the process forked, the socket belongs to the
+	#	parent
+	if dSession['pid'] != os.getpid():
+		return None
 
-		Returns:
-			Table
+	# Return the connection
+	return dSession['con']
 
-		Raises:
-			StorageException
-		"""
+# session enter function
+def _sessionEnter(server):
+	"""Session Enter
 
-		# Get the info
-		self.__dInfo = self.info(db)
+	Pins a connection to the server for the current thread, or if one is
+	already pinned, notes that one more session is using it
 
-		# If the data isn't empty
-		if data:
+	Args:
+		server (str): A name representing details stored using server()
 
-			# Validate it
-			if not self.__dInfo['tree'].valid(data):
-				raise ValueError("%s: %s" % (
-					self.__dInfo['tree'].validation_fail_name,
-					self.__dInfo['tree'].validation_fail_value
-				))
+	Returns:
+		rethinkdb.net.Connection
 
-		# Store the data
-		self._dData = self.__dInfo['tree'].clean(data)
-		self._dChanged = {}
+	Raises:
+		ValueError
+	"""
 
-	def __contains__(self, field):
-		"""Contains (__contains__)
+	# Get the sessions for the current thread
+	try:
+		dSessions = __moSessions.servers
+	except AttributeError:
+		dSessions = __moSessions.servers = {}
+
+	# If there's no usable session on the server, borrow a connection
+	if server not in dSessions or dSessions[server]['pid'] != os.getpid():
+		oPool = _pool(server)
+		dSessions[server] = {
+			'pool': oPool,
+			'con': oPool.get(),
+			'pid': os.getpid(),
+			'count': 0,
+			'failed': False
+		}
 
-		Returns true if the string exists as a key in the Document
+	# Increase the count and return the connection
+	dSessions[server]['count'] += 1
+	return dSessions[server]['con']
 
-		Args:
-			field (str): The field to check for
+# session exit function
+def _sessionExit(server, failed):
+	"""Session Exit
 
-		Returns:
-			bool
-		"""
-		return field in self._dData
+	Notes that a session on the server is done, and if it was the last one
+	returns the pinned connection to the pool
 
-	def __delitem__(self, field):
-		"""Delete Item (__delitem__)
+	Args:
+		server (str): A name representing details stored using server()
+		failed (bool): True if the session ended with an error
 
-		Removes a specific field from a record and flags the entire document
-		as needing to be updated
+	Returns:
+		None
+	"""
 
-		Args:
-			field (str): The field to delete
+	# Get the session
+	dSessions = __moSessions.servers
+	dSession = dSessions[server]
 
-		Returns:
-			None
-		"""
-		self.d(field);
+	# If any level failed, the connection can't be trusted
+	if failed:
+		dSession['failed'] = True
 
-	def __getitem__(self, field):
-		"""Get Item (__getitem__)
+	# If this wasn't the last one, we're done
+	dSession['count'] -= 1
+	if dSession['count']:
+		return
 
-		Returns a specific field from the document
+	# Remove the session and return the connection, unless it belongs to the
+	#	parent of a fork
+	del dSessions[server]
+	if dSession['pid'] == os.getpid():
+		dSession['pool'].put(dSession['con'], dSession['failed'])
 
-		Args:
-			field (str): The field to get
+# changed data function
+def _changedData(changed, data):
+	"""Changed Data
 
-		Returns:
-			mixed
-		"""
-		return self.g(field)
+	Returns the current values of the fields in a document's changes, as
+	stored by Document._change(), as plain data that can be sent with insert.
+	Values wrapped in r.literal() are taken from the data, and removed fields
+	are left out as insert can't remove them
 
-	def __setitem__(self, field, value):
-		"""Set Item (__setitem__)
+	Args:
+		changed (dict): The changes
+		data (dict): The document's data
 
-		Sets a specific key in the dict
+	Returns:
+		dict
+	"""
 
-		Args:
-			field (str): The field to set
-			value (mixed): The value to set to the field
+	# Go through each changed field still in the data
+	dRet = {}
+	for k,v in changed.items():
+		if k not in data:
+			continue
 
-		Returns:
-			None
-		"""
-		self.s(field, value)
+		# If it's a dict of nested changes, recurse, else take the value
+		if isinstance(v, dict) and isinstance(data[k], dict):
+			dRet[k] = _changedData(v, data[k])
+		else:
+			dRet[k] = data[k]
 
-	def __str__(self):
-		"""Str (__str__)
+	# Return the data
+	return dRet
 
-		Returns a string representation of the document
+# NDJSON open function
+def _ndjsonOpen(path, mode, compress=None):
+	"""NDJSON Open
 
-		Returns:
-			str
-		"""
-		return str(self._dData)
+	Opens a newline delimited JSON file in binary mode, gzipped if compress is
+	true, or if it's None and the path ends in .gz
 
-	# revision protected method
-	def _revision(self, init=False):
-		"""Revision
+	Args:
+		path (str): The path of the file
+		mode (str): 'rb' or 'wb'
+		compress (bool): If the file is gzipped
 
-		Creates or updates the revision number of the instance
+	Returns:
+		file
+	"""
 
-		Args:
-			init (bool): Initialises the revision value
-				Defaults to false, set to True for a new revision value
+	# If we weren't told, go by the extension
+	if compress is None:
+		compress = path[-3:] == '.gz'
 
-		Returns:
-			bool
+	# Open the file
+	if compress:
+		return gzip.open(path, mode)
+	else:
+		return open(path, mode)
 
-		Raises:
-			StorageException
-		"""
+# broken function
+def _broken(exc_type):
+	"""Broken
 
-		# If we need a new value
-		if init:
+	Returns whether an exception raised while a connection was in use means
+	the connection itself can no longer be trusted. Errors the server sends
+	back about a query, a duplicate key, a missing index, a revision conflict,
+	leave the connection perfectly usable
 
-			# Make sure the revision itself is not in the value
-			if '_rev' in self._dData:
-				del self._dData['_rev']
+	Args:
+		exc_type (type): The class of the exception raised, or None
 
-			# Generate and set the revision
-			self._dData['_rev'] = '1-%s' % md5(json.dumps(self._dData)).hexdigest()
+	Returns:
+		bool
+	"""
 
-			# Return OK
-			return True
+	# If there was no exception, or a generator was closed early
+	if exc_type is None or issubclass(exc_type, GeneratorExit):
+		return False
 
-		# Else we are updating the old value
-		else:
+	# The driver makes the op failed error an availability error, but it's
+	#	also what the server uses to report missing tables and indexes
+	if issubclass(exc_type, r.errors.ReqlOpFailedError):
+		return False
 
-			# Pull out the old revision
-			sOldRev = self._dData['_rev']
-			del self._dData['_rev']
+	# Driver, availability, and socket errors mean the connection is bad
+	return issubclass(exc_type, _CON_ERRORS)
 
-			# Split it into version and hash
-			sVer, sHash = sOldRev.split('-')
+# pool function
+def _pool(server):
+	"""Pool
 
-			# Generate the hash part of the revision
-			sMD5 = md5(json.dumps(self._dData)).hexdigest()
+	Fetches the connection pool for the given server, creating it if it
+	doesn't exist yet. If the process has been forked since the pools were
+	created they are thrown away, without closing, as the sockets belong to the
+	parent
 
-			# If the MD5s have changed
-			if sHash != sMD5:
-
-				# Generate the new revision
-				self._dData['_rev'] = '%d-%s' % (int(sVer)+1, sMD5)
+	Args:
+		server (str): A name representing details stored using server()
 
-				# Add the _rev field as changed if it isn't already
-				if self._dChanged != True:
-					self._dChanged['_rev'] = True
+	Returns:
+		_Pool
 
-				# Return OK
-				return True
+	Raises:
+		ValueError
+	"""
 
-			# Nothing changed
-			return False
+	# If we're in a forked child, start fresh
+	_poolFork()
 
-	def d(self, field):
-		"""D (delete)
+	# Try to return the existing pool
+	try:
+		return __mdPools[server]
+	except KeyError:
+		pass
 
-		Unlike the static delete which is used delete a record by ID, this
-		delete removes a field within the document
+	# If we can't find the server in the list
+	if server not in __mdServers:
+		raise ValueError('%s: no such server "%s"' % (sys._getframe().f_code.co_name, str(server)))
 
-		Args:
-			Args:
-			field (str): The name of the field to return, or None for the entire
-				document
+	# Create the pool if no one beat us to it
+	with __moPoolLock:
+		if server not in __mdPools:
+			__mdPools[server] = _Pool(server, __mdPoolConf[server])
+		return __mdPools[server]
 
-		Returns:
-			self for chaining
+# pool clear function
+def _poolClear(server):
+	"""Pool Clear
 
-		Raise:
-			KeyError: field doesn't exist
-		"""
+	Removes the pool for the given server and closes all its idle connections.
+	Connections currently borrowed are closed when they are returned. Pools
+	inherited from the parent of a fork are dropped without being closed
 
-		# If the field doesn't exists in the document
-		if field not in self._dData:
-			raise KeyError(field)
+	Args:
+		server (str): A name representing details stored using server()
 
-		# Remove the field from the document
-		del self._dData[field]
+	Returns:
+		None
+	"""
 
-		# Flag the entire document as needing to be updated
-		self._dChanged = True
+	# If we're in a forked child, the pools aren't ours to close
+	_poolFork()
 
-		# Return ok
-		return self
+	# Remove the pool and close it if there was one
+	oPool = __mdPools.pop(server, None)
+	if oPool:
+		oPool.close()
 
-	# del method
-	def delete(self):
-		"""Delete
+	# Let any other pools, e.g. AsyncStorage's, clear theirs
+	for f in __mlPoolClears:
+		f(server)
 
-		Deletes the record represented by the instance
+# pool clear add function
+def _poolClearAdd(f):
+	"""Pool Clear Add
 
-		Returns:
-			bool
+	Adds a function to be called with the server name whenever _poolClear() is,
+	used by modules keeping their own pools so they also let go of
+	connections made with old details
 
-		Raises:
-			StorageException
-		"""
+	Args:
+		f (callable): The function to add
 
-		# If the instance lacks a primary key
-		if self.__dInfo['conf']['primary'] not in self._dData:
-			raise StorageException('Can not delete document with no primary key')
+	Returns:
+		None
+	"""
+	if f not in __mlPoolClears:
+		__mlPoolClears.append(f)
 
-		# Fetch the DB connection
-		with connect_with(self.__dInfo['server']) as oCon:
+# pool fork function
+def _poolFork():
+	"""Pool Fork
 
-			# Try to delete the record by its primary key
-			dRes = r \
-				.db(self.__dInfo['db']) \
-				.table(self.__dInfo['tree']._name) \
-				.get(self._dData[self.__dInfo['conf']['primary']]) \
-				.delete() \
-				.run(oCon)
+	If the process has been forked since the pools were created, throws them
+	away without closing them, as the sockets belong to the parent
 
-			# If there was an error
-			if dRes['deleted'] != 1:
-				return False
+	Returns:
+		None
+	"""
 
-			# Remove the ID
-			del self._dData[self.__dInfo['conf']['primary']]
+	# Pull in the global vars
+	global __mdPools, __miPoolPid, __moPoolLock
 
-		# Return ok
-		return True
+	# If we're in a forked child, start fresh
+	if os.getpid() != __miPoolPid:
+		__mdPools = {}
+		__miPoolPid = os.getpid()
+		__moPoolLock = threading.Lock()
 
-	# delete get method
-	@classmethod
-	def deleteGet(cls, _id, index=None, db={}):
-		"""Delete Get
+# index fields function
+def _indexFields(name, fields):
+	"""Index Fields
 
-		Deletes one or many documents by ID or by index
+	Returns the list of fields that make up an index declared in a Tree's
+	config, or None if the index isn't made up of simple fields
 
-		Args:
-			_id (mixed|mixed[]): The ID or IDs to delete, None for all documents
-			index (str): If set, used as the index to search instead of the
-				primary key
-			db (dict): Optional DB info
-				'server' for the name of the host info passed to server()
-				'postfix' for the postfix added to the DB name
+	Args:
+		name (str): The name of the index
+		fields (None|str|str[]|dict): The fields declared for the index
 
-		Return:
-			uint: the number of records deleted
+	Returns:
+		str[]|None
+	"""
 
-		Raises:
-			StorageException
-		"""
+	# If it's a dict with options
+	if isinstance(fields, dict):
 
-		# Get the config values associated with the Tree
-		dInfo = cls.info(db)
+		# Multi and geo indexes don't match the values of their fields
+		if fields.get('multi') or fields.get('geo'):
+			return None
 
-		# If there is an index passed
-		if index:
+		# Else, use the fields
+		return _indexFields(name, fields.get('fields'))
 
-			# If the index doesn't exist
-			if index not in dInfo['conf']['indexes']:
-				raise StorageException('no index', index, 'tree')
+	# If there's no field, the name is the field
+	if not fields:
+		return [name]
 
-		# Get a connection to the server
-		with connect_with(dInfo['server']) as oCon:
+	# Else if it's a string
+	elif isinstance(fields, basestring):
+		return [fields]
 
-			# Create a cursor for all records
-			oCur = r \
-				.db(dInfo['db']) \
-				.table(dInfo['tree']._name) \
+	# Else if it's a list
+	elif isinstance(fields, (tuple,list)):
+		return list(fields)
 
-			# If all records must be returned, we don't need to modify the
-			#	cursor any further
-			if _id == None:
-				pass
+	# Else, we can't use it
+	return None
 
-			# Else, if there's an index
-			elif index:
+# term info function
+def _termInfo(term):
+	"""Term Info
 
-				# Continue to filter using get all
-				oCur = oCur.get_all(_id, index=index)
+	Walks down the query to find the table it runs on and the operation it
+	does. Writes and aggregations are reported as such, anything else by how
+	the table is selected from, e.g. get, get_all, between
 
-			# Else, we are dealing with the primary key
-			else:
+	Args:
+		term (rethinkdb.ast.RqlQuery): The query
 
-				# If we got multiple IDs
-				if isinstance(_id, (tuple,list)):
+	Returns:
+		tuple: The table name, or None, and the operation
+	"""
 
-					# Continue to filter using get all
-					oCur = oCur.get_all(_id)
+	# Follow the first argument of each term down to the table
+	lChain = []
+	oTerm = term
+	while isinstance(oTerm, r.ast.RqlQuery):
+		lChain.append(getattr(oTerm, 'st', type(oTerm).__name__))
+		if isinstance(oTerm, r.ast.Table):
+			break
+		if not oTerm._args:
+			break
+		oTerm = oTerm._args[0]
+
+	# If we found the table, get its name
+	sTable = None
+	if isinstance(oTerm, r.ast.Table):
+		sTable = getattr(oTerm._args[-1], 'data', None)
+
+	# If there's a write, that's the operation
+	for s in lChain:
+		if s in ('insert', 'update', 'replace', 'delete'):
+			return (sTable, s)
+
+	# If the query ends in an aggregation, that's the operation
+	if lChain[0] in ('count', 'sum', 'avg', 'min', 'max', 'distinct', 'group', 'ungroup'):
+		return (sTable, lChain[0])
+
+	# Else, use the term applied to the table, or the only term
+	if sTable is not None and len(lChain) > 1:
+		return (sTable, lChain[-2])
+	return (sTable, lChain[0])
+
+# _Pool class
+class _Pool(object):
+	"""Pool
+
+	A bounded, thread safe, pool of connections to a single server. Idle
+	connections are reused most recently used first, retired once they've
+	been idle or alive too long, and checked against the server before being
+	handed out if they've been sitting for a while
 
-				# Else we want one record
-				else:
+	Extends: object
+	"""
 
-					# Filter to a single ID
-					oCur = oCur.get(_id)
+	# constructor
+	def __init__(self, server, conf):
+		"""Constructor
 
-			# Run the delete
-			dRes = oCur.delete().run(oCon)
+		Initialises the instance and returns it
 
-			# Return the number of documents deleted
-			return dRes['deleted']
+		Args:
+			server (str): A name representing details stored using server()
+			conf (dict): The pool settings, see _POOL_DEFAULTS
 
-	# exists static method
-	@classmethod
-	def exists(cls, _id, index=None, db={}):
-		"""Exists
+		Returns:
+			_Pool
+		"""
+		self.server = server
+		self.conf = conf
+		self.pid = os.getpid()
+		self.closed = False
+		self.cond = threading.Condition(threading.Lock())
+		self.idle = deque()
+		self.created = {}
+		self.count = 0
 
-		Checkes if the specifed document exists. Set an index to check for
-		something other than the primary key. To check if a record exists with
-		any non-indexed fields, use filter() instead
+	# close method
+	def close(self):
+		"""Close
 
-		Args:
-			_id (mixed): The value or values to check
-				In the case of a primary key this is always a single value, but
-				for complex indexes a tuple may be passed
-			index (str): If set, used as the index to search instead of the
-				primary key
-			db (dict): Optional DB info
-				'server' for the name of the host info passed to server()
-				'postfix' for the postfix added to the DB name
+		Marks the pool as closed and closes all idle connections
 
 		Returns:
-			bool
-
-		Raises:
-			StorageException
+			None
 		"""
 
-		# Get the primary key, it's the only thing we need
-		dInfo = cls.info(db)
-
-		# Use get to save repeating ourselves
-		if not cls.get(_id, index=index, raw=[dInfo['conf']['primary']], db=db):
+		# Mark the pool closed and take the idle connections
+		with self.cond:
+			self.closed = True
+			lCons = [t[0] for t in self.idle]
+			self.idle.clear()
+			self.count -= len(lCons)
+			for oCon in lCons:
+				self.created.pop(id(oCon), None)
+			self.cond.notify_all()
+
+		# Close them outside of the lock
+		for oCon in lCons:
+			self._close(oCon)
+
+	# close static method
+	@staticmethod
+	def _close(con):
+		"""Close
 
-			# If absolutely nothing was found, return failure
-			return False
+		Closes a single connection, ignoring any errors as the connection is
+		being thrown away anyway
 
-		# If one or more primary keys were returned, return success
-		return True
+		Args:
+			con (rethinkdb.net.DefaultConnection): The connection to close
 
-	# filter static method
-	@classmethod
-	def filter(cls, obj, raw=None, orderby=None, db={}):
-		"""Filter
+		Returns:
+			None
+		"""
+		try:
+			con.close(noreply_wait=False)
+		except Exception:
+			pass
 
-		Finds records based on the specific fields and values passed in the obj
+	# get method
+	def get(self):
+		"""Get
 
-		Args:
-			obj (dict): A dictionary of field names to the values they should
-				match
-			raw (bool|list): If set to true, raw dicts will be returned instead
-				of Document instances. If set to a list or tuple, only those
-				fields listed will be returned
-			orderby (str|str[]): The field(s) to order the result by
-			db (dict): Optional DB info
-				'server' for the name of the host info passed to server()
-				'postfix' for the postfix added to the DB name
+		Borrows a connection from the pool, opening a new one if there are no
+		idle connections and the pool isn't full, else waiting for one to be
+		returned
 
 		Returns:
-			Table[]|dict[]
+			rethinkdb.net.DefaultConnection
 
 		Raises:
 			StorageException
 		"""
 
-		# Get the info
-		dInfo = cls.info(db)
+		# Calculate the point at which we give up waiting
+		fDeadline = time() + self.conf['timeout']
 
-		# Clean the object
-		obj = dInfo['tree'].clean(obj)
+		# Loop until we have a usable connection
+		while True:
 
-		# Fetch the DB connection
-		with connect_with(sServer) as oCon:
+			# Init the list of connections to throw away
+			lDead = []
 
-			# Generate the request
-			oCur = r \
-				.db(dInfo['db']) \
-				.table(dInfo['tree']._name) \
-				.filter(obj)
+			with self.cond:
 
-			# If a raw request was done with specific fields
-			if isinstance(raw, (tuple,list)):
-				oCur = oCur.pluck(*raw).default(None)
+				# Loop until we find a connection, or have room for a new one
+				while True:
 
-			# If an order by list was sent
-			if isinstance(orderby, (tuple,list)):
-				oCur = oCur.order_by(*orderby)
-			# Else if an order field was sent
-			elif isinstance(orderby, basestring):
-				oCur = oCur.order_by(orderby)
+					# Get the current time
+					fNow = time()
 
-			# Run the request
-			itRes = oCur.run(oCon)
+					# Retire the oldest idle connections if they've expired
+					while self.idle and fNow - self.idle[0][1] > self.conf['idle']:
+						lDead.append(self._forget(self.idle.popleft()[0]))
 
-			# If there's no data
-			if not itRes:
-				return []
+					# If there's an idle connection
+					if self.idle:
 
-			# If Raw requested, return as is
-			if raw:
-				return [d for d in itRes]
+						# Take the most recently used one
+						oCon, fLast = self.idle.pop()
 
-			# Else create instances for each
-			else:
-				return [cls(d, db) for d in itRes]
+						# If it's closed or too old, throw it away and keep
+						#	looking
+						if not oCon.is_open() or \
+							fNow - self.created[id(oCon)] > self.conf['lifetime']:
+							lDead.append(self._forget(oCon))
+							continue
 
-	# g method
-	def g(self, field=None, default=None):
-		"""G (get)
+						# Note if it's been sitting long enough to be checked
+						bCheck = fNow - fLast > self.conf['ping']
+						break
 
-		Unlike the static get which is used to fetch by ID, this get returns
-		fields within the document
+					# Else, if there's room for a new connection
+					if self.count < self.conf['size']:
+						self.count += 1
+						oCon = None
+						break
 
-		Args:
-			field (str): The name of the field to return, or None for the entire
-				document
-			default (mixed): The value to return if the field doesn't exist
-				defaults to None
+					# Else, wait for one to be returned
+					fWait = fDeadline - fNow
+					if fWait <= 0:
+						raise StorageException('Timed out waiting for a connection to "%s"' % self.server)
+					self.cond.wait(fWait)
 
-		Returns:
-			mixed
-		"""
+			# Close any dead connections outside of the lock
+			for oDead in lDead:
+				self._close(oDead)
 
-		# If got nothing for the field
-		if not field:
-			return self._dData
+			# If we need a new connection
+			if oCon is None:
 
-		# If the field doesn't exist
-		if field not in self._dData:
-			return default
+				# Try to open it, freeing the slot if we can't
+				try:
+					oCon = _connection(self.server)
+				except Exception:
+					with self.cond:
+						self.count -= 1
+						self.cond.notify()
+					raise
+
+				# Note when it was created and return it
+				with self.cond:
+					self.created[id(oCon)] = time()
+				return oCon
+
+			# If the connection needs to be checked
+			if bCheck:
+
+				# Ask the server for its info, if it fails throw away the
+				#	connection and try again
+				try:
+					oCon.server()
+				except r.errors.RqlDriverError:
+					self.put(oCon, True)
+					continue
 
-		# Else, return the field
-		return self._dData[field]
+				# If anything else goes wrong, throw away the connection so
+				#	its slot is freed, and re-raise
+				except Exception:
+					self.put(oCon, True)
+					raise
 
-	# generate config static method
-	@staticmethod
-	def generateConfig(tree):
-		"""Generate Config
+			# Return the connection
+			return oCon
 
-		Uses a Format-OC tree to generate the base DB config for the Document
+	# forget method
+	def _forget(self, con):
+		"""Forget
+
+		Removes a connection from the pool's accounting, must be called with
+		the lock held
 
 		Args:
-			tree (FormatOC.Tree): the tree associated with the document
+			con (rethinkdb.net.DefaultConnection): The connection to forget
 
 		Returns:
-			dict
+			rethinkdb.net.DefaultConnection
 		"""
+		self.created.pop(id(con), None)
+		self.count -= 1
+		self.cond.notify()
+		return con
 
-		# Merge them with the default values
-		dConf = Dict.merge({
-			"auto_id": True,
-			"server": "default",
-			"db": "Test",
-			"indexes": {},
-			"primary": "_id",
-			"revisions": False,
-		}, tree.special('rethinkdb', default={}))
-
-		# If there's no name throw an exception
-		if not tree._name:
-			raise StorageException('Tree must contain a __name__ field to be used by Storage.Document')
-
-		# Return the config
-		return dConf
-
-	# get static method
-	@classmethod
-	def get(cls, _id=None, index=None, filter=None, contains=None, raw=None, orderby=None, limit=0, db={}):
-		"""Get
+	# put method
+	def put(self, con, discard=False):
+		"""Put
 
-		Returns one or more records from the table. Send no ID to fetch all
-		records in the table. Set an index to look for something other than the
-		primary key
+		Returns a borrowed connection to the pool
 
 		Args:
-			_id (str|str[]): The ID(s) to fetch from the table
-			index (str): If set, used as the index to search instead of the
-				primary key
-			filter (dict): If set, used as an additional filter to the ID or
-				index lookup
-			raw (bool|list): If set to true, raw dicts will be returned instead
-				of Document instances. If set to a list or tuple, only those
-				fields listed will be returned
-			orderby (str|str[]): The field(s) to order the result by
-			limit (uint): The number of records to return
-			db (dict): Optional DB info
-				'server' for the name of the host info passed to server()
-				'postfix' for the postfix added to the DB name
+			con (rethinkdb.net.DefaultConnection): The connection to return
+			discard (bool): If true the connection is closed instead of being
+				made available again
 
 		Returns:
-			Table|Table[]|dict|dict[]
-
-		Raises:
-			StorageException
+			None
 		"""
 
-		# Assume multiple records
-		bMultiple = True
+		# If we've been forked, the connection belongs to the parent, leave
+		#	it alone
+		if os.getpid() != self.pid:
+			return
 
-		# Get the info
-		dInfo = cls.info(db)
+		with self.cond:
 
-		# If there is an index passed
-		if index:
+			# If the connection can be reused, add it to the idle list
+			if not discard and not self.closed and con.is_open():
+				self.idle.append((con, time()))
+				self.cond.notify()
+				return
 
-			# If the index doesn't exist
-			if index not in dInfo['conf']['indexes']:
-				raise StorageException('no index', index, 'tree')
+			# Else, forget about it
+			self._forget(con)
 
-		# Get a connection to the server
-		with connect_with(dInfo['server']) as oCon:
+		# Close it outside of the lock
+		self._close(con)
 
-			# Create a cursor for all records
-			oCur = r \
-				.db(dInfo['db']) \
-				.table(dInfo['tree']._name) \
+# _InstrumentedConnection class
+class _InstrumentedConnection(object):
+	"""Instrumented Connection
 
-			# If all records must be returned, we don't need to modify the
-			#	cursor any further
-			if _id == None:
-				pass
+	Stands in for a connection so that every query run on it is timed and
+	recorded, see instrument()
 
-			# Else, if there's an index
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, con, conf):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			con (rethinkdb.net.Connection): The connection to wrap
+			conf (dict): The instrumentation settings, see instrument()
+
+		Returns:
+			_InstrumentedConnection
+		"""
+		self.con = con
+		self.conf = conf
+
+	# __getattr__ magic method
+	def __getattr__(self, name):
+		return getattr(self.con, name)
+
+	# start method
+	def _start(self, term, **optargs):
+		"""Start
+
+		Called by RqlQuery.run() to run the query on the connection
+
+		Args:
+			term (rethinkdb.ast.RqlQuery): The query
+			optargs (dict): The global options passed to run()
+
+		Returns:
+			mixed
+		"""
+
+		# If we don't have to wait for the result, there's nothing to record
+		if optargs.get('noreply'):
+			return self.con._start(term, **optargs)
+
+		# Init the record
+		dRecord, bProfile = _instrumentBegin(term, optargs, self.conf)
+
+		# Run the query
+		fStart = time()
+		try:
+			mRes = self.con._start(term, **optargs)
+
+		# If it fails, record the error and re-raise it
+		except Exception as e:
+			dRecord['duration'] = time() - fStart
+			dRecord['error'] = str(e)
+			_instrumentRecord(dRecord, term)
+			raise
+
+		# Note how long it took, then record it and return the result
+		dRecord['duration'] = time() - fStart
+		return _instrumentEnd(dRecord, term, mRes, bProfile, _InstrumentedCursor)
+
+# _InstrumentedCursor class
+class _InstrumentedCursor(object):
+	"""Instrumented Cursor
+
+	Stands in for a cursor so that the rows, bytes, and time spent waiting on
+	it are added to the query's record, which is recorded once the cursor is
+	exhausted or closed
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, cursor, record, term):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			cursor (rethinkdb.net.Cursor): The cursor to wrap
+			record (dict): The record of the query
+			term (rethinkdb.ast.RqlQuery): The query
+
+		Returns:
+			_InstrumentedCursor
+		"""
+		self.cursor = cursor
+		self.record = record
+		self.term = term
+		self.done = False
+
+	# __getattr__ magic method
+	def __getattr__(self, name):
+		return getattr(self.cursor, name)
+
+	# __iter__ magic method
+	def __iter__(self):
+		return self
+
+	# __next__ magic method
+	def __next__(self):
+
+		# Get the next row, noting how long we waited for it
+		fStart = time()
+		try:
+			dRow = next(self.cursor)
+
+		# If there's no more rows, the query is done
+		except StopIteration:
+			self.record['duration'] += time() - fStart
+			self._done()
+			raise
+
+		# If it fails, record the error
+		except Exception as e:
+			self.record['duration'] += time() - fStart
+			self.record['error'] = str(e)
+			self._done()
+			raise
+
+		# Add the row and return it
+		self.record['duration'] += time() - fStart
+		self.record['rows'] += 1
+		_instrumentBytes(self.record, dRow)
+		return dRow
+
+	# Python 2 iterator
+	next = __next__
+
+	# close method
+	def close(self):
+		"""Close
+
+		Closes the cursor and records the query
+
+		Returns:
+			None
+		"""
+		self.cursor.close()
+		self._done()
+
+	# done method
+	def _done(self):
+		"""Done
+
+		Records the query, only the first time it's called
+
+		Returns:
+			None
+		"""
+		if not self.done:
+			self.done = True
+			_instrumentRecord(self.record, self.term)
+
+# connect_with class
+class connect_with(object):
+	"""Connect With
+
+	Used in conjunction with the python keyword "with" in order to borrow a
+	connection from the server's pool and make sure it's returned when the
+	client is done with it
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, server, session=True):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			server (str): A name representing details stored using server()
+			session (bool): If false, a connection is borrowed from the pool
+				even if a session is open on the server
+
+		Returns:
+			connect_with
+		"""
+
+		# If there's a session open on the server, use its connection
+		self.con = session and _sessionCon(server) or None
+		if self.con is not None:
+			self.pool = None
+
+		# Else, borrow one from the pool
+		else:
+			self.pool = _pool(server)
+			self.con = self.pool.get()
+
+	# __enter__ magic method
+	def __enter__(self):
+		return _instrumented(self.con)
+
+	# __exit__ magic method
+	def __exit__(self, exc_type, exc_value, traceback):
+
+		# Return the connection, if it broke we can't trust the state it's in
+		#	so throw it away. Session connections are returned by the session
+		if self.pool:
+			self.pool.put(self.con, _broken(exc_type))
+		if exc_type is not None:
+			return False
+
+# session class
+class session(object):
+	"""Session
+
+	Used in conjunction with the python keyword "with" in order to pin a
+	single connection to the server for the current thread. Every Document
+	method called inside the block on the same server uses it instead of
+	borrowing its own, e.g.
+
+		with Storage.session('default'):
+			oUser = User.get(sID)
+			lPosts = Post.get(sID, index='user')
+
+	Sessions can be nested, only the outermost one borrows and returns the
+	connection. Streams, get(..., stream=True), always borrow their own
+	connection as they can be read long after the session is over
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, server='default'):
+		self.server = server
+
+	# __enter__ magic method
+	def __enter__(self):
+		return _sessionEnter(self.server)
+
+	# __exit__ magic method
+	def __exit__(self, exc_type, exc_value, traceback):
+
+		# Release the session, if the connection broke we can't trust the
+		#	state it's in so it will be thrown away
+		_sessionExit(self.server, _broken(exc_type))
+		if exc_type is not None:
+			return False
+
+# _Cache class
+class _Cache(object):
+	"""Cache
+
+	Holds all the records of a table in memory, indexed by primary key and by
+	each index made up of fields, and keeps them current with a changefeed
+	running on its own thread and connection
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, info, retry=1):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			info (dict): The Document's info
+			retry (uint): The seconds to wait before restarting a dropped feed
+
+		Returns:
+			_Cache
+		"""
+		self.info = info
+		self.retry = retry
+		self.primary = info['conf']['primary']
+		self.lock = threading.Lock()
+		self.con = None
+		self.stopped = False
+		self.connected = False
+		self.ready = False
+		self.records = {}
+		self.indexes = {}
+		self.hits = 0
+		self.misses = 0
+		self.restarts = 0
+		self.loaded = None
+		self.changed = None
+
+		# Store the indexes we can handle
+		self.fields = {}
+		for sName,mFields in info['conf']['indexes'].items():
+			lFields = _indexFields(sName, mFields)
+			if lFields:
+				self.fields[sName] = lFields
+
+		# Create the thread
+		self.thread = threading.Thread(target=self.run)
+		self.thread.daemon = True
+
+	# add method
+	def _add(self, records, indexes, doc):
+		"""Add
+
+		Adds a record to the given data, must be called with the lock held if
+		the data is live
+
+		Args:
+			records (dict): The records by primary key
+			indexes (dict): The primary keys by index and value
+			doc (dict): The record to add
+
+		Returns:
+			None
+		"""
+		mID = doc[self.primary]
+		records[mID] = doc
+		for sIndex,lFields in self.fields.items():
+			mKey = self._key(lFields, doc)
+			if mKey is not None:
+				indexes[sIndex].setdefault(mKey, set()).add(mID)
+
+	# key method
+	@staticmethod
+	def _key(fields, doc):
+		"""Key
+
+		Returns the value of an index for a record, or None if the record isn't
+		in the index
+
+		Args:
+			fields (str[]): The fields making up the index
+			doc (dict): The record
+
+		Returns:
+			mixed
+		"""
+		lValues = []
+		for sField in fields:
+			mValue = doc.get(sField)
+			if mValue is None or isinstance(mValue, dict):
+				return None
+			lValues.append(isinstance(mValue, list) and tuple(mValue) or mValue)
+		if len(lValues) == 1:
+			return lValues[0]
+		return tuple(lValues)
+
+	# remove method
+	def _remove(self, records, indexes, doc):
+		"""Remove
+
+		Removes a record from the given data, must be called with the lock
+		held if the data is live
+
+		Args:
+			records (dict): The records by primary key
+			indexes (dict): The primary keys by index and value
+			doc (dict): The record to remove
+
+		Returns:
+			None
+		"""
+		mID = doc[self.primary]
+		records.pop(mID, None)
+		for sIndex,lFields in self.fields.items():
+			mKey = self._key(lFields, doc)
+			if mKey is not None and mKey in indexes[sIndex]:
+				indexes[sIndex][mKey].discard(mID)
+				if not indexes[sIndex][mKey]:
+					del indexes[sIndex][mKey]
+
+	# get method
+	def get(self, _id, index, limit):
+		"""Get
+
+		Looks up records the same way Document.get() does
+
+		Args:
+			_id (mixed|mixed[]): The ID(s) or index value(s), None for all
+			index (str): The index to use instead of the primary key
+			limit (uint): The max number of records to return
+
+		Returns:
+			tuple: True and the records if the cache could handle the request,
+				else False and None
+		"""
+
+		# If we're not ready, or the index is unknown, or it's a range
+		if not self.ready or \
+			(index and index not in self.fields) or \
+			(index and isinstance(_id, tuple) and None in _id):
+			self.misses += 1
+			return (False, None)
+
+		with self.lock:
+
+			# If we want everything
+			if _id is None:
+				lIDs = list(self.records.keys())
+				bMultiple = True
+
+			# Else if we have an index
 			elif index:
+				lValues = isinstance(_id, list) and _id or [_id]
+				lIDs = []
+				for mValue in lValues:
+					if isinstance(mValue, list):
+						mValue = tuple(mValue)
+					lIDs.extend(self.indexes[index].get(mValue, ()))
+				bMultiple = True
+
+			# Else we're dealing with the primary key
+			else:
+				bMultiple = isinstance(_id, (tuple,list))
+				lIDs = bMultiple and list(_id) or [_id]
+
+			# Copy the records so no one can change the cache
+			lRecords = [deepcopy(self.records[m]) for m in lIDs if m in self.records]
+
+		# Count the hit
+		self.hits += 1
+
+		# If there's a limit
+		if limit > 0:
+			lRecords = lRecords[:limit]
+
+		# If we want one record
+		if not bMultiple or limit == 1:
+			if not lRecords:
+				return (True, None)
+			return (True, lRecords[0])
+
+		# Return the records
+		return (True, lRecords)
+
+	# run method
+	def run(self):
+		"""Run
+
+		Loads the table and follows its changes until stopped, restarting the
+		feed if it drops
+
+		Returns:
+			None
+		"""
+
+		# Loop until we're stopped
+		while not self.stopped:
+
+			# Init the data we load into
+			dRecords = {}
+			dIndexes = dict([(s, {}) for s in self.fields])
+			bLoading = True
+
+			try:
+
+				# Get a dedicated connection
+				self.con = _connection(self.info['server'])
+
+				# Start the feed
+				oFeed = r \
+					.db(self.info['db']) \
+					.table(self.info['tree']._name) \
+					.changes(include_initial=True, include_states=True) \
+					.run(self.con)
+				self.connected = True
+
+				# Go through each change
+				for dChange in oFeed:
+
+					# If it's a state
+					if 'state' in dChange:
+
+						# If the initial records are all loaded, swap them in
+						if dChange['state'] == 'ready':
+							with self.lock:
+								self.records = dRecords
+								self.indexes = dIndexes
+								self.ready = True
+							bLoading = False
+							self.loaded = time()
+
+						continue
+
+					# If we're still loading, update the new data
+					if bLoading:
+						if dChange.get('old_val'):
+							self._remove(dRecords, dIndexes, dChange['old_val'])
+						if dChange.get('new_val'):
+							self._add(dRecords, dIndexes, dChange['new_val'])
+						continue
+
+					# Else, update the live data
+					with self.lock:
+						if dChange.get('old_val'):
+							self._remove(self.records, self.indexes, dChange['old_val'])
+						if dChange.get('new_val'):
+							self._add(self.records, self.indexes, dChange['new_val'])
+					self.changed = time()
+
+			# If anything goes wrong with the feed
+			except Exception as e:
+				if not self.stopped:
+					print_error('Storage cache for "%s" dropped: %s' % (self.info['tree']._name, str(e)))
+
+			# Stop serving from memory and close the connection
+			self.ready = False
+			self.connected = False
+			if self.con:
+				_Pool._close(self.con)
+				self.con = None
+
+			# If we're not stopped, wait and try again
+			if not self.stopped:
+				self.restarts += 1
+				sleep(self.retry)
+
+	# start method
+	def start(self):
+		"""Start
+
+		Starts the thread loading and following the table
+
+		Returns:
+			None
+		"""
+		self.thread.start()
+
+	# stats method
+	def stats(self):
+		"""Stats
+
+		Returns the current state of the cache. A feed on a quiet table sends
+		nothing, so how fresh the data is can only be judged by whether the
+		feed is still connected and how long ago the table was loaded
+
+		Returns:
+			dict
+		"""
+		# Calculate how long since the table was last loaded
+		fSynced = None
+		if self.loaded is not None:
+			fSynced = time() - self.loaded
+
+		# Return the stats
+		return {
+			"connected": self.connected,
+			"ready": self.ready,
+			"healthy": self.ready and self.connected and self.thread.is_alive(),
+			"records": len(self.records),
+			"hits": self.hits,
+			"misses": self.misses,
+			"restarts": self.restarts,
+			"loaded": self.loaded,
+			"changed": self.changed,
+			"synced": fSynced
+		}
+
+	# stop method
+	def stop(self):
+		"""Stop
+
+		Stops the feed and throws away the data
+
+		Returns:
+			None
+		"""
+		self.stopped = True
+		self.ready = False
+		if self.con:
+			_Pool._close(self.con)
+		self.thread.join(self.retry + 1)
+		self.records = {}
+		self.indexes = {}
+
+# Loader class
+class Loader(object):
+	"""Loader
+
+	Collects requests for documents by primary key and fetches them with a
+	single get_all() per Document class and DB the first time any of their
+	results are needed. Documents are remembered for the life of the instance
+	so the same ID is never fetched twice. Create one per request, e.g.
+
+		with Loader() as oLoader:
+			oAuthor = oLoader.load(Author, sAuthorID)
+			lTags = [oLoader.load(Tag, s) for s in lTagIDs]
+			oAuthor.get()	# fetches the author and all the tags
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, raw=False):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			raw (bool): If set to true, raw dicts will be returned instead of
+				Document instances
+
+		Returns:
+			Loader
+		"""
+		self.raw = raw
+		self.lock = threading.Lock()
+		self.pending = {}
+		self.fetching = {}
+		self.results = {}
+
+	# __enter__ magic method
+	def __enter__(self):
+		return self
+
+	# __exit__ magic method
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.clear()
+		if exc_type is not None:
+			return False
+
+	# clear method
+	def clear(self):
+		"""Clear
+
+		Forgets all pending requests and fetched documents
+
+		Returns:
+			None
+		"""
+		with self.lock:
+			self.pending = {}
+			self.results = {}
+
+	# dispatch method
+	def dispatch(self):
+		"""Dispatch
+
+		Fetches all pending requests, one query per Document class and DB. If
+		a fetch fails, its requests are put back so they're tried again the
+		next time one of them is needed, and the first error is raised once
+		every class has been tried
+
+		Returns:
+			None
+
+		Raises:
+			StorageException
+		"""
+
+		# Take the pending requests, and mark them as being fetched so other
+		#	threads wait for them instead of getting nothing
+		oEvent = threading.Event()
+		with self.lock:
+			dPending = self.pending
+			self.pending = {}
+			for tGroup,dGroup in dPending.items():
+				for mID in dGroup['ids']:
+					self.fetching[tGroup + (mID,)] = oEvent
+
+		# Init the first error
+		oError = None
+
+		try:
+
+			# Go through each class and DB
+			for tGroup,dGroup in dPending.items():
+
+				try:
+
+					# Get the primary key
+					sPrimary = dGroup['class'].info(dGroup['db'])['conf']['primary']
+
+					# Fetch all the documents at once and store them by ID
+					dFound = {}
+					for m in dGroup['class'].get(dGroup['ids'], raw=self.raw, db=dGroup['db']):
+						dFound[m[sPrimary]] = m
+
+				# If the fetch failed, put the requests back and remember the
+				#	error
+				except Exception as e:
+					with self.lock:
+						if tGroup not in self.pending:
+							self.pending[tGroup] = {"class": dGroup['class'], "db": dGroup['db'], "ids": [], "seen": set()}
+						dWaiting = self.pending[tGroup]
+						for mID in dGroup['ids']:
+							if mID not in dWaiting['seen']:
+								dWaiting['seen'].add(mID)
+								dWaiting['ids'].append(mID)
+					if oError is None:
+						oError = e
+					continue
+
+				# Store the results, None for any not found
+				with self.lock:
+					for mID in dGroup['ids']:
+						self.results[tGroup + (mID,)] = dFound.get(mID)
+
+		# Whatever happens, let anyone waiting on the requests know
+		finally:
+			with self.lock:
+				for tGroup,dGroup in dPending.items():
+					for mID in dGroup['ids']:
+						if self.fetching.get(tGroup + (mID,)) is oEvent:
+							del self.fetching[tGroup + (mID,)]
+			oEvent.set()
+
+		# If anything failed, raise the first error
+		if oError is not None:
+			raise oError
+
+	# load method
+	def load(self, cls, _id, db={}):
+		"""Load
+
+		Requests a document by its primary key and returns a promise for it.
+		Nothing is fetched until one of the promises is resolved
+
+		Args:
+			cls (Document): The Document class to fetch
+			_id (mixed): The primary key of the document
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			LoaderPromise
+		"""
+
+		# Generate the key for the class and DB
+		tGroup = (cls, db.get('server'), db.get('postfix'))
+
+		with self.lock:
+
+			# If we haven't already fetched it, and aren't fetching it
+			if tGroup + (_id,) not in self.results and \
+				tGroup + (_id,) not in self.fetching:
+
+				# Add the group if it's new
+				if tGroup not in self.pending:
+					self.pending[tGroup] = {"class": cls, "db": db, "ids": [], "seen": set()}
+
+				# Add the ID if it's not already waiting
+				dGroup = self.pending[tGroup]
+				if _id not in dGroup['seen']:
+					dGroup['seen'].add(_id)
+					dGroup['ids'].append(_id)
+
+		# Return the promise
+		return LoaderPromise(self, tGroup + (_id,))
+
+	# load many method
+	def loadMany(self, cls, ids, db={}):
+		"""Load Many
+
+		Requests multiple documents by their primary keys and returns the
+		promises for them in the same order
+
+		Args:
+			cls (Document): The Document class to fetch
+			ids (mixed[]): The primary keys of the documents
+			db (dict): Optional DB info
+
+		Returns:
+			LoaderPromise[]
+		"""
+		return [self.load(cls, _id, db) for _id in ids]
+
+	# result method
+	def result(self, key):
+		"""Result
+
+		Returns the document stored under the key, dispatching all pending
+		requests first if it hasn't been fetched yet, or waiting for it if
+		another thread is fetching it
+
+		Args:
+			key (tuple): The class, server, postfix, and ID
+
+		Returns:
+			Document|dict|None
+
+		Raises:
+			StorageException
+		"""
+
+		# Loop until we have the result
+		while True:
+
+			# Check if we have it, or if it's being fetched or waiting
+			with self.lock:
+				if key in self.results:
+					return self.results[key]
+				oEvent = self.fetching.get(key)
+				bPending = key[:-1] in self.pending and \
+					key[-1] in self.pending[key[:-1]]['seen']
+
+			# If another thread is fetching it, wait for it and check again
+			if oEvent is not None:
+				oEvent.wait()
+				continue
+
+			# If it was never requested, or was cleared, there's nothing
+			if not bPending:
+				return None
+
+			# Fetch everything waiting, only raising if our request failed
+			try:
+				self.dispatch()
+			except Exception:
+				with self.lock:
+					if key not in self.results:
+						raise
+
+# LoaderPromise class
+class LoaderPromise(object):
+	"""Loader Promise
+
+	Returned by Loader.load(), stands in for a document until it's needed
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, loader, key):
+		self.loader = loader
+		self.key = key
+
+	# get method
+	def get(self):
+		"""Get
+
+		Returns the document, or None if it doesn't exist, fetching it along
+		with every other pending request if it hasn't been fetched yet
+
+		Returns:
+			Document|dict|None
+
+		Raises:
+			StorageException
+		"""
+		return self.loader.result(self.key)
+
+# _Writer class
+class _Writer(object):
+	"""Writer
+
+	Buffers documents written with Document.writeBehind() and writes them in
+	bulk from a background thread, using insert with conflict 'update'.
+	Repeated writes to the same primary key are merged field by field so only
+	the latest value of each field is sent, and writers block while the
+	buffer is full
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, info, size, interval, limit, durability):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			info (dict): The Document's info
+			size (uint): The number of buffered documents that triggers a
+				write, and the max number sent in a single query
+			interval (float): The max seconds a document waits in the buffer
+			limit (uint): The number of buffered documents at which writers
+				have to wait
+			durability (str): 'hard' or 'soft'
+
+		Returns:
+			_Writer
+		"""
+		self.info = info
+		self.size = size
+		self.interval = interval
+		self.limit = limit
+		self.durability = durability
+		self.primary = info['conf']['primary']
+		self.cond = threading.Condition()
+		self.writing = threading.Lock()
+		self.pending = {}
+		self.stopped = False
+		self.error = None
+		self.added = 0
+		self.merged = 0
+		self.written = 0
+		self.errors = 0
+		self.batches = 0
+		self.waits = 0
+
+		# Create the thread
+		self.thread = threading.Thread(target=self.run)
+		self.thread.daemon = True
+
+	# add method
+	def add(self, data, timeout=None):
+		"""Add
+
+		Adds a document to the buffer, merging it into any data already
+		waiting for the same primary key. If the buffer is full, waits for the
+		thread to make room
+
+		Args:
+			data (dict): The document's data, or the fields that changed along
+				with the primary key
+			timeout (float): The max seconds to wait for room, None to wait
+				as long as it takes
+
+		Returns:
+			None
+
+		Raises:
+			StorageException
+		"""
+
+		# Without a primary key there's nothing to merge on
+		mKey = self._key(data)
+		if mKey is None:
+			raise StorageException('write buffer for "%s" needs a primary key' % self.info['tree']._name)
+
+		# Copy the data so later changes to the instance aren't written
+		data = deepcopy(data)
+
+		with self.cond:
+
+			# If the writer is stopped
+			if self.stopped:
+				raise StorageException('write buffer for "%s" is stopped' % self.info['tree']._name)
+
+			# If the buffer is full, wake the thread and wait for room
+			if self._count() >= self.limit:
+				self.waits += 1
+				fEnd = timeout is not None and time() + timeout or None
+				while self._count() >= self.limit and not self.stopped:
+					self.cond.notify_all()
+					if fEnd is None:
+						self.cond.wait(1)
+					else:
+						fWait = fEnd - time()
+						if fWait <= 0:
+							raise StorageException('write buffer for "%s" is full' % self.info['tree']._name)
+						self.cond.wait(fWait)
+
+				# If the writer was stopped while we waited
+				if self.stopped:
+					raise StorageException('write buffer for "%s" is stopped' % self.info['tree']._name)
+
+			# If the key is already waiting, merge the new data into it
+			if mKey in self.pending:
+				Dict.merge(self.pending[mKey], data)
+				self.merged += 1
+
+			# Else, add it
+			else:
+				self.pending[mKey] = data
+
+			# If there's enough for a write, wake the thread
+			self.added += 1
+			if self._count() >= self.size:
+				self.cond.notify_all()
+
+	# count method
+	def _count(self):
+		"""Count
+
+		Returns the number of documents in the buffer, must be called with the
+		condition held
+
+		Returns:
+			uint
+		"""
+		return len(self.pending)
+
+	# flush method
+	def flush(self):
+		"""Flush
+
+		Writes everything in the buffer and returns once it's in the DB. If
+		the write fails, the documents go back in the buffer and the error is
+		raised
+
+		Returns:
+			uint: The number of documents written
+
+		Raises:
+			rethinkdb.errors.ReqlError
+		"""
+
+		# Only one flush at a time so writes to a key land in order
+		with self.writing:
+
+			# Take everything in the buffer and let any waiting writers in
+			with self.cond:
+				lDocs = list(self.pending.values())
+				self.pending = {}
+				self.cond.notify_all()
+
+			# Write the documents a batch at a time
+			iWritten = 0
+			for i in range(0, len(lDocs), self.size):
+
+				try:
+
+					# Get a connection to the server and insert the batch
+					with connect_with(self.info['server']) as oCon:
+						dRes = r \
+							.db(self.info['db']) \
+							.table(self.info['tree']._name) \
+							.insert(
+								lDocs[i:i+self.size],
+								conflict='update',
+								durability=self.durability,
+								return_changes=False
+							) \
+							.run(oCon)
+
+				# If the write failed, put what's left back in the buffer
+				except Exception as e:
+					self._restore(lDocs[i:])
+					self.error = e
+					raise e
+
+				# Add the results to the totals
+				iWritten += dRes['inserted'] + dRes['replaced'] + dRes['unchanged']
+				self.written += dRes['inserted'] + dRes['replaced'] + dRes['unchanged']
+				self.batches += 1
+
+				# If any documents were rejected, note the first reason
+				if dRes['errors']:
+					self.errors += dRes['errors']
+					self.error = StorageException(dRes.get('first_error'))
+					print_error('Storage write buffer for "%s": %s' % (self.info['tree']._name, dRes.get('first_error')))
+
+		# Return the number of documents written
+		return iWritten
+
+	# key method
+	def _key(self, data):
+		"""Key
+
+		Returns the primary key of the document in a form that can be used as
+		a dict key, or None if it doesn't have one
+
+		Args:
+			data (dict): The document's data
+
+		Returns:
+			mixed
+		"""
+		mKey = data.get(self.primary)
+		if isinstance(mKey, list):
+			return tuple(mKey)
+		return mKey
+
+	# restore method
+	def _restore(self, docs):
+		"""Restore
+
+		Puts documents that couldn't be written back in the buffer, under any
+		newer data written for the same primary key since
+
+		Args:
+			docs (dict[]): The documents
+
+		Returns:
+			None
+		"""
+		with self.cond:
+			for d in docs:
+				mKey = self._key(d)
+				if mKey in self.pending:
+					self.pending[mKey] = Dict.merge(d, self.pending[mKey])
+				else:
+					self.pending[mKey] = d
+
+	# run method
+	def run(self):
+		"""Run
+
+		Writes the buffer whenever it holds enough documents or the interval
+		has passed, until stopped and empty
+
+		Returns:
+			None
+		"""
+
+		# Loop until we're stopped
+		while True:
+
+			# Wait until there's a batch, the interval passes, or we're
+			#	stopped
+			with self.cond:
+				fEnd = time() + self.interval
+				while self._count() < self.size and not self.stopped:
+					fWait = fEnd - time()
+					if fWait <= 0:
+						break
+					self.cond.wait(fWait)
+
+				# If we're stopped and there's nothing left, we're done
+				if self.stopped and not self._count():
+					return
+
+			# Write the buffer
+			try:
+				self.flush()
+
+			# If it failed, give up if we're stopped, else wait before trying
+			#	again
+			except Exception as e:
+				print_error('Storage write buffer for "%s" failed: %s' % (self.info['tree']._name, str(e)))
+				if self.stopped:
+					return
+				sleep(self.interval)
+
+	# start method
+	def start(self):
+		"""Start
+
+		Starts the thread writing the buffer
+
+		Returns:
+			None
+		"""
+		self.thread.start()
+
+	# stats method
+	def stats(self):
+		"""Stats
+
+		Returns the current state of the buffer
+
+		Returns:
+			dict
+		"""
+		with self.cond:
+			return {
+				"pending": self._count(),
+				"added": self.added,
+				"merged": self.merged,
+				"written": self.written,
+				"errors": self.errors,
+				"batches": self.batches,
+				"waits": self.waits,
+				"error": self.error and str(self.error) or None
+			}
+
+	# stop method
+	def stop(self):
+		"""Stop
+
+		Stops taking documents, then writes whatever is left in the buffer and
+		waits for the thread to finish. If that write fails, the error is
+		printed and the documents are dropped
+
+		Returns:
+			None
+		"""
+		with self.cond:
+			self.stopped = True
+			self.cond.notify_all()
+		self.thread.join()
+
+# _Sweeper class
+class _Sweeper(object):
+	"""Sweeper
+
+	Deletes the expired documents of a Document class with ttlSweep() every
+	interval seconds on a background thread
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, cls, db, interval, batch, rate):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			cls (Document): The Document class
+			db (dict): The DB info
+			interval (float): The seconds to wait between sweeps
+			batch (uint): The number of documents to delete per write
+			rate (uint): The max number of documents to delete per second
+
+		Returns:
+			_Sweeper
+		"""
+		self.cls = cls
+		self.db = db
+		self.interval = interval
+		self.batch = batch
+		self.rate = rate
+		self.event = threading.Event()
+		self.sweeps = 0
+		self.deleted = 0
+		self.errors = 0
+		self.swept = None
+		self.error = None
+
+		# Create the thread
+		self.thread = threading.Thread(target=self.run)
+		self.thread.daemon = True
+
+	# progress method
+	def _progress(self, totals):
+		"""Progress
+
+		Passed to ttlSweep() to stop a sweep early once we're stopped
+
+		Args:
+			totals (dict): The running totals of the sweep
+
+		Returns:
+			bool
+		"""
+		return not self.event.is_set()
+
+	# run method
+	def run(self):
+		"""Run
+
+		Sweeps the table every interval until stopped
+
+		Returns:
+			None
+		"""
+
+		# Loop until we're stopped
+		while not self.event.is_set():
+
+			try:
+
+				# Delete the expired documents and add them to the totals
+				dRes = self.cls.ttlSweep(self.batch, self.rate, progress=self._progress, db=self.db)
+				self.sweeps += 1
+				self.deleted += dRes['deleted']
+				self.errors += dRes['errors']
+				self.swept = time()
+
+			# If anything goes wrong, note it and try again next time
+			except Exception as e:
+				self.error = e
+				print_error('Storage sweeper for "%s" failed: %s' % (self.cls.info(self.db)['tree']._name, str(e)))
+
+			# Wait for the next sweep
+			self.event.wait(self.interval)
+
+	# start method
+	def start(self):
+		"""Start
+
+		Starts the thread sweeping the table
+
+		Returns:
+			None
+		"""
+		self.thread.start()
+
+	# stats method
+	def stats(self):
+		"""Stats
+
+		Returns the totals of the sweeper
+
+		Returns:
+			dict
+		"""
+		return {
+			"sweeps": self.sweeps,
+			"deleted": self.deleted,
+			"errors": self.errors,
+			"swept": self.swept,
+			"error": self.error and str(self.error) or None
+		}
+
+	# stop method
+	def stop(self):
+		"""Stop
+
+		Stops the sweeper, ending any sweep in progress after its current
+		batch
+
+		Returns:
+			None
+		"""
+		self.event.set()
+		self.thread.join()
+
+# StorageException class
+class StorageException(Exception):
+	"""Storage Exception
+
+	Used when critical errors happen in the Storage module
+
+	Extends: Exception
+	"""
+	pass
+
+# Document class
+class Document(object):
+	"""Table
+
+	Handles all interaction with RethinkDB tables
+
+	Extends: object
+	"""
+
+	# Info already generated, by class and DB info
+	_dInfoCache = {}
+
+	# Running caches, by class and DB info
+	_dCaches = {}
+
+	# Running write buffers, by class and DB info
+	_dWriters = {}
+
+	# Running TTL sweepers, by class and DB info
+	_dSweepers = {}
+
+	# Trust records read back from the DB and skip validating and cleaning
+	#	them, set to False in a child to always validate
+	_TRUST_STORED = True
+
+	# constructor
+	def __init__(self, data={}, db={}):
+		"""Constructor
+
+		Initialises the instance and returns it
+
+		Args:
+			data (dict): The current state of the record
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			Table
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the info
+		self.__dInfo = self.info(db)
+
+		# If the data isn't empty
+		if data:
+
+			# Validate it
+			if not self.__dInfo['tree'].valid(data):
+				raise ValueError("%s: %s" % (
+					self.__dInfo['tree'].validation_fail_name,
+					self.__dInfo['tree'].validation_fail_value
+				))
+
+		# Store the data
+		self._dData = self.__dInfo['tree'].clean(data)
+		self._dChanged = {}
+		self._dHashes = {}
+		self._bNew = True
+
+	def __contains__(self, field):
+		"""Contains (__contains__)
+
+		Returns true if the string exists as a key in the Document
+
+		Args:
+			field (str): The field to check for
+
+		Returns:
+			bool
+		"""
+		return field in self._dData
+
+	def __delitem__(self, field):
+		"""Delete Item (__delitem__)
+
+		Removes a specific field from a record and flags it as needing to be
+		removed on the next update
+
+		Args:
+			field (str): The field to delete
+
+		Returns:
+			None
+		"""
+		self.d(field);
+
+	def __getitem__(self, field):
+		"""Get Item (__getitem__)
+
+		Returns a specific field from the document
+
+		Args:
+			field (str): The field to get
+
+		Returns:
+			mixed
+		"""
+		return self.g(field)
+
+	def __setitem__(self, field, value):
+		"""Set Item (__setitem__)
+
+		Sets a specific key in the dict
+
+		Args:
+			field (str): The field to set
+			value (mixed): The value to set to the field
+
+		Returns:
+			None
+		"""
+		self.s(field, value)
+
+	def __str__(self):
+		"""Str (__str__)
+
+		Returns a string representation of the document
+
+		Returns:
+			str
+		"""
+		return str(self._dData)
+
+	# change protected method
+	def _change(self, path, value):
+		"""Change
+
+		Records a change to the field at the given path so that the next
+		update only sends what changed. Nested changes are stored as nested
+		dicts which RethinkDB merges into the document. Dicts being set are
+		wrapped in r.literal() so they replace the existing value instead of
+		being merged into it, and r.literal() with no value removes the field
+
+		Args:
+			path (str[]): The keys leading to the field
+			value (mixed): The new value of the field, or r.literal() to remove
+				it
+
+		Returns:
+			None
+		"""
+
+		# Forget the revision hash of the top level field
+		self._dHashes.pop(path[0], None)
+
+		# If the entire document is already being replaced, there's nothing
+		#	to track
+		if not isinstance(self._dChanged, dict):
+			return
+
+		# Start at the top of the changes and the data
+		dChanged = self._dChanged
+		dData = self._dData
+
+		# Go through each parent of the field
+		for sKey in path[:-1]:
+			dData = dData[sKey]
+
+			# If there's no changes to the parent yet, add them
+			if sKey not in dChanged:
+				dChanged[sKey] = {}
+
+			# Else, if the parent was already set as a whole, set it again
+			#	with its current data and we're done
+			elif not isinstance(dChanged[sKey], dict):
+				dChanged[sKey] = r.literal(dData)
+				return
+
+			# Step into the parent's changes
+			dChanged = dChanged[sKey]
+
+		# Store the value, making sure dicts aren't merged
+		if isinstance(value, dict):
+			value = r.literal(value)
+		dChanged[path[-1]] = value
+
+	# revision protected method
+	def _revision(self, init=False):
+		"""Revision
+
+		Creates or updates the revision number of the instance. The hash part
+		is made by hashing each top level field separately, using a canonical
+		JSON encoding so key order doesn't matter, then hashing the list of
+		field names and hashes sorted by name. Field hashes are kept until the
+		field is changed through s() or d(), so fields changed any other way
+		will not be noticed
+
+		Revisions stored before per field hashing have a 32 character MD5 of
+		the whole document as their hash part, those are still compared the
+		old way so an unchanged document isn't seen as changed, and the first
+		update that does change it moves it to the new format
+
+		Args:
+			init (bool): Initialises the revision value
+				Defaults to false, set to True for a new revision value
+
+		Returns:
+			bool
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the hasher
+		fHasher = revisionHasher()
+
+		# Go through each field but the revision itself
+		lHashes = []
+		for sField,mValue in self._dData.items():
+			if sField == '_rev':
+				continue
+
+			# If we don't have the hash for the field, generate it
+			if sField not in self._dHashes:
+				self._dHashes[sField] = fHasher(json.dumps(
+					[sField, mValue], sort_keys=True, separators=(',',':')
+				))
+
+			# Add it along with the field name
+			lHashes.append([sField, self._dHashes[sField]])
+
+		# Hash the field hashes in order of field name, and turn it into a
+		#	string
+		lHashes.sort()
+		sHash = '%016x' % (fHasher(json.dumps(lHashes, separators=(',',':'))) & 0xffffffffffffffff)
+
+		# If we need a new value
+		if init:
+
+			# Generate and set the revision
+			self._dData['_rev'] = '1-%s' % sHash
+
+			# Return OK
+			return True
+
+		# Else we are updating the old value
+		else:
+
+			# Split the old revision into version and hash
+			sVer, sOldHash = self._dData['_rev'].split('-')
+
+			# If the old hash is an MD5 of the whole document, compare it the
+			#	way it was generated
+			if len(sOldHash) == 32:
+				dData = dict([(k, v) for k,v in self._dData.items() if k != '_rev'])
+				bChanged = sOldHash != md5(json.dumps(dData).encode('utf-8')).hexdigest()
+
+			# Else, compare the field hashes
+			else:
+				bChanged = sOldHash != sHash
+
+			# If the hashes have changed
+			if bChanged:
+
+				# Generate the new revision
+				self._dData['_rev'] = '%d-%s' % (int(sVer)+1, sHash)
+
+				# Add the _rev field as changed if it isn't already
+				if self._dChanged != True:
+					self._dChanged['_rev'] = self._dData['_rev']
+
+				# Return OK
+				return True
+
+			# Nothing changed
+			return False
+
+	# revision restore method
+	def _revisionRestore(self, rev):
+		"""Revision Restore
+
+		Puts back the revision the instance had before _revision() generated a
+		new one, used when the new one never made it to the DB
+
+		Args:
+			rev (str): The previous revision, or None if revisions are off
+
+		Returns:
+			None
+		"""
+
+		# If revisions are off there's nothing to restore
+		if rev is None:
+			return
+
+		# Put back the old revision and stop treating it as changed
+		self._dData['_rev'] = rev
+		if isinstance(self._dChanged, dict):
+			self._dChanged.pop('_rev', None)
+
+	# aggregate static method
+	@classmethod
+	def _aggregate(cls, reduce, _id, index, filter, contains, read_mode, db):
+		"""Aggregate
+
+		Runs an aggregation on the server over the records selected the same
+		way get() selects them, so only the result comes back
+
+		Args:
+			reduce (callable): Receives the cursor for the records and whether
+				it can use any index, and returns the aggregation
+			_id (mixed|mixed[]): The ID(s) or index value(s) to aggregate, None
+				for all records
+			index (str): If set, used as the index to search instead of the
+				primary key
+			filter (dict): If set, used as an additional filter
+			contains (tuple): If set, the name of a list field and the value or
+				values it must contain
+			read_mode (str): See _table()
+			db (dict): Optional DB info
+
+		Returns:
+			mixed
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Create a cursor for the requested records, always as a sequence
+		oCur, bMultiple, mOrderable = cls._selection(dInfo, _id, index, False, read_mode)
+
+		# If there's any filters, the records can't use an index
+		if filter or contains:
+			mOrderable = False
+
+		# Add any additional filters and the aggregation
+		oCur = reduce(cls._where(oCur, filter, contains), mOrderable is True)
+
+		# Get a connection to the server
+		with connect_with(dInfo['server']) as oCon:
+
+			try:
+				# Run the request and return the result
+				return oCur.run(oCon)
+
+			except r.errors.ReqlOpFailedError as e:
+
+				# The index doesn't exist
+				if e.args[0][:5] == 'Index':
+					raise StorageException('no index', index, 'table')
+
+				# Else, re-raise
+				raise e
+
+	# index create static method
+	@staticmethod
+	def _indexCreate(info, name, fields):
+		"""Index Create
+
+		Generates the query to create one of the indexes declared in the Tree
+
+		Args:
+			info (dict): The Document's info
+			name (str): The name of the index
+			fields (None|str|str[]|dict): The field(s) that make up the index,
+				or a dict with the 'fields' and the 'multi' and/or 'geo' flags
+
+		Returns:
+			rethinkdb.ast.RqlQuery
+
+		Raises:
+			StorageException
+		"""
+
+		# Create the cursor up to the table
+		oCur = r \
+			.db(info['db']) \
+			.table(info['tree']._name)
+
+		# If it's a dict, pull out the options
+		dOpts = {}
+		if isinstance(fields, dict):
+			for s in ('geo', 'multi'):
+				if fields.get(s):
+					dOpts[s] = True
+			fields = fields.get('fields')
+
+		# If there's no field, the name is the field
+		if not fields:
+			return oCur.index_create(name, **dOpts)
+
+		# Else if it's a string
+		elif isinstance(fields, basestring):
+			return oCur.index_create(name, r.row[fields], **dOpts)
+
+		# Else if it's a list
+		elif isinstance(fields, (tuple,list)):
+
+			# Generate the list of fields
+			lFields = []
+			for sField in fields:
+				lFields.append(r.row[sField])
+
+			# Create the index
+			return oCur.index_create(name, lFields, **dOpts)
+
+		# Else, wtf?
+		else:
+			raise StorageException("Unknown index format: %s" % str(fields))
+
+	# indexed static method
+	@classmethod
+	def _indexed(cls, field, db={}):
+		"""Indexed
+
+		Returns true if the field is the primary key or has an index of the
+		same name made up of only that field
+
+		Args:
+			field (str): The name of the field
+			db (dict): Optional DB info
+
+		Returns:
+			bool
+		"""
+
+		# Get the config
+		dConf = cls.info(db)['conf']
+
+		# Return if it's the primary or a simple index
+		return field == dConf['primary'] or (
+			field in dConf['indexes'] and \
+			_indexFields(field, dConf['indexes'][field]) == [field]
+		)
+
+	# avg static method
+	@classmethod
+	def avg(cls, field, _id=None, index=None, filter=None, contains=None, read_mode=None, db={}):
+		"""Average
+
+		Returns the average of the field across the selected records, or None
+		if there are no records
+
+		Args:
+			field (str): The field to aggregate
+			_id (mixed|mixed[]): The ID(s) or index value(s) to aggregate, None
+				for all records, see get()
+			index (str): If set, used as the index to search instead of the
+				primary key
+			filter (dict): If set, used as an additional filter to the ID or
+				index lookup
+			contains (tuple): If set, the name of a list field and the value or
+				values it must contain
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			float|None
+
+		Raises:
+			StorageException
+		"""
+
+		# Average the field, there's no average of nothing
+		return cls._aggregate(
+			lambda o, b: o.avg(field).default(None),
+			_id, index, filter, contains, read_mode, db
+		)
+
+	# cache start static method
+	@classmethod
+	def cacheStart(cls, db={}, retry=1):
+		"""Cache Start
+
+		Loads the entire table into memory and keeps it current using a
+		changefeed on a background thread. While the cache is ready, get()
+		requests by primary key or by any index made up of fields, without
+		filter, contains, orderby, or stream, are served from memory. If the
+		feed drops, requests go to the DB until it has been reloaded. If the
+		global prefix or the server's details change, the cache is reloaded
+		from the new DB. Only meant for small tables
+
+		Args:
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+			retry (uint): The seconds to wait before restarting a dropped feed
+
+		Returns:
+			bool: False if the cache was already running
+		"""
+
+		# Generate the key
+		tKey = (cls, db.get('server'), db.get('postfix'))
+
+		# If the cache is already running
+		if tKey in Document._dCaches:
+			return False
+
+		# Create and start the cache
+		Document._dCaches[tKey] = _Cache(cls.info(db), retry)
+		Document._dCaches[tKey].start()
+
+		# Return OK
+		return True
+
+	# cache stats static method
+	@classmethod
+	def cacheStats(cls, db={}):
+		"""Cache Stats
+
+		Returns the current state of the cache
+
+		Args:
+			db (dict): Optional DB info
+
+		Returns:
+			dict|None: None if there's no cache, else 'connected' if the feed
+				is open, 'ready' if requests are served from memory, 'healthy'
+				if both are true and the feed's thread is running, 'records',
+				'hits', 'misses', 'restarts', 'loaded' the time the table was
+				last loaded, 'changed' the time of the last change, and
+				'synced' the seconds since the table was last loaded
+		"""
+
+		# Find the cache
+		oCache = Document._dCaches.get((cls, db.get('server'), db.get('postfix')))
+
+		# Return its stats if we have one
+		return oCache and oCache.stats() or None
+
+	# cache stop static method
+	@classmethod
+	def cacheStop(cls, db={}):
+		"""Cache Stop
+
+		Stops the cache and throws away its data
+
+		Args:
+			db (dict): Optional DB info
+
+		Returns:
+			bool: False if there was no cache running
+		"""
+
+		# Remove the cache
+		oCache = Document._dCaches.pop((cls, db.get('server'), db.get('postfix')), None)
+
+		# If there was one, stop it
+		if oCache:
+			oCache.stop()
+			return True
+
+		# Nothing to stop
+		return False
+
+	# count static method
+	@classmethod
+	def count(cls, _id=None, index=None, filter=None, contains=None, read_mode=None, db={}):
+		"""Count
+
+		Returns the number of selected records
+
+		Args:
+			_id (mixed|mixed[]): The ID(s) or index value(s) to count, None
+				for all records, see get()
+			index (str): If set, used as the index to search instead of the
+				primary key
+			filter (dict): If set, used as an additional filter to the ID or
+				index lookup
+			contains (tuple): If set, the name of a list field and the value or
+				values it must contain
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			uint
+
+		Raises:
+			StorageException
+		"""
+
+		# Count the records
+		return cls._aggregate(
+			lambda o, b: o.count(),
+			_id, index, filter, contains, read_mode, db
+		)
+
+	def d(self, field):
+		"""D (delete)
+
+		Unlike the static delete which is used delete a record by ID, this
+		delete removes a field within the document
+
+		Args:
+			field (str|str[]): The name of the field to remove, or a list of
+				keys leading to a nested field
+
+		Returns:
+			self for chaining
+
+		Raise:
+			KeyError: field doesn't exist
+		"""
+
+		# Make sure we have a path
+		lPath = isinstance(field, (tuple,list)) and list(field) or [field]
+
+		# Find the parent of the field
+		dParent = self._dData
+		for sKey in lPath[:-1]:
+			if not isinstance(dParent, dict) or sKey not in dParent:
+				raise KeyError(field)
+			dParent = dParent[sKey]
+
+		# If the field doesn't exists in the document
+		if not isinstance(dParent, dict) or lPath[-1] not in dParent:
+			raise KeyError(field)
+
+		# Remove the field from the document
+		del dParent[lPath[-1]]
+
+		# Flag the field as needing to be removed
+		self._change(lPath, r.literal())
+
+		# Return ok
+		return self
+
+	# del method
+	def delete(self):
+		"""Delete
+
+		Deletes the record represented by the instance
+
+		Returns:
+			bool
+
+		Raises:
+			StorageException
+		"""
+
+		# If the instance lacks a primary key
+		if self.__dInfo['conf']['primary'] not in self._dData:
+			raise StorageException('Can not delete document with no primary key')
+
+		# Fetch the DB connection
+		with connect_with(self.__dInfo['server']) as oCon:
+
+			# Try to delete the record by its primary key
+			dRes = r \
+				.db(self.__dInfo['db']) \
+				.table(self.__dInfo['tree']._name) \
+				.get(self._dData[self.__dInfo['conf']['primary']]) \
+				.delete() \
+				.run(oCon)
+
+			# If there was an error
+			if dRes['deleted'] != 1:
+				return False
+
+			# Remove the ID
+			del self._dData[self.__dInfo['conf']['primary']]
+
+		# Return ok
+		return True
+
+	# delete get method
+	@classmethod
+	def deleteGet(cls, _id, index=None, batch=0, rate=0, durability=None, progress=None, db={}):
+		"""Delete Get
+
+		Deletes one or many documents by ID or by index. If batch is set, the
+		documents are deleted a batch at a time instead of in one write, so
+		purging large numbers of documents doesn't time out or hold up other
+		writes. Deleting all documents walks the table in primary key ranges,
+		a list of IDs is deleted in slices, and an index match is deleted from
+		the front until nothing is left
+
+		Args:
+			_id (mixed|mixed[]): The ID or IDs to delete, None for all documents
+			index (str): If set, used as the index to search instead of the
+				primary key
+			batch (uint): The number of documents to delete per write, 0 to
+				delete everything in a single write
+			rate (uint): The max number of documents to delete per second when
+				deleting in batches, 0 for no limit
+			durability (str): 'hard' or 'soft', defaults to 'soft' when deleting
+				in batches, else the table's setting
+			progress (callable): Called with the running totals after each
+				batch
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Return:
+			uint|dict: The number of documents deleted, or if deleting in
+				batches, the totals: 'deleted', 'errors', 'batches', and
+				'seconds'
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the config values associated with the Tree
+		dInfo = cls.info(db)
+
+		# Create a cursor for the records, always reading from the primary
+		oCur = cls._selection(dInfo, _id, index, True, 'single')[0]
+
+		# Set the delete options
+		dOpts = {}
+		if durability:
+			dOpts['durability'] = durability
+
+		# If we're not batching
+		if not batch:
+
+			# Get a connection to the server
+			with connect_with(dInfo['server']) as oCon:
+
+				try:
+					# Run the delete
+					dRes = oCur.delete(**dOpts).run(oCon)
+
+				except r.errors.ReqlOpFailedError as e:
+
+					# The index doesn't exist
+					if index and e.args[0][:5] == 'Index':
+						raise StorageException('no index', index, 'table')
+
+					# Else, re-raise
+					raise e
+
+			# Return the number of documents deleted
+			return dRes['deleted']
+
+		# Batches default to soft durability
+		if not durability:
+			dOpts['durability'] = 'soft'
+
+		# Init the totals
+		dTotals = {'deleted': 0, 'errors': 0, 'batches': 0, 'seconds': 0}
+		fStart = time()
+
+		# Get the primary key and the table
+		sPrimary = dInfo['conf']['primary']
+		oTable = r.db(dInfo['db']).table(dInfo['tree']._name)
+
+		# Start at the beginning of the table
+		mLast = r.minval
+
+		# If we got primary keys, start at the beginning of the list
+		itIDs = None
+		if _id is not None and not index:
+			if isinstance(_id, (tuple,list)):
+				itIDs = iter(_id)
+			else:
+				itIDs = iter([_id])
+
+		# Get a connection to the server
+		with connect_with(dInfo['server']) as oCon:
+
+			# Loop until there's nothing left
+			while True:
+
+				# If we have a list of IDs, take the next slice
+				if itIDs:
+					lKeys = list(islice(itIDs, batch))
+
+				# Else, find the keys of the next batch
+				else:
+
+					# If we want all documents, take the next primary key range,
+					#	else take whatever is left at the front of the index
+					if _id is None:
+						oKeys = oTable \
+							.between(mLast, r.maxval, left_bound='open', index=sPrimary) \
+							.order_by(index=sPrimary)
+					else:
+						oKeys = oCur
+
+					try:
+						lKeys = oKeys.limit(batch)[sPrimary].coerce_to('array').run(oCon)
+
+					except r.errors.ReqlOpFailedError as e:
+
+						# The index doesn't exist
+						if index and e.args[0][:5] == 'Index':
+							raise StorageException('no index', index, 'table')
+
+						# Else, re-raise
+						raise e
+
+				# If there's nothing left, we're done
+				if not lKeys:
+					break
+
+				# Delete the batch and add the results to the totals
+				dRes = oTable.get_all(r.args(lKeys)).delete(**dOpts).run(oCon)
+				dTotals['deleted'] += dRes['deleted']
+				dTotals['errors'] += dRes['errors']
+				dTotals['batches'] += 1
+				dTotals['seconds'] = time() - fStart
+
+				# Let the caller know how far along we are
+				if progress:
+					progress(dict(dTotals))
+
+				# If we're deleting from the front of an index and nothing was
+				#	deleted, we'd only get the same keys again
+				if index and not dRes['deleted']:
+					break
+
+				# Note where the next range starts
+				mLast = lKeys[-1]
+
+				# If there's a rate limit, wait until we're back under it
+				if rate:
+					fWait = (dTotals['deleted'] / float(rate)) - (time() - fStart)
+					if fWait > 0:
+						sleep(fWait)
+
+		# Return the totals
+		dTotals['seconds'] = time() - fStart
+		return dTotals
+
+	# distinct static method
+	@classmethod
+	def distinct(cls, field, _id=None, index=None, filter=None, contains=None, read_mode=None, db={}):
+		"""Distinct
+
+		Returns the unique values of the field across the selected records. If
+		all records are selected and the field is indexed, the index is used
+
+		Args:
+			field (str): The field to aggregate
+			_id (mixed|mixed[]): The ID(s) or index value(s) to aggregate, None
+				for all records, see get()
+			index (str): If set, used as the index to search instead of the
+				primary key
+			filter (dict): If set, used as an additional filter to the ID or
+				index lookup
+			contains (tuple): If set, the name of a list field and the value or
+				values it must contain
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			list
+
+		Raises:
+			StorageException
+		"""
+
+		# Check if the field is indexed
+		bIndexed = cls._indexed(field, db)
+
+		# Get the unique values
+		return list(cls._aggregate(
+			lambda o, b: (b and bIndexed) and \
+				o.distinct(index=field) or \
+				o.get_field(field).distinct(),
+			_id, index, filter, contains, read_mode, db
+		))
+
+	# exists static method
+	@classmethod
+	def exists(cls, _id, index=None, read_mode=None, db={}):
+		"""Exists
+
+		Checkes if the specifed document exists. Set an index to check for
+		something other than the primary key. To check if a record exists with
+		any non-indexed fields, use filter() instead
+
+		Args:
+			_id (mixed): The value or values to check
+				In the case of a primary key this is always a single value, but
+				for complex indexes a tuple may be passed
+			index (str): If set, used as the index to search instead of the
+				primary key
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			bool
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the primary key, it's the only thing we need
+		dInfo = cls.info(db)
+
+		# Use get to save repeating ourselves
+		if not cls.get(_id, index=index, raw=[dInfo['conf']['primary']], read_mode=read_mode, db=db):
+
+			# If absolutely nothing was found, return failure
+			return False
+
+		# If one or more primary keys were returned, return success
+		return True
+
+	# exists many static method
+	@classmethod
+	def existsMany(cls, ids, index=None, chunk=1000, read_mode=None, db={}):
+		"""Exists Many
+
+		Checks which of the specified documents exist using one query per
+		chunk of IDs instead of one per ID. Set an index to check for something
+		other than the primary key
+
+		Args:
+			ids (mixed[]): The values to check, for compound indexes each value
+				is a list or tuple
+			index (str): If set, used as the index to search instead of the
+				primary key
+			chunk (uint): The max number of values sent in a single query
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			set: The values that exist, compound values as tuples
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Get the index and the fields it's made of
+		index, lFields = cls._existsManyFields(dInfo, index)
+
+		# Init the set of found values
+		seFound = set()
+
+		# Make sure we have a list
+		lIDs = list(ids)
+
+		# Get a connection to the server
+		with connect_with(dInfo['server']) as oCon:
+
+			# Go through the IDs a chunk at a time, adding the values found
+			for i in range(0, len(lIDs), chunk):
+				seFound.update(cls._existsManyResult(
+					cls._existsManyQuery(dInfo, lIDs[i:i+chunk], index, lFields, read_mode).run(oCon),
+					lFields
+				))
+
+		# Return the values found
+		return seFound
+
+	# exists many fields static method
+	@staticmethod
+	def _existsManyFields(info, index):
+		"""Exists Many Fields
+
+		Returns the index existsMany() should use and the fields it's made of
+
+		Args:
+			info (dict): The Document's info
+			index (str): The index passed to existsMany()
+
+		Returns:
+			tuple: The index and the list of fields
+
+		Raises:
+			StorageException
+		"""
+
+		# If there's no index, use the primary key
+		if not index or index == info['conf']['primary']:
+			return (info['conf']['primary'], [info['conf']['primary']])
+
+		# Else, make sure the index exists and is made up of fields
+		if index not in info['conf']['indexes']:
+			raise StorageException('no index', index, 'tree')
+		lFields = _indexFields(index, info['conf']['indexes'][index])
+		if not lFields:
+			raise StorageException('index can not be checked', index)
+
+		# Return the index and the fields
+		return (index, lFields)
+
+	# exists many query static method
+	@classmethod
+	def _existsManyQuery(cls, info, ids, index, fields, read_mode):
+		"""Exists Many Query
+
+		Generates the query for one chunk of existsMany()
+
+		Args:
+			info (dict): The Document's info
+			ids (mixed[]): The values in the chunk
+			index (str): The index to search
+			fields (str[]): The fields the index is made of
+			read_mode (str): The read mode, None for the Document's setting
+
+		Returns:
+			rethinkdb.ast.RqlQuery
+		"""
+
+		# Create the cursor for the chunk
+		oCur = cls._table(info, read_mode).get_all(r.args(ids), index=index)
+
+		# If the index is a single field, we only need the value, else get all
+		#	the fields
+		if len(fields) == 1:
+			return oCur.get_field(fields[0])
+		else:
+			return oCur.pluck(*fields)
+
+	# exists many result static method
+	@staticmethod
+	def _existsManyResult(res, fields):
+		"""Exists Many Result
+
+		Processes the result of the query generated by _existsManyQuery()
+
+		Args:
+			res (iterable): The result of the query
+			fields (str[]): The fields the index is made of
+
+		Returns:
+			set: The values found, compound values as tuples
+		"""
+
+		# If the index is a single field, we already have the values
+		if len(fields) == 1:
+			return set(res)
+
+		# Else, put the fields together
+		return set([tuple([d.get(f) for f in fields]) for d in res])
+
+	# export range static method
+	@classmethod
+	def _exportRange(cls, info, start, end, batch, file, lock, counts, errors):
+		"""Export Range
+
+		Worker used by tableExport() to write one primary key range of the
+		table to the file
+
+		Args:
+			info (dict): The Document's info
+			start (mixed): The first key in the range
+			end (mixed): The key after the last key in the range
+			batch (uint): The max number of documents fetched and written at a
+				time
+			file (file): The file to write to
+			lock (threading.Lock): The lock held while writing to the file
+			counts (list): The list the number of documents written is added to
+			errors (list): The list any exception is added to
+
+		Returns:
+			None
+		"""
+
+		# Init the count
+		iCount = 0
+
+		try:
+
+			# Get a connection to the server
+			with connect_with(info['server']) as oCon:
+
+				# Read the range, leaving times and binary data in the format
+				#	they're stored in so they can be written as JSON
+				itRes = r \
+					.db(info['db']) \
+					.table(info['tree']._name) \
+					.between(start, end, index=info['conf']['primary']) \
+					.run(oCon, max_batch_rows=batch, time_format='raw', binary_format='raw')
+
+				try:
+
+					# Write the records a batch at a time until we run out, or
+					#	another worker fails
+					while not errors:
+						lLines = [
+							json.dumps(d, separators=(',',':')) + '\n'
+							for d in islice(itRes, batch)
+						]
+						if not lLines:
+							break
+						with lock:
+							file.write(''.join(lLines).encode('utf-8'))
+						iCount += len(lLines)
+
+				finally:
+
+					# Close the cursor so the connection can be reused
+					itRes.close()
+
+		# If anything goes wrong, store it for the caller
+		except Exception as e:
+			errors.append(e)
+
+		# Add the count
+		counts.append(iCount)
+
+	# filter static method
+	@classmethod
+	def filter(cls, obj, raw=None, orderby=None, stream=False, max_batch_rows=None, explain=False, read_mode=None, db={}):
+		"""Filter
+
+		Finds records based on the specific fields and values passed in the obj.
+		If the fields match the primary key or an index declared in the Tree,
+		the index is used to fetch the records and only the remaining fields
+		are filtered on
+
+		Args:
+			obj (dict): A dictionary of field names to the values they should
+				match
+			raw (bool|list): If set to true, raw dicts will be returned instead
+				of Document instances. If set to a list or tuple, only those
+				fields listed will be returned
+			orderby (str|str[]): The field(s) to order the result by, prefix
+				with '-' to sort descending. If a single index or the primary
+				key is passed and no index is used to find the records, the
+				index does the ordering
+			stream (bool): If set to true, a generator is returned which
+				fetches and instantiates records as they are iterated over
+				instead of loading them all into memory
+			max_batch_rows (uint): The max number of records fetched from the
+				server at a time while streaming
+			explain (bool): If set to true, nothing is run and the plan is
+				returned instead, see _plan()
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			Table[]|dict[]|generator|dict
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Clean the object
+		obj = dInfo['tree'].clean(obj)
+
+		# Figure out how to find the records
+		dPlan = cls._plan(dInfo['conf'], obj)
+
+		# If we only want the plan, return it
+		if explain:
+			return dPlan
+
+		# Generate the query
+		oCur = cls._filterQuery(dInfo, dPlan, raw, orderby, read_mode)
+
+		# If we're streaming, return a generator over the results
+		if stream:
+			return cls._stream(dInfo['server'], oCur, raw, db, max_batch_rows)
+
+		# Fetch the DB connection
+		with connect_with(dInfo['server']) as oCon:
+
+			# Run the request
+			itRes = oCur.run(oCon)
+
+			# If there's no data
+			if not itRes:
+				return []
+
+			# If Raw requested, return as is
+			if raw:
+				return [d for d in itRes]
+
+			# Else create instances for each
+			else:
+				return [cls._hydrate(d, db) for d in itRes]
+
+	# filter query static method
+	@classmethod
+	def _filterQuery(cls, info, plan, raw, orderby, read_mode=None):
+		"""Filter Query
+
+		Generates the query for filter(), see it for the arguments
+
+		Args:
+			info (dict): The Document's info
+			plan (dict): The plan returned by _plan()
+			raw (bool|list): See filter()
+			orderby (str|str[]): See filter()
+			read_mode (str): See _table()
+
+		Returns:
+			rethinkdb.ast.RqlQuery
+		"""
+
+		# Create a cursor for all records
+		oCur = cls._table(info, read_mode)
+
+		# If we can use an index
+		if plan['index']:
+			oCur = oCur.get_all(plan['value'], index=plan['index'])
+
+		# Figure out how to order the records
+		oIndexOrder, lOrder = cls._order(
+			info['conf'], orderby, plan['index'] is None
+		)
+
+		# If the index can do the ordering, it has to come first
+		if oIndexOrder is not None:
+			oCur = oCur.order_by(index=oIndexOrder)
+
+		# If there's anything left to filter on
+		if plan['filter']:
+			oCur = oCur.filter(plan['filter'])
+
+		# If there's fields to order by
+		if lOrder:
+			oCur = oCur.order_by(*lOrder)
+
+		# If a raw request was done with specific fields
+		if isinstance(raw, (tuple,list)):
+			oCur = oCur.pluck(*raw).default(None)
+
+		# Return the query
+		return oCur
+
+	# g method
+	def g(self, field=None, default=None):
+		"""G (get)
+
+		Unlike the static get which is used to fetch by ID, this get returns
+		fields within the document
+
+		Args:
+			field (str): The name of the field to return, or None for the entire
+				document
+			default (mixed): The value to return if the field doesn't exist
+				defaults to None
+
+		Returns:
+			mixed
+		"""
+
+		# If got nothing for the field
+		if not field:
+			return self._dData
+
+		# If the field doesn't exist
+		if field not in self._dData:
+			return default
+
+		# Else, return the field
+		return self._dData[field]
+
+	# generate config static method
+	@staticmethod
+	def generateConfig(tree):
+		"""Generate Config
+
+		Uses a Format-OC tree to generate the base DB config for the Document
+
+		Args:
+			tree (FormatOC.Tree): the tree associated with the document
+
+		Returns:
+			dict
+		"""
+
+		# Merge them with the default values
+		dConf = Dict.merge({
+			"auto_id": True,
+			"server": "default",
+			"db": "Test",
+			"indexes": {},
+			"primary": "_id",
+			"primary_replica_tag": None,
+			"read_mode": "single",
+			"replicas": None,
+			"revisions": False,
+			"shards": None,
+			"ttl": None,
+		}, tree.special('rethinkdb', default={}))
+
+		# If there's no name throw an exception
+		if not tree._name:
+			raise StorageException('Tree must contain a __name__ field to be used by Storage.Document')
+
+		# Return the config
+		return dConf
+
+	# get static method
+	@classmethod
+	def get(cls, _id=None, index=None, filter=None, contains=None, raw=None, orderby=None, limit=0, stream=False, max_batch_rows=None, read_mode=None, db={}):
+		"""Get
+
+		Returns one or more records from the table. Send no ID to fetch all
+		records in the table. Set an index to look for something other than the
+		primary key
+
+		Args:
+			_id (str|str[]): The ID(s) to fetch from the table
+			index (str): If set, used as the index to search instead of the
+				primary key
+			filter (dict): If set, used as an additional filter to the ID or
+				index lookup
+			raw (bool|list): If set to true, raw dicts will be returned instead
+				of Document instances. If set to a list or tuple, only those
+				fields listed will be returned
+			orderby (str|str[]): The field(s) to order the result by, prefix
+				with '-' to sort descending. If a single index or the primary
+				key is passed and all records or an index range are being
+				fetched, the index does the ordering before any limit
+			limit (uint): The number of records to return
+			stream (bool): If set to true, a generator is returned which
+				fetches and instantiates records as they are iterated over
+				instead of loading them all into memory
+			max_batch_rows (uint): The max number of records fetched from the
+				server at a time while streaming
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			Table|Table[]|dict|dict[]|generator
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# If there's a cache and nothing it can't handle was requested
+		if Document._dCaches and not (filter or contains or orderby or stream):
+
+			# Find the cache for the class and DB
+			oCache = Document._dCaches.get((cls, db.get('server'), db.get('postfix')))
+
+			# If there is one, see if it can answer the request
+			if oCache:
+				bFound, mRes = oCache.get(_id, index, limit)
+				if bFound:
+
+					# If a raw request was done with specific fields
+					if isinstance(raw, (tuple,list)):
+						if isinstance(mRes, list):
+							mRes = [dict([(k,d[k]) for k in raw if k in d]) for d in mRes]
+						elif mRes is not None:
+							mRes = dict([(k,mRes[k]) for k in raw if k in mRes])
+
+					# If raw was requested, or there's nothing, return as is
+					if raw or mRes is None:
+						return mRes
+
+					# Else create instances
+					if isinstance(mRes, list):
+						return [cls._hydrate(d, db) for d in mRes]
+					return cls._hydrate(mRes, db)
+
+		# Generate the query
+		oCur, bMultiple = cls._getQuery(dInfo, _id, index, filter, contains, raw, orderby, limit, read_mode)
+
+		# If we're streaming, return a generator over the results
+		if stream:
+			return cls._stream(dInfo['server'], oCur, raw, db, max_batch_rows, index)
+
+		# Get a connection to the server
+		with connect_with(dInfo['server']) as oCon:
+
+			try:
+				# Run the request
+				itRes = oCur.run(oCon)
+
+			except r.errors.ReqlOpFailedError as e:
+
+				# The index doesn't exist
+				if e.args[0][:5] == 'Index':
+					raise StorageException('no index', index, 'table')
+
+				# Else, re-raise
+				raise e
+
+			# If we are expecting a single record
+			if limit == 1:
+
+				# Try to get one row, ordering by fields returns a list instead
+				#	of a cursor
+				dRow = next(iter(itRes), None)
+
+				# If we got a cursor, close it so the connection can be reused
+				if hasattr(itRes, 'close'):
+					itRes.close()
+
+				# If there's no row
+				if dRow is None:
+					return None
+
+				# If it's raw, don't instantiate it
+				return (raw and dRow or cls._hydrate(dRow, db))
+
+			# If there's no data
+			if not itRes:
+				if bMultiple:
+					if limit == 1: return None
+					else: return []
+				else: return None
+
+			# If multiple records are expected
+			if bMultiple:
+
+				# If Raw requested, return as is
+				if raw:
+					return [d for d in itRes]
+
+				# Else create instances for each
+				else:
+					return [cls._hydrate(d, db) for d in itRes]
+
+			# Else, one record requested
+			else:
+				return raw and itRes or cls._hydrate(itRes, db)
+
+	# get query static method
+	@classmethod
+	def _getQuery(cls, info, _id, index, filter, contains, raw, orderby, limit, read_mode=None):
+		"""Get Query
+
+		Generates the query for get(), see it for the arguments
+
+		Returns:
+			tuple: The query, and whether it returns a sequence
+
+		Raises:
+			StorageException
+		"""
+
+		# Create a cursor for the requested records
+		oCur, bMultiple, mOrderable = cls._selection(info, _id, index, True, read_mode)
+
+		# Figure out how to order the records
+		oIndexOrder, lOrder = cls._order(info['conf'], orderby, mOrderable)
+
+		# If the index can do the ordering, it has to come first
+		if oIndexOrder is not None:
+			oCur = oCur.order_by(index=oIndexOrder)
+
+		# Add any additional filters
+		oCur = cls._where(oCur, filter, contains)
+
+		# If there's fields to order by, it has to be done before the limit
+		if lOrder:
+			oCur = oCur.order_by(*lOrder)
+
+		# If there's a limit
+		if limit > 0:
+			oCur = oCur.limit(limit)
+
+		# If a raw request was done with specific fields
+		if isinstance(raw, (tuple,list)):
+			oCur = oCur.pluck(*raw).default(None)
+
+		# Return the query
+		return (oCur, bMultiple)
+
+	# group static method
+	@classmethod
+	def group(cls, field, aggregate='count', value=None, _id=None, index=None, filter=None, contains=None, read_mode=None, db={}):
+		"""Group
+
+		Groups the selected records by the field and aggregates each group on
+		the server. If all records are selected and the field is indexed, the
+		index is used to group
+
+		Args:
+			field (str): The field to group by
+			aggregate (str): One of 'count', 'sum', 'avg', 'min', or 'max'
+			value (str): The field to aggregate, required for anything but
+				'count'
+			_id (mixed|mixed[]): The ID(s) or index value(s) to group, None
+				for all records, see get()
+			index (str): If set, used as the index to search instead of the
+				primary key
+			filter (dict): If set, used as an additional filter to the ID or
+				index lookup
+			contains (tuple): If set, the name of a list field and the value or
+				values it must contain
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			dict: The aggregated value of each group by the group's value
+
+		Raises:
+			StorageException
+			ValueError
+		"""
+
+		# If the aggregate is invalid
+		if aggregate not in ('count', 'sum', 'avg', 'min', 'max'):
+			raise ValueError('aggregate', aggregate)
+
+		# If we need a value but didn't get one
+		if aggregate != 'count' and not value:
+			raise ValueError('value')
+
+		# Check if the field is indexed
+		bIndexed = cls._indexed(field, db)
+
+		# Group function
+		def fGroup(o, b):
+
+			# Group the records
+			if b and bIndexed:
+				o = o.group(index=field)
+			else:
+				o = o.group(field)
+
+			# Aggregate each group
+			if aggregate == 'count':
+				return o.count()
+			elif aggregate in ('min', 'max'):
+				return getattr(o, aggregate)(value)[value]
+			else:
+				return getattr(o, aggregate)(value)
+
+		# Group and aggregate the records
+		return cls._aggregate(fGroup, _id, index, filter, contains, read_mode, db)
+
+	# hydrate static method
+	@classmethod
+	def _hydrate(cls, data, db={}):
+		"""Hydrate
+
+		Creates an instance from a record read back from the DB. Unless the
+		class has turned off _TRUST_STORED, the data is assumed to be valid
+		and clean as it could only have gotten there through insert() or
+		update(), so the Tree is skipped entirely
+
+		Args:
+			data (dict): The record as returned by RethinkDB
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			Document
+		"""
+
+		# If the class doesn't trust the DB, go through the constructor
+		if not cls._TRUST_STORED:
+			o = cls(data, db)
+
+		# Else, create the instance without calling the constructor
+		else:
+			o = cls.__new__(cls)
+			o.__dInfo = cls.info(db)
+			o._dData = data
+			o._dChanged = {}
+			o._dHashes = {}
+
+		# Note it came from the DB and return it
+		o._bNew = False
+		return o
+
+	# import batches static method
+	@classmethod
+	def _importBatches(cls, queue, conflict, db, counts, errors):
+		"""Import Batches
+
+		Worker used by tableImport() to insert the batches of lines taken off
+		the queue until it gets None
+
+		Args:
+			queue (Queue): The queue of lists of lines
+			conflict (str): Must be one of 'error', 'replace', or 'update'
+			db (dict): Optional DB info
+			counts (list): The list the number of documents inserted is added
+				to
+			errors (list): The list any exception is added to
+
+		Returns:
+			None
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Init the count
+		iCount = 0
+
+		# Loop until we're told to stop
+		while True:
+
+			# Get the next batch, None means there's no more
+			lLines = queue.get()
+			if lLines is None:
+				break
+
+			# If a worker already failed, just drain the queue
+			if errors:
+				continue
+
+			try:
+
+				# Validate and clean the documents, leaving any revisions as
+				#	they were exported
+				lDocs = [
+					cls(json.loads(s.decode('utf-8')), db)._dData
+					for s in lLines
+				]
+
+				# Insert the batch as is
+				with connect_with(dInfo['server']) as oCon:
+					dRes = r \
+						.db(dInfo['db']) \
+						.table(dInfo['tree']._name) \
+						.insert(
+							lDocs,
+							conflict=conflict,
+							durability='soft',
+							return_changes=False
+						) \
+						.run(oCon)
+
+				# Count only what the server accepted, documents identical to
+				#	the ones they replace come back unchanged
+				iCount += dRes['inserted'] + dRes['replaced'] + dRes['unchanged']
+
+				# If any documents were rejected, store it for the caller
+				if dRes['errors']:
+					errors.append(StorageException(dRes['first_error'], dRes['errors']))
+
+			# If anything goes wrong, store it for the caller
+			except Exception as e:
+				errors.append(e)
+
+		# Add the count
+		counts.append(iCount)
+
+	# info method
+	@classmethod
+	def info(cls, db={}):
+		"""Info
+
+		Returns table and db info for the given Document. The result is cached
+		per class and DB info until the global prefix or a server changes, so it
+		must not be modified
+
+		Args:
+			db (dict): Optional 'postfix' and 'server' values for the Document
+
+		Returns:
+			dict
+		"""
+
+		# Generate the key and try to return the existing info
+		tKey = (cls, db.get('server'), db.get('postfix'))
+		try:
+			return Document._dInfoCache[tKey]
+		except KeyError:
+			pass
+
+		# Get the config values associated with the Tree
+		dStruct = cls.struct()
+
+		# Init the return value
+		dRet = {
+			"tree": dStruct['tree'],
+			"conf": dStruct['conf'],
+			"server": dStruct['conf']['server'],
+			"db": dStruct['conf']['db'],
+			"key": tKey
+		}
+
+		# If there's a server name passed
+		if 'server' in db:
+			dRet['server'] = db['server']
+
+		# If there's a postfix passed
+		if 'postfix' in db:
+			dRet['db'] = "%s_%s" % (dRet['db'], db['postfix'])
+
+		# Get the prefix and prefix it if there is one
+		sPrefix = globalPrefix()
+		if sPrefix:
+			dRet['db'] = sPrefix + dRet['db']
+
+		# Store and return the structure
+		Document._dInfoCache[tKey] = dRet
+		return dRet
+
+	# insert method
+	def insert(self, conflict='error'):
+		"""Insert
+
+		Inserts the current instance's data as a new record in the table and
+		returns the ID regardless if it was given or generated
+
+		Args:
+			conflict (str): Must be one of 'error', 'replace', or 'update'
+
+		Returns:
+			mixed: None if no record was created, replaced, or updated
+		"""
+
+		# Clean conflict
+		if conflict not in ('error', 'replace', 'update'):
+			conflict = 'error'
+
+		# If revisions are turned on, generate a new value
+		if self.__dInfo['conf']['revisions']:
+			self._revision(True)
+
+		# Get a connection to the server
+		with connect_with(self.__dInfo['server']) as oCon:
+
+			# Create a new document
+			dRes = r \
+				.db(self.__dInfo['db']) \
+				.table(self.__dInfo['tree']._name) \
+				.insert(self._dData, conflict=conflict) \
+				.run(oCon)
+
+		# If there was an error
+		if dRes['inserted'] != 1 and dRes['replaced'] != 1:
+			return None
+
+		# Store the ID if necessary
+		if self.__dInfo['conf']['auto_id']:
+			self._dData[self.__dInfo['conf']['primary']] = dRes['generated_keys'][0]
+		self._bNew = False
+
+		# Return the ID
+		return self._dData[self.__dInfo['conf']['primary']]
+
+	# insert many static method
+	@classmethod
+	def insertMany(cls, docs, conflict='error', durability='hard', chunk=1000, db={}):
+		"""Insert Many
+
+		Inserts any number of documents using one query per chunk instead of
+		one per document. Dicts are validated and cleaned the same way the
+		constructor does it, Documents are used as is. Any generated keys are
+		stored back on the Document instances. If the server rejects any
+		document in a chunk, e.g. a duplicate key when conflict is 'error', a
+		StorageException with the first error is raised, any earlier chunks
+		have already been written
+
+		Args:
+			docs (dict[]|Document[]): An iterable of the documents to insert
+			conflict (str): Must be one of 'error', 'replace', or 'update'
+			durability (str): 'hard' to wait for the data to be written to
+				disk, 'soft' to only wait for it to be in memory
+			chunk (uint): The max number of documents sent in a single query
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			mixed[]: The IDs of the documents in the order they were passed,
+				None for any document that ended up without one
+
+		Raises:
+			StorageException
+			ValueError
+		"""
+
+		# Clean conflict and durability
+		if conflict not in ('error', 'replace', 'update'):
+			conflict = 'error'
+		if durability not in ('hard', 'soft'):
+			durability = 'hard'
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Init the list of IDs
+		lIDs = []
+
+		# Get an iterator over the documents
+		itDocs = iter(docs)
+
+		# Get a connection to the server
+		with connect_with(dInfo['server']) as oCon:
+
+			# Loop until we run out of documents
+			while True:
+
+				# Turn the next chunk into instances
+				lInst = [
+					isinstance(d, Document) and d or cls(d, db)
+					for d in islice(itDocs, chunk)
+				]
+
+				# If there's nothing left, we're done
+				if not lInst:
+					break
+
+				# Insert the entire chunk at once
+				dRes = cls._insertManyQuery(dInfo, lInst, conflict, durability).run(oCon)
+
+				# Process the results and add the IDs to the list
+				lIDs.extend(cls._insertManyResult(dInfo, lInst, dRes))
+
+		# Return the IDs
+		return lIDs
+
+	# insert many query static method
+	@staticmethod
+	def _insertManyQuery(info, insts, conflict, durability):
+		"""Insert Many Query
+
+		Generates the query for one chunk of insertMany(), creating the
+		revisions of the documents if they're turned on
+
+		Args:
+			info (dict): The Document's info
+			insts (Document[]): The documents in the chunk
+			conflict (str): 'error', 'replace', or 'update'
+			durability (str): 'hard' or 'soft'
+
+		Returns:
+			rethinkdb.ast.RqlQuery
+		"""
+
+		# If revisions are turned on, generate new values
+		if info['conf']['revisions']:
+			for o in insts:
+				o._revision(True)
+
+		# Return the insert for the entire chunk
+		return r \
+			.db(info['db']) \
+			.table(info['tree']._name) \
+			.insert(
+				[o._dData for o in insts],
+				conflict=conflict,
+				durability=durability,
+				return_changes=False
+			)
+
+	# insert many result static method
+	@staticmethod
+	def _insertManyResult(info, insts, res):
+		"""Insert Many Result
+
+		Processes the result of the query generated by _insertManyQuery()
+
+		Args:
+			info (dict): The Document's info
+			insts (Document[]): The documents in the chunk
+			res (dict): The result of the query
+
+		Returns:
+			mixed[]: The IDs of the documents
+
+		Raises:
+			StorageException
+		"""
+
+		# If any documents were rejected, we can't tell which, so don't report
+		#	any of the chunk as written
+		if res['errors']:
+			raise StorageException(res['first_error'], res['errors'])
+
+		# If we generate IDs, store them on the documents that lacked one, the
+		#	keys come back in the same order
+		sPrimary = info['conf']['primary']
+		if info['conf']['auto_id'] and 'generated_keys' in res:
+			itKeys = iter(res['generated_keys'])
+			for o in insts:
+				if sPrimary not in o._dData:
+					mKey = next(itKeys, None)
+					if mKey is None:
+						break
+					o._dData[sPrimary] = mKey
+
+		# Return the IDs
+		return [o._dData.get(sPrimary) for o in insts]
+
+	# max static method
+	@classmethod
+	def max(cls, field, _id=None, index=None, filter=None, contains=None, read_mode=None, db={}):
+		"""Max
+
+		Returns the highest value of the field across the selected records, or
+		None if there are no records. If all records are selected and the field
+		is indexed, the index is used
+
+		Args:
+			field (str): The field to aggregate
+			_id (mixed|mixed[]): The ID(s) or index value(s) to aggregate, None
+				for all records, see get()
+			index (str): If set, used as the index to search instead of the
+				primary key
+			filter (dict): If set, used as an additional filter to the ID or
+				index lookup
+			contains (tuple): If set, the name of a list field and the value or
+				values it must contain
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			mixed
+
+		Raises:
+			StorageException
+		"""
+
+		# Check if the field is indexed
+		bIndexed = cls._indexed(field, db)
+
+		# Find the record with the highest value and return just the value
+		return cls._aggregate(
+			lambda o, b: ((b and bIndexed) and \
+				o.max(index=field) or \
+				o.max(field))[field].default(None),
+			_id, index, filter, contains, read_mode, db
+		)
+
+	# min static method
+	@classmethod
+	def min(cls, field, _id=None, index=None, filter=None, contains=None, read_mode=None, db={}):
+		"""Min
+
+		Returns the lowest value of the field across the selected records, or
+		None if there are no records. If all records are selected and the field
+		is indexed, the index is used
+
+		Args:
+			field (str): The field to aggregate
+			_id (mixed|mixed[]): The ID(s) or index value(s) to aggregate, None
+				for all records, see get()
+			index (str): If set, used as the index to search instead of the
+				primary key
+			filter (dict): If set, used as an additional filter to the ID or
+				index lookup
+			contains (tuple): If set, the name of a list field and the value or
+				values it must contain
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			mixed
+
+		Raises:
+			StorageException
+		"""
+
+		# Check if the field is indexed
+		bIndexed = cls._indexed(field, db)
+
+		# Find the record with the lowest value and return just the value
+		return cls._aggregate(
+			lambda o, b: ((b and bIndexed) and \
+				o.min(index=field) or \
+				o.min(field))[field].default(None),
+			_id, index, filter, contains, read_mode, db
+		)
+
+	# order static method
+	@staticmethod
+	def _order(conf, orderby, orderable):
+		"""Order
+
+		Turns the orderby argument of get() and filter() into ReQL. A single
+		name matching the primary key or an index is ordered using the index if
+		the records being fetched allow it, else any index is broken into its
+		fields and sorted on those
+
+		Args:
+			conf (dict): The Document's config
+			orderby (str|str[]): The field(s) or index to order by, each one
+				prefixed with '-' to sort descending
+			orderable (bool|str): True if the records are coming straight from
+				the table, the name of the index if they are coming from a range
+				on that index, else False
+
+		Returns:
+			tuple: The ordered index for order_by(index=), or None, and the list
+				of ordered fields to pass to order_by()
+		"""
+
+		# If there's no order
+		if not orderby:
+			return (None, [])
+
+		# If we got a single name
+		if isinstance(orderby, basestring):
+
+			# Split off the direction
+			bDesc = orderby[:1] == '-'
+			sName = bDesc and orderby[1:] or orderby
+
+			# If it's the primary key or an index
+			if sName == conf['primary'] or sName in conf['indexes']:
+
+				# If the records can be ordered by the index, let it do it
+				if orderable is True or orderable == sName:
+					return (bDesc and r.desc(sName) or r.asc(sName), [])
+
+				# Else, if it's an index, turn it into the fields that make it up
+				if sName in conf['indexes']:
+					lFields = _indexFields(sName, conf['indexes'][sName])
+					if lFields:
+						return (None, [bDesc and r.desc(f) or r.asc(f) for f in lFields])
+
+			# Order by the field
+			return (None, [bDesc and r.desc(sName) or r.asc(sName)])
+
+		# Else, go through each field and set the direction, anything that
+		#	isn't a string is assumed to already be ReQL
+		lOrder = []
+		for mField in orderby:
+			if not isinstance(mField, basestring):
+				lOrder.append(mField)
+			elif mField[:1] == '-':
+				lOrder.append(r.desc(mField[1:]))
+			else:
+				lOrder.append(r.asc(mField))
+
+		# Return the fields
+		return (None, lOrder)
+
+	# paginate static method
+	@classmethod
+	def paginate(cls, index=None, page_size=100, after=None, filter=None, raw=None, db={}):
+		"""Paginate
+
+		Returns one page of records ordered by the index along with the token
+		needed to fetch the next page. Pages start right after the last key of
+		the previous page instead of skipping records, so every page costs the
+		same no matter how deep it is. Records with the same value in a non
+		unique index can be split across a page boundary and missed, so use the
+		primary key or a compound index ending in a unique field for those
+
+		Args:
+			index (str): The index to page through, defaults to the primary key
+			page_size (uint): The max number of records in the page
+			after (mixed): The token returned with the previous page, None for
+				the first page
+			filter (dict): If set, used as an additional filter on the page
+			raw (bool|list): If set to true, raw dicts will be returned instead
+				of Document instances. If set to a list or tuple, only those
+				fields listed will be returned
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			tuple: The list of records and the token for the next page, the
+				token is None once there are no more pages
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Generate the query
+		oCur, index, lFields = cls._paginateQuery(dInfo, index, page_size, after, filter, raw)
+
+		# Get a connection to the server
+		with connect_with(dInfo['server']) as oCon:
+
+			try:
+				# Run the request
+				lRows = list(oCur.run(oCon))
+
+			except r.errors.ReqlOpFailedError as e:
+
+				# The index doesn't exist
+				if e.args[0][:5] == 'Index':
+					raise StorageException('no index', index, 'table')
+
+				# Else, re-raise
+				raise e
+
+		# Process the rows
+		return cls._paginateResult(lRows, lFields, page_size, raw, db)
+
+	# paginate query static method
+	@classmethod
+	def _paginateQuery(cls, info, index, page_size, after, filter, raw):
+		"""Paginate Query
+
+		Generates the query for paginate()
+
+		Args:
+			info (dict): The Document's info
+			index (str): The index to page through, None for the primary key
+			page_size (uint): The max number of records in the page
+			after (mixed): The token returned with the previous page
+			filter (dict): An additional filter on the page
+			raw (bool|list): The raw argument passed to paginate()
+
+		Returns:
+			tuple: The query, the index, and the fields making up the token
+
+		Raises:
+			StorageException
+		"""
+
+		# If there's no index, use the primary key
+		if not index or index == info['conf']['primary']:
+			index = info['conf']['primary']
+			lFields = [index]
+
+		# Else, make sure the index exists and is made up of fields
+		else:
+			if index not in info['conf']['indexes']:
+				raise StorageException('no index', index, 'tree')
+			lFields = _indexFields(index, info['conf']['indexes'][index])
+			if not lFields:
+				raise StorageException('index can not be paginated', index)
+
+		# Start after the token, or at the start if there isn't one
+		mStart = after
+		if after is None:
+			mStart = r.minval
+
+		# Create the cursor for the page
+		oCur = r \
+			.db(info['db']) \
+			.table(info['tree']._name) \
+			.between(mStart, r.maxval, left_bound='open', index=index) \
+			.order_by(index=index)
+
+		# If an additional filter was passed
+		if filter:
+			oCur = oCur.filter(filter)
+
+		# Limit to the size of the page
+		oCur = oCur.limit(page_size)
+
+		# If a raw request was done with specific fields, make sure we also get
+		#	the fields that make up the token
+		if isinstance(raw, (tuple,list)):
+			oCur = oCur.pluck(*(list(raw) + [f for f in lFields if f not in raw]))
+
+		# Return the query, the index, and the fields
+		return (oCur, index, lFields)
+
+	# paginate result static method
+	@classmethod
+	def _paginateResult(cls, rows, fields, page_size, raw, db):
+		"""Paginate Result
+
+		Processes the rows returned by the query generated by
+		_paginateQuery()
+
+		Args:
+			rows (dict[]): The records in the page
+			fields (str[]): The fields making up the token
+			page_size (uint): The max number of records in the page
+			raw (bool|list): The raw argument passed to paginate()
+			db (dict): Optional DB info
+
+		Returns:
+			tuple: The list of records and the token for the next page
+		"""
+
+		# If the page is full, generate the token from the last record
+		mToken = None
+		if rows and len(rows) == page_size:
+			dLast = rows[-1]
+			if len(fields) == 1:
+				mToken = dLast[fields[0]]
+			else:
+				mToken = [dLast[f] for f in fields]
+
+		# If we added fields to the raw request, remove them
+		if isinstance(raw, (tuple,list)):
+			for sField in fields:
+				if sField not in raw:
+					for d in rows:
+						d.pop(sField, None)
+
+		# Return the records and the token
+		return (
+			raw and rows or [cls._hydrate(d, db) for d in rows],
+			mToken
+		)
+
+	# plan static method
+	@staticmethod
+	def _plan(conf, obj):
+		"""Plan
+
+		Figures out the best way to find records matching the fields in obj.
+		The primary key is used if it's in obj, else the index covering the
+		most fields, and whatever fields aren't covered are left to be filtered.
+		Fields holding None, lists, or dicts are never matched to an index as
+		they don't behave the same as they do in a filter
+
+		Args:
+			conf (dict): The Document's config
+			obj (dict): A dictionary of field names to the values they should
+				match
+
+		Returns:
+			dict: 'index' the name of the index to use, or None for a full
+				table scan, 'value' the value to pass to get_all(), and 'filter'
+				the fields left to filter on
+		"""
+
+		# Get the list of fields that can be looked up
+		lUsable = [k for k,v in obj.items()
+					if v is not None and not isinstance(v, (dict,list,tuple))]
+
+		# If the primary key is set, nothing beats it
+		if conf['primary'] in lUsable:
+			sIndex = conf['primary']
+			lFields = [sIndex]
+
+		# Else, look for the index covering the most fields
+		else:
+			sIndex = None
+			lFields = []
+			for sName,mFields in conf['indexes'].items():
+				lIndex = _indexFields(sName, mFields)
+				if lIndex and len(lIndex) > len(lFields) and \
+					all([f in lUsable for f in lIndex]):
+					sIndex = sName
+					lFields = lIndex
+
+		# Figure out the value to look up, compound indexes take a list
+		if not sIndex:
+			mValue = None
+		elif len(lFields) == 1:
+			mValue = obj[lFields[0]]
+		else:
+			mValue = [obj[f] for f in lFields]
+
+		# Return the plan
+		return {
+			"index": sIndex,
+			"value": mValue,
+			"filter": dict([(k,v) for k,v in obj.items() if k not in lFields])
+		}
+
+	# s method
+	def s(self, field, value):
+		"""S (set)
+
+		Sets a field in the document. Nested fields can be set by passing the
+		list of keys leading to them, as long as each one is a parent in the
+		Tree
+
+		Args:
+			field (str|str[]): The name of the field to set, or a list of keys
+				leading to a nested field
+			value (mixed): The value to set the field to
+
+		Returns:
+			self for chaining
+
+		Raise:
+			KeyError: field doesn't exist
+			ValueError: value is not valid for the field
+		"""
+
+		# Make sure we have a path
+		lPath = isinstance(field, (tuple,list)) and list(field) or [field]
+
+		# Find the node in the Tree associated with the document
+		oNode = self.__dInfo['tree']
+		for sKey in lPath:
+
+			# If the field doesn't exist in the tree
+			if not hasattr(oNode, '__contains__') or sKey not in oNode:
+				raise KeyError(field)
+
+			oNode = oNode[sKey]
+
+		# If the value isn't valid
+		if not oNode.valid(value):
+			raise ValueError(field)
+
+		# Find the parent of the field, creating any missing parents
+		dParent = self._dData
+		for sKey in lPath[:-1]:
+			if not isinstance(dParent.get(sKey), dict):
+				dParent[sKey] = {}
+			dParent = dParent[sKey]
+
+		# Store the value and update the changes
+		mClean = oNode.clean(value)
+		dParent[lPath[-1]] = mClean
+		self._change(lPath, mClean)
+
+		# Return ok
+		return self
+
+	# selection static method
+	@classmethod
+	def _selection(cls, info, _id=None, index=None, single=True, read_mode=None):
+		"""Selection
+
+		Creates the cursor for the records matching the ID(s) or index
+		value(s) passed, as described in get()
+
+		Args:
+			info (dict): The Document's info
+			_id (mixed|mixed[]): The ID(s) or index value(s) to select, None for
+				all records
+			index (str): If set, used as the index to search instead of the
+				primary key
+			single (bool): If false, a single ID still results in a sequence
+			read_mode (str): See _table()
+
+		Returns:
+			tuple: The cursor, whether it returns a sequence, and True if it can
+				be ordered by any index or the name of the index it can be
+				ordered by, else False
+
+		Raises:
+			StorageException
+		"""
+
+		# Assume multiple records, and that the records can't be ordered by an
+		#	index
+		bMultiple = True
+		mOrderable = False
+
+		# If there is an index passed
+		if index:
+
+			# If the index doesn't exist
+			if index not in info['conf']['indexes']:
+				raise StorageException('no index', index, 'tree')
+
+		# Create a cursor for all records
+		oCur = cls._table(info, read_mode)
+
+		# If all records must be returned, we don't need to modify the
+		#	cursor any further
+		if _id == None:
+			mOrderable = True
+
+		# Else, if there's an index
+		elif index:
+
+			# If it's a tuple
+			if isinstance(_id, tuple):
+
+				# Check if one of the values is None
+				iNone = -1
+				for i in range(len(_id)):
+
+					# If a value is None
+					if _id[i] is None:
+
+						# If we already have an index
+						if iNone != -1:
+							raise StorageException('can\'t list more than one None in an index tuple')
+
+						# Store the index
+						iNone = i
+
+				# If we have one
+				if iNone > -1:
+
+					# Copy the tuples
+					idMax = list(_id)
+					idMin = list(_id)
+
+					# Change the None accordingly
+					idMax[iNone] = r.maxval
+					idMin[iNone] = r.minval
+
+					# Call between instead of get_all
+					oCur = oCur.between(idMin, idMax, index=index)
+					mOrderable = index
+
+				# Else we have no Nones, pass it through
+				else:
+					oCur = oCur.get_all(_id, index=index)
+
+			# Else if it's a list
+			elif isinstance(_id, list):
+				oCur = oCur.get_all(r.args(_id), index=index)
+
+			# Else just pass it through
+			else:
+				oCur = oCur.get_all(_id, index=index)
+
+		# Else, we are dealing with the primary key
+		else:
+
+			# If we got multiple IDs
+			if isinstance(_id, (tuple,list)):
+
+				# Continue to filter using get all
+				oCur = oCur.get_all(*_id)
+
+			# Else if we want a single record but need a sequence
+			elif not single:
+				oCur = oCur.get_all(_id)
+
+			# Else we want one record
+			else:
+
+				# Turn off the multiple flag
+				bMultiple = False
+
+				# Filter to a single ID
+				oCur = oCur.get(_id)
 
-				# If it's a tuple
-				if isinstance(_id, tuple):
+		# Return the cursor and what we know about it
+		return (oCur, bMultiple, mOrderable)
 
-					# Check if one of the values is None
-					iNone = -1
-					for i in range(len(_id)):
+	# stream static method
+	@classmethod
+	def _stream(cls, server, query, raw, db, batch=None, index=None):
+		"""Stream
 
-						# If a value is None
-						if _id[i] is None:
+		Generator that runs the query and yields records one at a time as they
+		come off the cursor, so only one batch is ever held in memory. The
+		connection is held until the generator is exhausted or closed, so it's
+		always borrowed from the pool rather than taken from a session that
+		might end first
 
-							# If we already have an index
-							if iNone != -1:
-								raise StorageException('can\'t list more than one None in an index tuple')
+		Args:
+			server (str): The name of the server to run the query on
+			query (rethinkdb.ast.RqlQuery): The query to run
+			raw (bool|list): If set, raw dicts are yielded instead of Document
+				instances
+			db (dict): Optional DB info passed to the instances
+			batch (uint): The max number of records fetched at a time
+			index (str): The index used by the query, if any
 
-							# Store the index
-							iNone = i
+		Returns:
+			generator
 
-					# If we have one
-					if iNone > -1:
+		Raises:
+			StorageException
+		"""
 
-						# Copy the tuples
-						idMax = list(_id)
-						idMin = list(_id)
+		# Only send the batch size if we have one
+		dOpts = batch and {"max_batch_rows": batch} or {}
 
-						# Change the None accordingly
-						idMax[iNone] = r.maxval
-						idMin[iNone] = r.minval
+		# Get a connection to the server of our own
+		with connect_with(server, False) as oCon:
 
-						# Call between instead of get_all
-						oCur = oCur.between(idMin, idMax, index=index)
+			try:
+				# Run the request
+				itRes = query.run(oCon, **dOpts)
 
-					# Else we have no Nones, pass it through
-					else:
-						oCur = oCur.get_all(_id, index=index)
+			except r.errors.ReqlOpFailedError as e:
 
-				# Else if it's a list
-				elif isinstance(_id, list):
-					oCur = oCur.get_all(r.args(_id), index=index)
+				# The index doesn't exist
+				if index and e.args[0][:5] == 'Index':
+					raise StorageException('no index', index, 'table')
 
-				# Else just pass it through
-				else:
-					oCur = oCur.get_all(_id, index=index)
+				# Else, re-raise
+				raise e
 
-			# Else, we are dealing with the primary key
-			else:
+			# If there's no data
+			if itRes is None:
+				return
 
-				# If we got multiple IDs
-				if isinstance(_id, (tuple,list)):
+			# If we got a single record, wrap it so it can be iterated over
+			if isinstance(itRes, dict):
+				itRes = [itRes]
 
-					# Continue to filter using get all
-					oCur = oCur.get_all(*_id)
+			try:
 
-				# Else we want one record
-				else:
+				# Go through each record and yield it
+				for d in itRes:
+					yield raw and d or cls._hydrate(d, db)
 
-					# Turn off the multiple flag
-					bMultiple = False
+			finally:
 
-					# Filter to a single ID
-					oCur = oCur.get(_id)
+				# If the cursor is still open, close it so the connection can
+				#	be reused
+				if hasattr(itRes, 'close'):
+					itRes.close()
 
-			# If an additional filter was passed
-			if filter:
-				oCur = oCur.filter(filter)
+	# sum static method
+	@classmethod
+	def sum(cls, field, _id=None, index=None, filter=None, contains=None, read_mode=None, db={}):
+		"""Sum
 
-			# If there's a contains
-			if contains:
+		Returns the total of the field across the selected records
 
-				# If we don't have a list
-				if not isinstance(contains[1], (tuple,list)):
-					contains = [contains[0], [contains[1]]]
+		Args:
+			field (str): The field to aggregate
+			_id (mixed|mixed[]): The ID(s) or index value(s) to aggregate, None
+				for all records, see get()
+			index (str): If set, used as the index to search instead of the
+				primary key
+			filter (dict): If set, used as an additional filter to the ID or
+				index lookup
+			contains (tuple): If set, the name of a list field and the value or
+				values it must contain
+			read_mode (str): 'single', 'majority', or 'outdated', defaults to
+				the Document's setting. 'outdated' lets any replica answer, which
+				spreads the load but may return stale data
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
 
-				# Add the contains filter
-				oCur = oCur.filter(
-					lambda obj: obj[contains[0]].contains(*contains[1])
-				)
+		Returns:
+			number
 
-			# If there's a limit
-			if limit > 0:
-				oCur = oCur.limit(limit)
+		Raises:
+			StorageException
+		"""
 
-			# If a raw request was done with specific fields
-			if isinstance(raw, (tuple,list)):
-				oCur = oCur.pluck(*raw).default(None)
+		# Total the field
+		return cls._aggregate(
+			lambda o, b: o.sum(field),
+			_id, index, filter, contains, read_mode, db
+		)
 
-			# If an order by list was sent
-			if isinstance(orderby, (tuple,list)):
-				oCur = oCur.order_by(*orderby)
-			# Else if an order field was sent
-			elif isinstance(orderby, basestring):
-				oCur = oCur.order_by(orderby)
+	# table static method
+	@staticmethod
+	def _table(info, read_mode=None):
+		"""Table
 
-			try:
-				# Run the request
-				itRes = oCur.run(oCon)
+		Returns the term for the Document's table, read using the given read
+		mode or the one set in the Document's config
 
-			except r.errors.ReqlOpFailedError as e:
+		Args:
+			info (dict): The Document's info
+			read_mode (str): 'single', 'majority', or 'outdated', see get()
 
-				# The index doesn't exist
-				if e.args[0][:5] == 'Index':
-					raise StorageException('no index', index, 'table')
+		Returns:
+			rethinkdb.ast.Table
 
-				# Else, re-raise
-				raise e
+		Raises:
+			ValueError
+		"""
 
-			# If we are expecting a single record
-			if limit == 1:
+		# If no read mode was passed, use the Document's
+		if not read_mode:
+			read_mode = info['conf'].get('read_mode', 'single')
 
-				# Try to get one row
-				try:
-					dRow = itRes.next()
-				except r.net.DefaultCursorEmpty as e:
-					return None
+		# If the read mode is invalid
+		if read_mode not in ('single', 'majority', 'outdated'):
+			raise ValueError('read_mode', read_mode)
 
-				# If it's raw, don't instantiate it
-				return (raw and dRow or cls(dRow, db))
+		# Create the term, leaving out the default mode
+		oDB = r.db(info['db'])
+		if read_mode == 'single':
+			return oDB.table(info['tree']._name)
+		return oDB.table(info['tree']._name, read_mode=read_mode)
 
-			# If there's no data
-			if not itRes:
-				if bMultiple:
-					if limit == 1: return None
-					else: return []
-				else: return None
+	# table indexes static method
+	@staticmethod
+	def _tableIndexes(info):
+		"""Table Indexes
 
-			# If multiple records are expected
-			if bMultiple:
+		Returns the indexes to create on the Document's table, those declared
+		in the config plus one for the TTL field if it doesn't already have one
 
-				# If Raw requested, return as is
-				if raw:
-					return [d for d in itRes]
+		Args:
+			info (dict): The Document's info
 
-				# Else create instances for each
-				else:
-					return [cls(d, db) for d in itRes]
+		Returns:
+			dict
+		"""
+		dIndexes = info['conf']['indexes']
+		sTTL = info['conf'].get('ttl')
+		if sTTL and sTTL not in dIndexes:
+			dIndexes = dict(dIndexes)
+			dIndexes[sTTL] = None
+		return dIndexes
+
+	# table options static method
+	@staticmethod
+	def _tableOptions(info):
+		"""Table Options
 
-			# Else, one record requested
-			else:
-				return raw and itRes or cls(itRes, db)
+		Returns the options passed to table_create() for the Document's table,
+		the primary key and any shards and replicas set in the config
 
-	# info method
+		Args:
+			info (dict): The Document's info
+
+		Returns:
+			dict
+		"""
+		dOpts = {'primary_key': info['conf']['primary']}
+		for s in ('shards', 'replicas', 'primary_replica_tag'):
+			if info['conf'].get(s) is not None:
+				dOpts[s] = info['conf'][s]
+		return dOpts
+
+	# tableCreate static method
 	@classmethod
-	def info(cls, db={}):
-		"""Info
+	def tableCreate(cls, db={}):
+		"""Table Create
 
-		Returns table and db info for the given Document
+		Creates the table using the data from the Tree on the given DB and
+		server, with the shards and replicas set in the config, then builds
+		all the indexes, including one for the TTL field, at the same time and
+		waits for them to be ready
 
 		Args:
-			db (dict): Optional 'postfix' and 'server' values for the Document
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
 
 		Returns:
-			dict
+			bool
+
+		Raises
+			StorageException
 		"""
 
-		# Get the config values associated with the Tree
-		dStruct = cls.struct()
+		# Get the info
+		dInfo = cls.info(db)
 
-		# Init the return value
-		dRet = {
-			"tree": dStruct['tree'],
-			"conf": dStruct['conf'],
-			"server": dStruct['conf']['server'],
-			"db": dStruct['conf']['db']
-		}
+		# Get a connection to the server
+		with connect_with(dInfo['server']) as oCon:
 
-		# If there's a server name passed
-		if 'server' in db:
-			dRet['server'] = db['server']
+			try:
 
-		# If there's a postfix passed
-		if 'postfix' in db:
-			dRet['db'] = "%s_%s" % (dRet['db'], db['postfix'])
+				# Try to create the table
+				dRes = r \
+					.db(dInfo['db']) \
+					.table_create(dInfo['tree']._name, **cls._tableOptions(dInfo)) \
+					.run(oCon)
 
-		# Get the prefix and prefix it if there is one
-		sPrefix = globalPrefix()
-		if sPrefix:
-			dRet['db'] = sPrefix + dRet['db']
+				# If the table wasn't created
+				if 'tables_created' not in dRes or not dRes['tables_created']:
+					return False
 
-		# Return the structure
-		return dRet
+				# If there are indexes
+				dIndexes = cls._tableIndexes(dInfo)
+				if dIndexes:
+
+					# Go through each one and start building it, the server
+					#	returns as soon as a build starts so they all run at
+					#	the same time
+					for sIndex,mFields in dIndexes.items():
+						cls._indexCreate(dInfo, sIndex, mFields).run(oCon)
+
+					# Wait for all of them to be ready
+					r \
+						.db(dInfo['db']) \
+						.table(dInfo['tree']._name) \
+						.index_wait() \
+						.run(oCon)
 
-	# insert method
-	def insert(self, conflict='error'):
-		"""Insert
+			# If there's already a table with that name
+			except r.errors.RqlRuntimeError as e:
+				print_error(str(e))
+				return False
 
-		Inserts the current instance's data as a new record in the table and
-		returns the ID regardless if it was given or generated
+		# Return OK
+		return True
+
+	# tableDelete static method
+	@classmethod
+	def tableDelete(cls, db={}):
+		"""Table Delete
+
+		Deletes the table from the given DB and server
+
+		Args:
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			bool
+
+		Raises
+			StorageException
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Get a connection to the server
+		with connect_with(dInfo['server']) as oCon:
+
+			try:
+
+				# Try to drop the table
+				dRes = r \
+					.db(dInfo['db']) \
+					.table_drop(dInfo['tree']._name) \
+					.run(oCon)
+
+				# If the table wasn't dropped
+				if 'tables_dropped' not in dRes or not dRes['tables_dropped']:
+					return False
+
+			# If the table didn't exist
+			except r.errors.RqlRuntimeError:
+				return False
+
+		# Return ok
+		return True
+
+	# table export static method
+	@classmethod
+	def tableExport(cls, path, workers=4, compress=None, batch=1000, db={}):
+		"""Table Export
+
+		Streams every document in the table to a file as newline delimited
+		JSON. The table is split into primary key ranges which are read at the
+		same time by a pool of workers, each using its own connection, so
+		the lines are not in any particular order
+
+		Args:
+			path (str): The path of the file to write
+			workers (uint): The number of ranges to read at the same time,
+				limited to the size of the server's pool
+			compress (bool): If true the file is gzipped, defaults to true if
+				the path ends in .gz
+			batch (uint): The max number of documents fetched and written at a
+				time
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+
+		Returns:
+			uint: The number of documents exported
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+		sPrimary = dInfo['conf']['primary']
+		oTable = r.db(dInfo['db']).table(dInfo['tree']._name)
+
+		# Don't use more workers than there are connections
+		workers = max(1, min(workers, _server(dInfo['server'])[1]['size']))
+
+		# Sample the primary keys, distinct returns them sorted, and pick
+		#	evenly spaced keys to split the table on
+		with connect_with(dInfo['server']) as oCon:
+			lKeys = oTable.sample(workers * 32)[sPrimary].distinct().run(oCon)
+		lSplits = []
+		if lKeys:
+			for i in range(1, workers):
+				mKey = lKeys[i * len(lKeys) // workers]
+				if not lSplits or lSplits[-1] != mKey:
+					lSplits.append(mKey)
+
+		# Turn the splits into ranges covering the entire table
+		lBounds = [r.minval] + lSplits + [r.maxval]
+		lRanges = [(lBounds[i], lBounds[i+1]) for i in range(len(lBounds) - 1)]
+
+		# Init the shared state
+		oLock = threading.Lock()
+		lCounts = []
+		lErrors = []
+
+		# Open the file
+		with _ndjsonOpen(path, 'wb', compress) as oFile:
+
+			# Start a worker for each range and wait for them to finish
+			lThreads = [
+				threading.Thread(
+					target=cls._exportRange,
+					args=(dInfo, t[0], t[1], batch, oFile, oLock, lCounts, lErrors)
+				) for t in lRanges
+			]
+			for oThread in lThreads:
+				oThread.start()
+			for oThread in lThreads:
+				oThread.join()
+
+		# If any of the workers failed, raise the first error
+		if lErrors:
+			raise lErrors[0]
+
+		# Return the number of documents written
+		return sum(lCounts)
+
+	# table import static method
+	@classmethod
+	def tableImport(cls, path, workers=4, compress=None, conflict='error', batch=1000, db={}):
+		"""Table Import
+
+		Reads newline delimited JSON, as written by tableExport(), and inserts
+		the documents from a pool of workers, each using its own connection.
+		The documents are validated the same way the constructor does it, and
+		any revisions are kept as they were exported. If the server rejects
+		any document, a StorageException with the first error is raised once
+		all the workers have stopped
 
 		Args:
+			path (str): The path of the file to read
+			workers (uint): The number of batches to insert at the same time,
+				limited to the size of the server's pool
+			compress (bool): If true the file is gunzipped, defaults to true if
+				the path ends in .gz
 			conflict (str): Must be one of 'error', 'replace', or 'update'
+			batch (uint): The max number of documents inserted at a time
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
 
 		Returns:
-			mixed: None if no record was created, replaced, or updated
+			uint: The number of documents imported
+
+		Raises:
+			StorageException
+			ValueError
 		"""
 
 		# Clean conflict
 		if conflict not in ('error', 'replace', 'update'):
 			conflict = 'error'
 
-		# If revisions are turned on, generate a new value
-		if self.__dInfo['conf']['revisions']:
-			self._revision(True)
+		# Get the info
+		dInfo = cls.info(db)
 
-		# Get a connection to the server
-		with connect_with(self.__dInfo['server']) as oCon:
+		# Don't use more workers than there are connections
+		workers = max(1, min(workers, _server(dInfo['server'])[1]['size']))
+
+		# Init the shared state, the queue is bounded so the file is never
+		#	read much further ahead than the inserts
+		oQueue = Queue(workers * 2)
+		lCounts = []
+		lErrors = []
+
+		# Start the workers
+		lThreads = [
+			threading.Thread(
+				target=cls._importBatches,
+				args=(oQueue, conflict, db, lCounts, lErrors)
+			) for i in range(workers)
+		]
+		for oThread in lThreads:
+			oThread.start()
+
+		try:
+
+			# Open the file
+			with _ndjsonOpen(path, 'rb', compress) as oFile:
+
+				# Hand out the non-empty lines a batch at a time
+				itLines = (s for s in oFile if s.strip())
+				while not lErrors:
+					lLines = list(islice(itLines, batch))
+					if not lLines:
+						break
+					oQueue.put(lLines)
+
+		finally:
+
+			# Tell the workers to stop and wait for them to finish
+			for oThread in lThreads:
+				oQueue.put(None)
+			for oThread in lThreads:
+				oThread.join()
+
+		# If any of the workers failed, raise the first error
+		if lErrors:
+			raise lErrors[0]
+
+		# Return the number of documents inserted
+		return sum(lCounts)
+
+	# table reconfigure static method
+	@classmethod
+	def tableReconfigure(cls, shards=None, replicas=None, primary_replica_tag=None, rebalance=False, db={}):
+		"""Table Reconfigure
 
-			# Create a new document
-			dRes = r \
-				.db(self.__dInfo['db']) \
-				.table(self.__dInfo['tree']._name) \
-				.insert(self._dData, conflict=conflict) \
-				.run(oCon)
+		Changes the shards and replicas of an existing table and waits for
+		all of its replicas to be ready. Anything not passed is taken from the
+		config, and if it's not there either, from the table's current setup
 
-		# If there was an error
-		if dRes['inserted'] != 1 and dRes['replaced'] != 1:
-			return None
+		Args:
+			shards (uint): The number of shards
+			replicas (uint|dict): The number of replicas, or the number of
+				replicas by server tag
+			primary_replica_tag (str): The server tag of the primary replicas,
+				required if replicas is a dict
+			rebalance (bool): If true, the shards are also rebalanced so they
+				hold about the same number of documents
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
 
-		# Store the ID if necessary
-		if self.__dInfo['conf']['auto_id']:
-			self._dData[self.__dInfo['conf']['primary']] = dRes['generated_keys'][0]
+		Returns:
+			bool
 
-		# Return the ID
-		return self._dData[self.__dInfo['conf']['primary']]
+		Raises:
+			StorageException
+		"""
 
-	# s method
-	def s(self, field, value):
-		"""S (set)
+		# Get the info
+		dInfo = cls.info(db)
+		oTable = r.db(dInfo['db']).table(dInfo['tree']._name)
+
+		# Fill in anything not passed from the config
+		if shards is None:
+			shards = dInfo['conf'].get('shards')
+		if replicas is None:
+			replicas = dInfo['conf'].get('replicas')
+		if primary_replica_tag is None:
+			primary_replica_tag = dInfo['conf'].get('primary_replica_tag')
+
+		# Get a connection to the server
+		with connect_with(dInfo['server']) as oCon:
+
+			try:
+
+				# If anything is still missing, use the table's current setup
+				if shards is None or replicas is None:
+					dConf = oTable.config().run(oCon)
+					if shards is None:
+						shards = len(dConf['shards'])
+					if replicas is None:
+						replicas = len(dConf['shards'][0]['replicas'])
+
+				# Set the options
+				dOpts = {'shards': shards, 'replicas': replicas}
+				if primary_replica_tag is not None:
+					dOpts['primary_replica_tag'] = primary_replica_tag
+
+				# Reconfigure the table
+				dRes = oTable.reconfigure(**dOpts).run(oCon)
 
-		Sets a field in the document
+				# If the table wasn't reconfigured
+				if 'reconfigured' not in dRes or not dRes['reconfigured']:
+					return False
 
-		Args:
-			field (str): The name of the field to set
-			value (mixed): The value to set the field to
+				# If we need to rebalance, wait for the new setup first
+				if rebalance:
+					oTable.wait(wait_for='all_replicas_ready').run(oCon)
+					oTable.rebalance().run(oCon)
 
-		Returns:
-			self for chaining
+				# Wait for the table to be ready
+				oTable.wait(wait_for='all_replicas_ready').run(oCon)
 
-		Raise:
-			KeyError: field doesn't exist
-			ValueError: value is not valid for the field
-		"""
+			# If the table doesn't exist or the setup isn't possible
+			except r.errors.RqlRuntimeError as e:
+				print_error(str(e))
+				return False
 
-		# Get the config values associated with the Tree
-		dStruct = self.struct()
+		# Return OK
+		return True
 
-		# If the field doesn't exist in the tree
-		if field not in dStruct['tree']:
-			raise KeyError(field)
+	# tree abstract static method
+	@classmethod
+	def struct(cls):
+		"""Structure
 
-		# If the value isn't valid
-		if not dStruct['tree'][field].valid(value):
-			raise ValueError(field)
+		Returns the FormatOC Tree associated with the table
 
-		# Store the value and update the changes
-		mClean = dStruct['tree'][field].clean(value)
-		self._dData[field] = mClean
-		if isinstance(self._dChanged, dict):
-			self._dChanged[field] = mClean
+		Returns:
+			FormatOC.Tree
 
-		# Return ok
-		return self
+		Raises:
+			StorageException
+		"""
+		raise StorageException('child did not implement tree()')
 
-	# tableCreate static method
+	# ttl start static method
 	@classmethod
-	def tableCreate(cls, db={}):
-		"""Table Create
+	def ttlStart(cls, db={}, interval=60, batch=1000, rate=0):
+		"""TTL Start
 
-		Creates the table using the data from the Tree on the given DB and
-		server
+		Starts a background thread calling ttlSweep() every interval seconds
+		so expired documents are deleted without any request waiting on it
 
 		Args:
 			db (dict): Optional DB info
 				'server' for the name of the host info passed to server()
 				'postfix' for the postfix added to the DB name
+			interval (float): The seconds to wait between sweeps
+			batch (uint): The number of documents to delete per write
+			rate (uint): The max number of documents to delete per second, 0
+				for no limit
 
 		Returns:
-			bool
+			bool: False if the sweeper was already running
 
-		Raises
+		Raises:
 			StorageException
 		"""
 
-		# Get the info
-		dInfo = cls.info(db)
+		# If there's no TTL field
+		if not cls.info(db)['conf'].get('ttl'):
+			raise StorageException('no ttl field', cls.info(db)['tree']._name)
 
-		# Get a connection to the server
-		with connect_with(dInfo['server']) as oCon:
+		# Generate the key
+		tKey = (cls, db.get('server'), db.get('postfix'))
 
-			try:
+		# If the sweeper is already running
+		if tKey in Document._dSweepers:
+			return False
 
-				# Try to create the table
-				dRes = r \
-					.db(dInfo['db']) \
-					.table_create(dInfo['tree']._name, primary_key=dInfo['conf']['primary']) \
-					.run(oCon)
+		# Create and start the sweeper
+		Document._dSweepers[tKey] = _Sweeper(cls, db, interval, batch, rate)
+		Document._dSweepers[tKey].start()
 
-				# If the table wasn't created
-				if 'tables_created' not in dRes or not dRes['tables_created']:
-					return False
+		# Return OK
+		return True
 
-				# If there are indexes
-				if dInfo['conf']['indexes']:
+	# ttl stats static method
+	@classmethod
+	def ttlStats(cls, db={}):
+		"""TTL Stats
 
-					# Go through each one and split it into name and fields
-					for sIndex,mFields in dInfo['conf']['indexes'].iteritems():
+		Returns the totals of the sweeper
 
-						# Create the cursor up to the table
-						oCur = r \
-							.db(dInfo['db']) \
-							.table(dInfo['tree']._name)
+		Args:
+			db (dict): Optional DB info
 
-						# If there's no field, the name is the field
-						if not mFields:
+		Returns:
+			dict|None: None if there's no sweeper, else 'sweeps', 'deleted',
+				'errors', 'swept' the time the last sweep finished, and 'error'
+				the last error
+		"""
 
-							# Create the index
-							oCur.index_create(sIndex).run(oCon)
+		# Find the sweeper
+		oSweeper = Document._dSweepers.get((cls, db.get('server'), db.get('postfix')))
 
-						# Else if it's a string
-						elif isinstance(mFields, basestring):
+		# Return its stats if we have one
+		return oSweeper and oSweeper.stats() or None
 
-							# Create the index
-							oCur.index_create(sIndex, r.row[mFields]).run(oCon)
+	# ttl stop static method
+	@classmethod
+	def ttlStop(cls, db={}):
+		"""TTL Stop
 
-						# Else if it's a list
-						elif isinstance(mFields, (tuple,list)):
+		Stops the sweeper, waiting for the batch it's deleting to finish
 
-							# Generate the list of fields
-							lFields = []
-							for sField in mFields:
-								lFields.append(r.row[sField])
+		Args:
+			db (dict): Optional DB info
 
-							# Create the index
-							dRes = oCur.index_create(sIndex, lFields).run(oCon)
+		Returns:
+			bool: False if there was no sweeper running
+		"""
 
-						# Else, wtf?
-						else:
-							raise StorageException("Unknown index format: %s" % str(mFields))
+		# Remove the sweeper
+		oSweeper = Document._dSweepers.pop((cls, db.get('server'), db.get('postfix')), None)
 
-			# If there's already a table with that name
-			except r.errors.RqlRuntimeError as e:
-				print_error(str(e))
-				return False
+		# If there was one, stop it
+		if oSweeper:
+			oSweeper.stop()
+			return True
 
-		# Return OK
-		return True
+		# Nothing to stop
+		return False
 
-	# tableDelete static method
+	# ttl sweep static method
 	@classmethod
-	def tableDelete(cls, db={}):
-		"""Table Delete
+	def ttlSweep(cls, batch=1000, rate=0, durability='soft', progress=None, db={}):
+		"""TTL Sweep
 
-		Deletes the table from the given DB and server
+		Deletes the documents whose TTL field, set by "ttl" in the config, is
+		before the current time. The field holds the time the document
+		expires as seconds since the epoch and is found using the index of the
+		same name, so each batch only touches the documents it deletes
 
 		Args:
+			batch (uint): The number of documents to delete per write
+			rate (uint): The max number of documents to delete per second, 0
+				for no limit
+			durability (str): 'hard' or 'soft'
+			progress (callable): Called with the running totals after each
+				batch, the sweep stops early if it returns False
 			db (dict): Optional DB info
 				'server' for the name of the host info passed to server()
 				'postfix' for the postfix added to the DB name
 
 		Returns:
-			bool
+			dict: The totals: 'deleted', 'errors', 'batches', and 'seconds'
 
-		Raises
+		Raises:
 			StorageException
 		"""
 
 		# Get the info
 		dInfo = cls.info(db)
 
+		# Init the totals
+		dTotals = {'deleted': 0, 'errors': 0, 'batches': 0, 'seconds': 0}
+		fStart = time()
+
+		# Generate the query for the next batch of documents that expired
+		#	before now
+		oQuery, sField = cls._ttlQuery(dInfo, batch, durability, fStart)
+
 		# Get a connection to the server
 		with connect_with(dInfo['server']) as oCon:
 
-			try:
+			# Loop until there's nothing left
+			while True:
 
-				# Try to drop the table
-				dRes = r \
-					.db(dInfo['db']) \
-					.table_drop(dInfo['tree']._name) \
-					.run(oCon)
+				try:
+					# Delete the batch
+					dRes = oQuery.run(oCon)
 
-				# If the table wasn't dropped
-				if 'tables_dropped' not in dRes or not dRes['tables_dropped']:
-					return False
+				except r.errors.ReqlOpFailedError as e:
 
-			# If the table didn't exist
-			except r.errors.RqlRuntimeError:
-				return False
+					# The index doesn't exist
+					if e.args[0][:5] == 'Index':
+						raise StorageException('no index', sField, 'table')
 
-		# Return ok
-		return True
+					# Else, re-raise
+					raise e
 
-	# tree abstract static method
-	@classmethod
-	def struct(cls):
-		"""Structure
+				# Add the results to the totals
+				dTotals['deleted'] += dRes['deleted']
+				dTotals['errors'] += dRes['errors']
+				dTotals['batches'] += 1
+				dTotals['seconds'] = time() - fStart
 
-		Returns the FormatOC Tree associated with the table
+				# Let the caller know how far along we are, and stop if asked
+				if progress and progress(dict(dTotals)) is False:
+					break
+
+				# If the batch wasn't full, there's nothing left
+				if dRes['deleted'] < batch:
+					break
+
+				# If there's a rate limit, wait until we're back under it
+				if rate:
+					fWait = (dTotals['deleted'] / float(rate)) - (time() - fStart)
+					if fWait > 0:
+						sleep(fWait)
+
+		# Return the totals
+		dTotals['seconds'] = time() - fStart
+		return dTotals
+
+	# ttl query static method
+	@staticmethod
+	def _ttlQuery(info, batch, durability, now):
+		"""TTL Query
+
+		Generates the query used by ttlSweep() to delete the next batch of
+		expired documents
+
+		Args:
+			info (dict): The Document's info
+			batch (uint): The number of documents to delete per write
+			durability (str): 'hard' or 'soft'
+			now (float): The time documents must have expired by
 
 		Returns:
-			FormatOC.Tree
+			tuple: The query and the TTL field
 
 		Raises:
 			StorageException
 		"""
-		raise StorageException('child did not implement tree()')
+
+		# If there's no TTL field
+		sField = info['conf'].get('ttl')
+		if not sField:
+			raise StorageException('no ttl field', info['tree']._name)
+
+		# If the field has an index that isn't just the field
+		if sField in info['conf']['indexes'] and \
+			_indexFields(sField, info['conf']['indexes'][sField]) != [sField]:
+			raise StorageException('index can not be checked', sField)
+
+		# Return the query and the field
+		return (
+			r \
+				.db(info['db']) \
+				.table(info['tree']._name) \
+				.between(r.minval, now, index=sField) \
+				.limit(batch) \
+				.delete(durability=durability),
+			sField
+		)
 
 	# update method
 	def update(self, replace=False):
@@ -1169,11 +5773,51 @@ class Document(object):
 		been changed since it was last inserted/updated/replaced
 
 		Args:
-			replace (bool):
+			replace (bool): If true the entire document is replaced instead of
+				only updating the changed fields
+
+		Returns:
+			bool: False if there was nothing to update, else True on success
+
+		Raises:
+			StorageException
+		"""
+
+		# Generate the query, if there's none there's nothing to update
+		tQuery = self._updateQuery(replace)
+		if not tQuery:
+			return False
+
+		# Get a connection to the server
+		try:
+			with connect_with(self.__dInfo['server']) as oCon:
+
+				# Update the document
+				dRes = tQuery[0].run(oCon)
+
+		# If the query failed, put back the old revision
+		except Exception:
+			self._revisionRestore(tQuery[1])
+			raise
+
+		# Process the results
+		return self._updateResult(dRes, tQuery[1])
+
+	# update query protected method
+	def _updateQuery(self, replace):
+		"""Update Query
+
+		Generates the query for update(). If revisions are turned on the
+		query only writes the data if the revision in the DB is still the one
+		the instance started with, doing the check and the write in a single
+		atomic query
+
+		Args:
+			replace (bool): If true the entire document is replaced
 
 		Returns:
-			bool|str: False if there was nothing to update, True on success, or
-				the new revision value on success of a revisionable document
+			tuple|None: None if there's nothing to update, else the query and
+				the previous revision, or None if revisions are off
 
 		Raises:
 			StorageException
@@ -1181,69 +5825,82 @@ class Document(object):
 
 		# If nothing has changed
 		if not self._dChanged:
-			return False
+			return None
 
 		# If the instance lacks a primary key
 		if self.__dInfo['conf']['primary'] not in self._dData:
 			raise StorageException('Can not update document with no primary key')
 
-		# Create a cursor to update the existing document
+		# Create a cursor to the existing document
 		oCur = r \
 			.db(self.__dInfo['db']) \
 			.table(self.__dInfo['tree']._name) \
 			.get(self._dData[self.__dInfo['conf']['primary']])
 
-		# If we are replacing
-		if replace or (isinstance(self._dChanged, bool) and self._dChanged):
-			oCur = oCur.replace(self._dData)
+		# Are we replacing
+		bReplace = replace or (isinstance(self._dChanged, bool) and self._dChanged)
 
-		# Else we are updating
-		else:
-			oCur = oCur.update(self._dChanged)
+		# If revisions are off, just write the data
+		if not self.__dInfo['conf']['revisions']:
+			if bReplace:
+				return (oCur.replace(self._dData), None)
+			else:
+				return (oCur.update(self._dChanged), None)
 
-		# If revisions are turned on, generate an updated value
-		if self.__dInfo['conf']['revisions']:
+		# Store the old revision
+		sRev = self._dData['_rev']
 
-			# Store the old revision
-			sRev = self._dData['_rev']
+		# If updating the revision results in no changes
+		if not self._revision():
+			return None
 
-			# If updating the revision results in no changes
-			if not self.revision():
-				return False
+		# Get the data to write
+		mData = bReplace and self._dData or self._dChanged
+
+		# Only write the data if the revision in the DB is still the one we
+		#	started with
+		if bReplace:
+			oCur = oCur.replace(lambda oDoc: r.branch(
+				oDoc.eq(None), None,
+				oDoc['_rev'].eq(sRev), mData,
+				r.error(_REV_CONFLICT)
+			))
+		else:
+			oCur = oCur.update(lambda oDoc: r.branch(
+				oDoc['_rev'].eq(sRev), mData,
+				r.error(_REV_CONFLICT)
+			))
 
-			# Get a connection to the server
-			with connect_with(self.__dInfo['server']) as oCon:
+		# Return the query and the old revision
+		return (oCur, sRev)
 
-				# Find the document via the ID
-				dDoc = r \
-					.db(self.__dInfo['db']) \
-					.table(self.__dInfo['tree']._name) \
-					.get(self._dData[self.__dInfo['conf']['primary']]) \
-					.pluck(['_rev']) \
-					.default(None) \
-					.run(oCon)
+	# update result protected method
+	def _updateResult(self, res, rev):
+		"""Update Result
 
-				# If the document is not found
-				if not dDoc:
-					return False
+		Processes the result of the query generated by _updateQuery()
 
-				# If it is found, but the revisions don't match up
-				if dDoc['_rev'] != sRev:
-					raise StorageException("Document can not be updated because it is out of sync with the DB")
+		Args:
+			res (dict): The result of the query
+			rev (str): The previous revision, if revisions are on
 
-				# Update the document
-				dRes = oCur.run(oCon)
+		Returns:
+			bool
 
-		else:
+		Raises:
+			StorageException
+		"""
 
-			# Get a connection to the server
-			with connect_with(self.__dInfo['server']) as oCon:
+		# If the document wasn't replaced, the DB still has the old revision,
+		#	so put it back
+		if res['replaced'] != 1:
+			self._revisionRestore(rev)
 
-				# Update the document
-				dRes = oCur.run(oCon)
+			# If the revisions didn't match up, let the caller know
+			if rev and res['errors'] and _REV_CONFLICT in res.get('first_error', ''):
+				raise StorageException(_REV_CONFLICT)
 
-		# If there was an error
-		if dRes['replaced'] != 1:
+			# Else there was an error, or nothing to change
 			return False
 
 		# Clear the changed fields
@@ -1251,3 +5908,230 @@ class Document(object):
 
 		# Return OK
 		return True
+
+	# where static method
+	@staticmethod
+	def _where(cursor, filter=None, contains=None):
+		"""Where
+
+		Adds the filter and contains arguments of get() to a cursor
+
+		Args:
+			cursor (rethinkdb.ast.RqlQuery): The cursor to filter
+			filter (dict): If set, used as an additional filter
+			contains (tuple): If set, the name of a list field and the value or
+				values it must contain
+
+		Returns:
+			rethinkdb.ast.RqlQuery
+		"""
+
+		# If an additional filter was passed
+		if filter:
+			cursor = cursor.filter(filter)
+
+		# If there's a contains
+		if contains:
+
+			# If we don't have a list
+			if not isinstance(contains[1], (tuple,list)):
+				contains = [contains[0], [contains[1]]]
+
+			# Add the contains filter
+			cursor = cursor.filter(
+				lambda obj: obj[contains[0]].contains(*contains[1])
+			)
+
+		# Return the cursor
+		return cursor
+
+	# write behind method
+	def writeBehind(self, timeout=None):
+		"""Write Behind
+
+		Adds the document to the class's write buffer, started with
+		writerStart(), instead of writing it right away. The document is
+		written later using insert with conflict 'update', merged with any
+		other writes to the same primary key still waiting. New documents are
+		sent in full, documents fetched from the DB only send the fields that
+		changed, so writes from other instances of the same document aren't
+		overwritten with stale values. Fields removed from the instance are
+		not removed from the DB. If the document has no primary key one is
+		generated, as the DB would have, so that it's available right away
+
+		Args:
+			timeout (float): The max seconds to wait if the buffer is full,
+				None to wait as long as it takes
+
+		Returns:
+			None
+
+		Raises:
+			StorageException
+		"""
+
+		# Find the writer
+		oWriter = Document._dWriters.get(self.__dInfo['key'])
+
+		# If there isn't one
+		if not oWriter:
+			raise StorageException('no write buffer running for "%s"' % self.__dInfo['tree']._name)
+
+		# If there's no primary key, generate one if the DB would have,
+		#	writes can only be merged by key
+		sPrimary = self.__dInfo['conf']['primary']
+		if self._dData.get(sPrimary) is None:
+			if not self.__dInfo['conf']['auto_id']:
+				raise StorageException('write buffer for "%s" needs a primary key' % self.__dInfo['tree']._name)
+			self._dData[sPrimary] = str(uuid4())
+
+		# If the document is new, or being replaced, send all of it
+		if self._bNew or self._dChanged is True:
+			dData = self._dData
+
+		# Else, send only what changed, if anything did
+		else:
+			if not self._dChanged:
+				return
+			dData = _changedData(self._dChanged, self._dData)
+			dData[sPrimary] = self._dData[sPrimary]
+
+		# Add the data to the buffer
+		oWriter.add(dData, timeout)
+
+		# Nothing is left to update, and the document will exist
+		self._dChanged = {}
+		self._bNew = False
+
+	# writer flush static method
+	@classmethod
+	def writerFlush(cls, db={}):
+		"""Writer Flush
+
+		Writes everything waiting in the write buffer and returns once it's
+		in the DB
+
+		Args:
+			db (dict): Optional DB info
+
+		Returns:
+			uint|None: None if there's no write buffer, else the number of
+				documents written
+
+		Raises:
+			rethinkdb.errors.ReqlError
+		"""
+
+		# Find the writer
+		oWriter = Document._dWriters.get((cls, db.get('server'), db.get('postfix')))
+
+		# If there's none
+		if not oWriter:
+			return None
+
+		# Flush it
+		return oWriter.flush()
+
+	# writer start static method
+	@classmethod
+	def writerStart(cls, db={}, size=500, interval=1, limit=10000, durability='soft'):
+		"""Writer Start
+
+		Starts a write buffer for the class, used by writeBehind(), which is
+		written in bulk from a background thread whenever it holds size
+		documents or interval seconds have passed. Once it holds limit
+		documents, writeBehind() blocks until there's room. Meant for high
+		frequency writes, like counters or events, where losing the last few
+		seconds of writes in a crash is acceptable
+
+		Args:
+			db (dict): Optional DB info
+				'server' for the name of the host info passed to server()
+				'postfix' for the postfix added to the DB name
+			size (uint): The number of documents written per query
+			interval (float): The max seconds a document waits in the buffer
+			limit (uint): The max number of documents in the buffer
+			durability (str): 'hard' to wait for the data to be written to
+				disk, 'soft' to only wait for it to be in memory
+
+		Returns:
+			bool: False if the write buffer was already running
+
+		Raises:
+			StorageException
+		"""
+
+		# Get the info
+		dInfo = cls.info(db)
+
+		# Revisions can't be checked on merged writes
+		if dInfo['conf']['revisions']:
+			raise StorageException('write buffer can not be used with revisions')
+
+		# Clean the durability and make sure the buffer holds a full batch
+		if durability not in ('hard', 'soft'):
+			durability = 'soft'
+		limit = max(limit, size)
+
+		# Generate the key
+		tKey = (cls, db.get('server'), db.get('postfix'))
+
+		# If the writer is already running
+		if tKey in Document._dWriters:
+			return False
+
+		# Create and start the writer
+		Document._dWriters[tKey] = _Writer(dInfo, size, interval, limit, durability)
+		Document._dWriters[tKey].start()
+
+		# Return OK
+		return True
+
+	# writer stats static method
+	@classmethod
+	def writerStats(cls, db={}):
+		"""Writer Stats
+
+		Returns the current state of the write buffer
+
+		Args:
+			db (dict): Optional DB info
+
+		Returns:
+			dict|None: None if there's no write buffer, else 'pending',
+				'added', 'merged', 'written', 'errors' the documents the DB
+				rejected, 'batches', 'waits' the times writers had to wait for
+				room, and 'error' the last error
+		"""
+
+		# Find the writer
+		oWriter = Document._dWriters.get((cls, db.get('server'), db.get('postfix')))
+
+		# Return its stats if we have one
+		return oWriter and oWriter.stats() or None
+
+	# writer stop static method
+	@classmethod
+	def writerStop(cls, db={}):
+		"""Writer Stop
+
+		Stops the write buffer, writing anything still waiting in it before
+		returning. Call writerFlush() first to get any error from the write
+
+		Args:
+			db (dict): Optional DB info
+
+		Returns:
+			bool: False if there was no write buffer running
+		"""
+
+		# Remove the writer
+		oWriter = Document._dWriters.pop((cls, db.get('server'), db.get('postfix')), None)
+
+		# If there was one, stop it
+		if oWriter:
+			oWriter.stop()
+			return True
+
+		# Nothing to stop
+		return False
@@ -0,0 +1,506 @@
+# coding=utf8
+""" Async Storage Tests
+
+Runs the AsyncDocument methods against the memory engine. AsyncStorage
+refuses to open connections to the memory engine, so each one is wrapped in a
+connection answering with futures the way the asyncio driver does
+"""
+
+# Import future
+from __future__ import print_function, absolute_import
+
+__author__		= "Chris Nasr"
+__copyright__	= "OuroborosCoding"
+__maintainer__	= "Chris Nasr"
+__email__		= "ouroboroscode@gmail.com"
+__created__		= "2026-10-16"
+
+# Import python modules
+import json
+import unittest
+
+# AsyncStorage needs Python 3.5 or higher
+try:
+	import asyncio
+	from .. import AsyncStorage
+except (ImportError, SyntaxError):
+	AsyncStorage = None
+
+# Include pip modules
+from FormatOC import Tree
+import rethinkdb as r
+
+# Include local modules
+from .. import MemoryStorage, Storage
+
+# tree function
+def _tree():
+	"""Tree
+
+	Returns the Tree used by the test documents
+
+	Returns:
+		FormatOC.Tree
+	"""
+	return Tree({
+		"__name__": "thing",
+		"__rethinkdb__": {
+			"db": "test",
+			"indexes": {
+				"created": None,
+				"email": None
+			},
+			"revisions": True,
+			"ttl": "expires"
+		},
+		"_id": {"__type__": "uuid", "__optional__": True},
+		"_rev": {"__type__": "string", "__optional__": True},
+		"name": {"__type__": "string"},
+		"email": {"__type__": "string", "__optional__": True},
+		"created": {"__type__": "int", "__optional__": True},
+		"expires": {"__type__": "float", "__optional__": True}
+	})
+
+# Thing class
+class Thing(Storage.Document):
+	"""Thing
+
+	Used to set up the table
+
+	Extends: Storage.Document
+	"""
+
+	# struct static method
+	@classmethod
+	def struct(cls):
+		oTree = _tree()
+		return {"tree": oTree, "conf": Storage.Document.generateConfig(oTree)}
+
+# future function
+def _future(f, *args, **kwargs):
+	"""Future
+
+	Calls the function and returns its result, or its exception, as a future
+
+	Args:
+		f (callable): The function to call
+		*args (list): The arguments to pass
+		**kwargs (dict): The keyword arguments to pass
+
+	Returns:
+		asyncio.Future
+	"""
+	oFuture = asyncio.get_event_loop().create_future()
+	try:
+		mRes = f(*args, **kwargs)
+		if isinstance(mRes, r.net.Cursor):
+			mRes = list(mRes)
+		oFuture.set_result(mRes)
+	except Exception as e:
+		oFuture.set_exception(e)
+	return oFuture
+
+# raise function
+def _raise(e):
+	raise e
+
+# Connection class
+class _Connection(object):
+	"""Connection
+
+	Stands in for an asyncio connection, running queries on the memory engine
+	and returning the results as futures
+
+	Extends: object
+	"""
+
+	# constructor
+	def __init__(self, server):
+		self.con = MemoryStorage.Connection(server, {})
+		self.failServer = None
+
+	# start method
+	def _start(self, term, **optargs):
+		return _future(self.con._start, term, **optargs)
+
+	# close method
+	def close(self, noreply_wait=True):
+		return _future(self.con.close)
+
+	# is open method
+	def is_open(self):
+		return self.con.is_open()
+
+	# server method
+	def server(self):
+		if self.failServer:
+			return _future(_raise, self.failServer)
+		return _future(self.con.server)
+
+# Async Storage test case
+@unittest.skipIf(AsyncStorage is None, "AsyncStorage needs Python 3.5 or higher")
+class AsyncStorageTestCase(unittest.TestCase):
+	"""Async Storage Test Case
+
+	Creates a table of ten Things before each test and runs each one in a new
+	event loop
+
+	Extends: unittest.TestCase
+	"""
+
+	# setUp method
+	def setUp(self):
+
+		# Create the async document
+		class AThing(AsyncStorage.AsyncDocument):
+			struct = Thing.struct
+		self.AThing = AThing
+
+		# Register the in memory server and create the DB and table
+		MemoryStorage.reset()
+		Storage.server("default", {"engine": "memory"}, True, {"size": 2, "timeout": 0.2})
+		Storage.db_create("test")
+		Thing.tableCreate()
+
+		# Add the records
+		self.ids = Thing.insertMany([{
+			"name": "n%d" % i,
+			"email": "e%d@test" % (i % 3),
+			"created": i
+		} for i in range(10)])
+
+		# Create the loop
+		self.loop = asyncio.new_event_loop()
+		asyncio.set_event_loop(self.loop)
+
+		# Open connections to the memory engine, failing on request
+		self.connections = []
+		self.refuse = None
+		fConnection = AsyncStorage._connection
+		def fConnect(server):
+			if self.refuse:
+				return _future(_raise, self.refuse)
+			oCon = _Connection(server)
+			self.connections.append(oCon)
+			return _future(lambda: oCon)
+		AsyncStorage._connection = fConnect
+		self.addCleanup(setattr, AsyncStorage, "_connection", fConnection)
+
+	# tearDown method
+	def tearDown(self):
+		self.loop.close()
+		asyncio.set_event_loop(None)
+		Storage._poolClear("default")
+		MemoryStorage.reset()
+
+	# await method
+	def _await(self, coroutine):
+		return self.loop.run_until_complete(coroutine)
+
+	# pool method
+	def _pool(self):
+		return AsyncStorage._pool("default")
+
+# Async Storage test
+class AsyncStorageTest(AsyncStorageTestCase):
+	"""Async Storage Test
+
+	Makes sure the core AsyncDocument methods work and that the pool gets its
+	connections back
+
+	Extends: AsyncStorageTestCase
+	"""
+
+	# test_get method
+	def test_get(self):
+
+		# By primary key
+		oThing = self._await(self.AThing.get(self.ids[0]))
+		self.assertIsInstance(oThing, self.AThing)
+		self.assertEqual(oThing["name"], "n0")
+
+		# By index
+		lNames = sorted([d["name"] for d in self._await(self.AThing.get("e1@test", index="email", raw=True))])
+		self.assertEqual(lNames, ["n1", "n4", "n7"])
+
+		# Missing, and several at once
+		self.assertIsNone(self._await(self.AThing.get("00000000-0000-4000-8000-000000000000")))
+		lThings = self._await(asyncio.gather(*[self.AThing.get(s, raw=True) for s in self.ids]))
+		self.assertEqual([d["name"] for d in lThings], ["n%d" % i for i in range(10)])
+		self.assertTrue(self._await(self.AThing.exists(self.ids[0])))
+
+	# test_insert method
+	def test_insert(self):
+
+		# Add a record
+		oThing = self.AThing({"name": "single"})
+		sID = self._await(oThing.insert())
+
+		# Make sure it got a key and can be found
+		self.assertEqual(sID, oThing["_id"])
+		self.assertEqual(Thing.get(sID, raw=True)["name"], "single")
+		self.assertEqual(Thing.count(), 11)
+
+	# test_update method
+	def test_update(self):
+
+		# Get the same record twice and update the first
+		oFirst = self._await(self.AThing.get(self.ids[0]))
+		oSecond = self._await(self.AThing.get(self.ids[0]))
+		oFirst["name"] = "first"
+		self.assertTrue(self._await(oFirst.update()))
+		self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "first")
+
+		# Make sure the second is refused and keeps its revision
+		sRev = oSecond["_rev"]
+		oSecond["name"] = "second"
+		self.assertRaises(Storage.StorageException, self._await, oSecond.update())
+		self.assertEqual(oSecond["_rev"], sRev)
+
+		# Delete the first
+		self.assertTrue(self._await(oFirst.delete()))
+		self.assertEqual(Thing.count(), 9)
+
+	# test_aggregates method
+	def test_aggregates(self):
+		self.assertEqual(self._await(self.AThing.count()), 10)
+		self.assertEqual(self._await(self.AThing.count("e1@test", index="email")), 3)
+		self.assertEqual(self._await(self.AThing.sum("created")), 45)
+		self.assertEqual(self._await(self.AThing.avg("created")), 4.5)
+		self.assertEqual(self._await(self.AThing.min("created")), 0)
+		self.assertEqual(self._await(self.AThing.max("created")), 9)
+		self.assertEqual(self._await(self.AThing.group("email")), {"e0@test": 4, "e1@test": 3, "e2@test": 3})
+
+	# test_distinct method
+	def test_distinct(self):
+
+		# Using the index, and not
+		lEmails = self._await(self.AThing.distinct("email"))
+		self.assertIsInstance(lEmails, list)
+		self.assertEqual(sorted(lEmails), ["e0@test", "e1@test", "e2@test"])
+		lNames = self._await(self.AThing.distinct("name", "e1@test", index="email"))
+		self.assertEqual(sorted(lNames), ["n1", "n4", "n7"])
+
+	# test_release method
+	def test_release(self):
+
+		# Run a query the server refuses
+		Thing.tableDelete()
+		self.assertRaises(r.errors.ReqlOpFailedError, self._await, self.AThing.get(self.ids[0]))
+
+		# Make sure the connection was returned and kept, the query failing
+		#	says nothing about the connection
+		oPool = self._pool()
+		self.assertEqual(oPool.count, 1)
+		self.assertEqual(len(oPool.idle), 1)
+
+	# test_release_connect method
+	def test_release_connect(self):
+
+		# Fill the pool, then fail to open the next connection
+		self._await(self.AThing.count())
+		self.refuse = Storage.StorageException("refused")
+		oPool = self._pool()
+		oCon = self._await(oPool.get())
+		self.assertRaises(Storage.StorageException, self._await, oPool.get())
+
+		# Make sure the slot was freed
+		self.assertEqual(oPool.count, 1)
+		self._await(oPool.put(oCon))
+
+	# test_release_check method
+	def test_release_check(self):
+
+		# Return a connection that will fail its check with an unexpected
+		#	error
+		oPool = self._pool()
+		oPool.conf = dict(oPool.conf, ping=-1)
+		self._await(self.AThing.count())
+		self.connections[0].failServer = ValueError("unexpected")
+
+		# Make sure the error comes through and the slot is freed
+		self.assertRaises(ValueError, self._await, oPool.get())
+		self.assertEqual(oPool.count, 0)
+
+	# test_timeout method
+	def test_timeout(self):
+
+		# Borrow every connection the pool allows
+		oPool = self._pool()
+		lCons = [self._await(oPool.get()) for i in range(2)]
+
+		# Make sure the next borrower gives up, then gets one once it's
+		#	returned
+		self.assertRaises(Storage.StorageException, self._await, oPool.get())
+		self._await(oPool.put(lCons[0]))
+		self.assertIs(self._await(oPool.get()), lCons[0])
+
+	# test_instrument method
+	def test_instrument(self):
+
+		# Record the queries, measuring them
+		lRecords = []
+		Storage.instrument(hook=lRecords.append, size=True)
+		self.addCleanup(Storage.instrumentStats, True)
+		self.addCleanup(Storage.instrument, False)
+
+		# Run a few queries, one of which fails
+		dThing = self._await(self.AThing.get(self.ids[0], raw=True))
+		self.assertEqual(self._await(self.AThing.count()), 10)
+		Thing.tableDelete()
+		self.assertRaises(r.errors.ReqlOpFailedError, self._await, self.AThing.count())
+
+		# Make sure they were all recorded, along with Storage's
+		self.assertEqual([(d["table"], d["op"]) for d in lRecords], [
+			("thing", "get"), ("thing", "count"), (None, "table_drop"), ("thing", "count")
+		])
+		self.assertEqual(lRecords[0]["bytes"], len(json.dumps(dThing, default=str)))
+		self.assertIsNotNone(lRecords[3]["error"])
+		self.assertEqual(Storage.instrumentStats()["thing"]["count"]["errors"], 1)
+
+	# test_server_update method
+	def test_server_update(self):
+
+		# Leave one connection idle and borrow another
+		oPool = self._pool()
+		oIdle, oBorrowed = self._await(oPool.get()), self._await(oPool.get())
+		self._await(oPool.put(oIdle))
+
+		# Update the server and make sure a new pool is used
+		Storage.server("default", {"engine": "memory"}, True, {"size": 2, "timeout": 0.2})
+		self.assertIsNot(self._pool(), oPool)
+		self.assertTrue(oPool.closed)
+
+		# Make sure the idle connection is closed on the loop, and the
+		#	borrowed one once it's returned
+		self._await(asyncio.sleep(0))
+		self.assertFalse(oIdle.is_open())
+		self._await(oPool.put(oBorrowed))
+		self.assertFalse(oBorrowed.is_open())
+		self.assertEqual(oPool.count, 0)
+
+	# test_closed_loop method
+	def test_closed_loop(self):
+
+		# Use the pool, then move to a new loop
+		self._await(self.AThing.count())
+		oPool = self._pool()
+		self.loop.close()
+		self.loop = asyncio.new_event_loop()
+		asyncio.set_event_loop(self.loop)
+
+		# Make sure the dead pool is dropped when a new one is made
+		self.assertIsNot(self._pool(), oPool)
+		self.assertNotIn(oPool, AsyncStorage.__dict__["__mdPools"].values())
+		self.assertEqual(self._await(self.AThing.count()), 10)
+
+# Async Document test case
+class AsyncDocumentTest(AsyncStorageTestCase):
+	"""Async Document Test
+
+	Makes sure every Document method that talks to the DB either has an
+	async version or refuses to run
+
+	Extends: AsyncStorageTestCase
+	"""
+
+	# test_exists_many method
+	def test_exists_many(self):
+		seFound = self._await(self.AThing.existsMany(self.ids[:4] + ["nope"], chunk=3))
+		self.assertEqual(seFound, set(self.ids[:4]))
+		seFound = self._await(self.AThing.existsMany(["e0@test", "nope"], index="email"))
+		self.assertEqual(seFound, set(["e0@test"]))
+
+	# test_insert_many method
+	def test_insert_many(self):
+
+		# Insert new records in chunks
+		lThings = [self.AThing({"name": "new%d" % i}) for i in range(5)]
+		lIDs = self._await(self.AThing.insertMany(lThings, chunk=2))
+
+		# Make sure the keys were stored on the instances
+		self.assertEqual(lIDs, [o["_id"] for o in lThings])
+		self.assertEqual(Thing.count(), 15)
+
+		# Make sure rejected records raise
+		self.assertRaises(Storage.StorageException, self._await, self.AThing.insertMany([{"_id": self.ids[0], "name": "dup"}]))
+
+	# test_paginate method
+	def test_paginate(self):
+
+		# Go through every page
+		lSeen = []
+		mAfter = None
+		while True:
+			lThings, mAfter = self._await(self.AThing.paginate(page_size=4, after=mAfter))
+			lSeen.extend([o["_id"] for o in lThings])
+			if not mAfter:
+				break
+
+		# Make sure every record was returned once
+		self.assertEqual(sorted(lSeen), sorted(self.ids))
+
+		# By index, with the token fields removed
+		lThings, mAfter = self._await(self.AThing.paginate(index="created", page_size=3, raw=["name"]))
+		self.assertEqual(lThings, [{"name": "n0"}, {"name": "n1"}, {"name": "n2"}])
+		self.assertEqual(mAfter, 2)
+
+	# test_delete_get method
+	def test_delete_get(self):
+
+		# By index, all at once
+		self.assertEqual(self._await(self.AThing.deleteGet("e1@test", index="email")), 3)
+
+		# By key, in batches
+		lProgress = []
+		dTotals = self._await(self.AThing.deleteGet(self.ids[:4], batch=3, progress=lProgress.append))
+		self.assertEqual(dTotals["deleted"], 3)
+		self.assertEqual(len(lProgress), 2)
+
+		# Everything else, in batches
+		dTotals = self._await(self.AThing.deleteGet(None, batch=2))
+		self.assertEqual(dTotals["deleted"], 4)
+		self.assertEqual(dTotals["batches"], 2)
+		self.assertEqual(Thing.count(), 0)
+
+	# test_ttl_sweep method
+	def test_ttl_sweep(self):
+
+		# Expire some of the records
+		with Storage.connect_with("default") as oCon:
+			r.db("test").table("thing").get_all(r.args(self.ids[:5])).update({"expires": 1.0}).run(oCon)
+
+		# Sweep them
+		dTotals = self._await(self.AThing.ttlSweep(batch=2))
+		self.assertEqual(dTotals["deleted"], 5)
+		self.assertEqual(dTotals["batches"], 3)
+		self.assertEqual(Thing.count(), 5)
+
+	# test_table_reconfigure method
+	def test_table_reconfigure(self):
+		self.assertTrue(self._await(self.AThing.tableReconfigure(shards=1, replicas=1)))
+
+	# test_unavailable method
+	def test_unavailable(self):
+
+		# Make sure the methods running on their own threads refuse to
+		oThing = self._await(self.AThing.get(self.ids[0]))
+		for f, l in (
+			(self.AThing.cacheStart, []),
+			(self.AThing.tableExport, ["/tmp/nothing.ndjson"]),
+			(self.AThing.tableImport, ["/tmp/nothing.ndjson"]),
+			(self.AThing.ttlStart, []),
+			(self.AThing.writerFlush, []),
+			(self.AThing.writerStart, []),
+			(oThing.writeBehind, [])
+		):
+			self.assertRaises(Storage.StorageException, f, *l)
+
+		# And that nothing was started
+		self.assertIsNone(self.AThing.cacheStats())
+		self.assertIsNone(self.AThing.ttlStats())
+		self.assertIsNone(self.AThing.writerStats())
+
+# Run the tests if called directly
+if __name__ == "__main__":
+	unittest.main()
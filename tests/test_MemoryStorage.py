@@ -0,0 +1,253 @@
+# coding=utf8
+""" Memory Storage Tests
+
+Runs the Document methods against the memory engine to make sure the ReQL
+they generate is understood by it
+"""
+
+# Import future
+from __future__ import print_function, absolute_import
+
+__author__		= "Chris Nasr"
+__copyright__	= "OuroborosCoding"
+__maintainer__	= "Chris Nasr"
+__email__		= "ouroboroscode@gmail.com"
+__created__		= "2026-10-16"
+
+# Import python modules
+import os
+import tempfile
+import unittest
+
+# Include pip modules
+from FormatOC import Tree
+import rethinkdb as r
+
+# Include local modules
+from .. import MemoryStorage, Storage
+
+# Thing class
+class Thing(Storage.Document):
+	"""Thing
+
+	A document with indexes and revisions used to test the memory engine
+
+	Extends: Storage.Document
+	"""
+
+	# struct static method
+	@classmethod
+	def struct(cls):
+		"""Struct
+
+		Returns the structure of the document
+
+		Returns:
+			dict
+		"""
+
+		# Create the tree
+		oTree = Tree({
+			"__name__": "thing",
+			"__rethinkdb__": {
+				"db": "test",
+				"indexes": {
+					"created": None,
+					"name_email": ["name", "email"],
+					"email": None
+				},
+				"revisions": True
+			},
+			"_id": {"__type__": "uuid", "__optional__": True},
+			"_rev": {"__type__": "string", "__optional__": True},
+			"name": {"__type__": "string"},
+			"email": {"__type__": "string", "__optional__": True},
+			"created": {"__type__": "int", "__optional__": True},
+			"tags": {
+				"__array__": "unique",
+				"__type__": "string",
+				"__optional__": True
+			}
+		})
+
+		# Return it along with its config
+		return {"tree": oTree, "conf": Storage.Document.generateConfig(oTree)}
+
+# MemoryStorage test case
+class MemoryStorageTest(unittest.TestCase):
+	"""Memory Storage Test
+
+	Creates a table of ten Things before each test and throws everything away
+	after
+
+	Extends: unittest.TestCase
+	"""
+
+	# setUp method
+	def setUp(self):
+
+		# Register the in memory server and create the DB and table
+		MemoryStorage.reset()
+		Storage.server("default", {"engine": "memory"})
+		Storage.db_create("test")
+		self.assertTrue(Thing.tableCreate())
+
+		# Add the records
+		self.ids = Thing.insertMany([{
+			"name": "n%d" % i,
+			"email": "e%d@test" % (i % 3),
+			"created": i,
+			"tags": ["t%d" % (i % 2)]
+		} for i in range(10)])
+
+	# tearDown method
+	def tearDown(self):
+		MemoryStorage.reset()
+
+	# test_insert method
+	def test_insert(self):
+
+		# Add one more record
+		oThing = Thing({"name": "single", "email": "single@test"})
+		sID = oThing.insert()
+		self.assertEqual(sID, oThing["_id"])
+		self.assertEqual(len(self.ids), 10)
+		self.assertEqual(Thing.count(), 11)
+
+		# Make sure it got a key and a revision
+		dThing = Thing.get(sID, raw=True)
+		self.assertEqual(dThing["name"], "single")
+		self.assertTrue(dThing["_rev"].startswith("1-"))
+
+	# test_get method
+	def test_get(self):
+
+		# By primary key
+		oThing = Thing.get(self.ids[0])
+		self.assertEqual(oThing["name"], "n0")
+
+		# By several primary keys
+		lNames = sorted([d["name"] for d in Thing.get(self.ids[:3], raw=True)])
+		self.assertEqual(lNames, ["n0", "n1", "n2"])
+
+		# Keys that don't exist
+		self.assertIsNone(Thing.get("00000000-0000-4000-8000-000000000000"))
+		self.assertTrue(Thing.exists(self.ids[0]))
+		self.assertEqual(len(Thing.existsMany(self.ids[:4] + ["nope"])), 4)
+
+	# test_index method
+	def test_index(self):
+
+		# Single field index
+		lNames = sorted([d["name"] for d in Thing.get("e1@test", index="email", raw=True)])
+		self.assertEqual(lNames, ["n1", "n4", "n7"])
+
+		# Compound index
+		lThings = Thing.get(("n4", "e1@test"), index="name_email", raw=True)
+		self.assertEqual([d["name"] for d in lThings], ["n4"])
+
+		# Order and limit
+		lThings = Thing.get(orderby="-created", limit=3, raw=["created"])
+		self.assertEqual([d["created"] for d in lThings], [9, 8, 7])
+
+	# test_filter method
+	def test_filter(self):
+
+		# By field
+		lNames = sorted([d["name"] for d in Thing.filter({"email": "e0@test"}, raw=True)])
+		self.assertEqual(lNames, ["n0", "n3", "n6", "n9"])
+
+		# By array contents
+		lThings = Thing.get(contains=("tags", "t1"), raw=True)
+		self.assertEqual(len(lThings), 5)
+
+	# test_paginate method
+	def test_paginate(self):
+
+		# Go through every page
+		lSeen = []
+		mAfter = None
+		while True:
+			lThings, mAfter = Thing.paginate(page_size=4, after=mAfter)
+			lSeen.extend([d["_id"] for d in lThings])
+			if not mAfter:
+				break
+
+		# Make sure every record was returned once
+		self.assertEqual(sorted(lSeen), sorted(self.ids))
+
+	# test_update method
+	def test_update(self):
+
+		# Get the same record twice
+		oFirst = Thing.get(self.ids[0])
+		oSecond = Thing.get(self.ids[0])
+
+		# Update the first
+		oFirst["name"] = "changed"
+		self.assertTrue(oFirst.update())
+		self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "changed")
+
+		# The second is now out of date and should be refused
+		oSecond["name"] = "stale"
+		self.assertRaises(Storage.StorageException, oSecond.update)
+		self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "changed")
+
+	# test_delete method
+	def test_delete(self):
+
+		# Delete a single record
+		oThing = Thing.get(self.ids[0])
+		self.assertTrue(oThing.delete())
+		self.assertEqual(Thing.count(), 9)
+
+		# Delete by index
+		self.assertEqual(Thing.deleteGet("e1@test", index="email"), 3)
+		self.assertEqual(Thing.count(), 6)
+
+		# Delete the rest
+		self.assertEqual(Thing.deleteGet(None), 6)
+		self.assertEqual(Thing.count(), 0)
+
+	# test_aggregates method
+	def test_aggregates(self):
+		self.assertEqual(Thing.count(), 10)
+		self.assertEqual(Thing.count("e1@test", index="email"), 3)
+		self.assertEqual(Thing.sum("created"), 45)
+		self.assertEqual(Thing.avg("created"), 4.5)
+		self.assertEqual(Thing.min("created"), 0)
+		self.assertEqual(Thing.max("created"), 9)
+		self.assertEqual(sorted(Thing.distinct("email")), ["e0@test", "e1@test", "e2@test"])
+		self.assertEqual(Thing.group("email"), {"e0@test": 4, "e1@test": 3, "e2@test": 3})
+
+	# test_export_import method
+	def test_export_import(self):
+
+		# Export the table to a temporary file
+		iFile, sFile = tempfile.mkstemp(suffix=".ndjson")
+		os.close(iFile)
+		try:
+			Thing.tableExport(sFile)
+
+			# Empty the table and bring the records back
+			Thing.deleteGet(None)
+			Thing.tableImport(sFile)
+			self.assertEqual(Thing.count(), 10)
+
+		# Remove the file
+		finally:
+			os.remove(sFile)
+
+	# test_unsupported method
+	def test_unsupported(self):
+
+		# Changefeeds can't be run against the memory engine
+		oCon = Storage._connection("default")
+		self.assertRaises(Storage.StorageException, r.db("test").table("thing").changes().run, oCon)
+
+		# Neither can terms it has no handler for
+		self.assertRaises(Storage.StorageException, r.js("1 + 1").run, oCon)
+
+# Run the tests if called directly
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,1111 @@
+# coding=utf8
+""" Storage Tests
+
+Runs the Storage features against the memory engine
+"""
+
+# Import future
+from __future__ import print_function, absolute_import
+
+__author__		= "Chris Nasr"
+__copyright__	= "OuroborosCoding"
+__maintainer__	= "Chris Nasr"
+__email__		= "ouroboroscode@gmail.com"
+__created__		= "2026-10-16"
+
+# Import python modules
+import gzip
+from hashlib import md5
+import json
+import os
+import shutil
+import tempfile
+from time import sleep, time
+import unittest
+
+# Python 3 renamed Queue
+try:
+	from queue import Queue
+except ImportError:
+	from Queue import Queue
+
+# Include pip modules
+from FormatOC import Tree
+import rethinkdb as r
+
+# Include local modules
+from .. import MemoryStorage, Storage
+
+# Thing class
+class Thing(Storage.Document):
+	"""Thing
+
+	A document with indexes and revisions used to test Storage
+
+	Extends: Storage.Document
+	"""
+
+	# struct static method
+	@classmethod
+	def struct(cls):
+		"""Struct
+
+		Returns the structure of the document
+
+		Returns:
+			dict
+		"""
+
+		# Create the tree
+		oTree = Tree({
+			"__name__": "thing",
+			"__rethinkdb__": {
+				"db": "test",
+				"indexes": {
+					"created": None,
+					"email": None
+				},
+				"revisions": True
+			},
+			"_id": {"__type__": "uuid", "__optional__": True},
+			"_rev": {"__type__": "string", "__optional__": True},
+			"name": {"__type__": "string"},
+			"email": {"__type__": "string", "__optional__": True},
+			"created": {"__type__": "int", "__optional__": True}
+		})
+
+		# Return it along with its config
+		return {"tree": oTree, "conf": Storage.Document.generateConfig(oTree)}
+
+# Event class
+class Event(Storage.Document):
+	"""Event
+
+	A document without revisions used to test the write buffer and the TTL
+	sweeper
+
+	Extends: Storage.Document
+	"""
+
+	# If the DB generates primary keys
+	_auto_id = True
+
+	# struct static method
+	@classmethod
+	def struct(cls):
+		"""Struct
+
+		Returns the structure of the document
+
+		Returns:
+			dict
+		"""
+
+		# Create the tree
+		oTree = Tree({
+			"__name__": "event",
+			"__rethinkdb__": {
+				"db": "test",
+				"auto_id": cls._auto_id,
+				"ttl": "expires"
+			},
+			"_id": {"__type__": "uuid", "__optional__": True},
+			"name": {"__type__": "string"},
+			"count": {"__type__": "int", "__optional__": True},
+			"email": {"__type__": "string", "__optional__": True},
+			"expires": {"__type__": "float", "__optional__": True}
+		})
+
+		# Return it along with its config
+		return {"tree": oTree, "conf": Storage.Document.generateConfig(oTree)}
+
+# Storage test case
+class StorageTestCase(unittest.TestCase):
+	"""Storage Test Case
+
+	Registers an in memory server and creates a table of ten Things before
+	each test, and throws everything away after
+
+	Extends: unittest.TestCase
+	"""
+
+	# The pool settings used by the server
+	pool = None
+
+	# setUp method
+	def setUp(self):
+
+		# Register the in memory server and create the DB and table
+		MemoryStorage.reset()
+		Storage.server("default", {"engine": "memory"}, True, self.pool)
+		Storage.db_create("test")
+		Thing.tableCreate()
+
+		# Add the records
+		self.ids = Thing.insertMany([{
+			"name": "n%d" % i,
+			"email": "e%d@test" % (i % 3),
+			"created": i
+		} for i in range(10)])
+
+	# tearDown method
+	def tearDown(self):
+		Storage._poolClear("default")
+		MemoryStorage.reset()
+
+	# wait method
+	def _wait(self, f):
+		fEnd = time() + 2
+		while not f():
+			if time() > fEnd:
+				self.fail("timed out waiting")
+			sleep(0.01)
+
+# Pool test case
+class PoolTest(StorageTestCase):
+	"""Pool Test
+
+	Makes sure connections are reused, bounded, and only thrown away when
+	they can't be trusted
+
+	Extends: StorageTestCase
+	"""
+
+	# The pool settings used by the server
+	pool = {"size": 2, "timeout": 0.2}
+
+	# test_reuse method
+	def test_reuse(self):
+
+		# Borrow and return a connection twice
+		with Storage.connect_with("default") as oCon:
+			oFirst = oCon
+		with Storage.connect_with("default") as oCon:
+			oSecond = oCon
+
+		# Make sure only one was ever opened
+		self.assertIs(oFirst, oSecond)
+		self.assertEqual(Storage._pool("default").count, 1)
+
+	# test_query_error method
+	def test_query_error(self):
+
+		# Run a query the server refuses
+		oPool = Storage._pool("default")
+		with self.assertRaises(r.errors.ReqlOpFailedError):
+			with Storage.connect_with("default") as oCon:
+				r.db("nope").table("thing").count().run(oCon)
+
+		# Make sure the connection went back to the pool
+		self.assertEqual(len(oPool.idle), 1)
+		self.assertIs(oPool.idle[0][0], oCon)
+
+	# test_broken method
+	def test_broken(self):
+
+		# Fail the way a dropped socket does
+		oPool = Storage._pool("default")
+		with self.assertRaises(r.errors.ReqlDriverError):
+			with Storage.connect_with("default") as oCon:
+				raise r.errors.ReqlDriverError("Connection is closed.")
+
+		# Make sure the connection was thrown away
+		self.assertEqual(len(oPool.idle), 0)
+		self.assertEqual(oPool.count, 0)
+
+	# test_timeout method
+	def test_timeout(self):
+
+		# Borrow every connection the pool allows
+		oFirst = Storage.connect_with("default")
+		oSecond = Storage.connect_with("default")
+
+		# Make sure the next borrower gives up
+		self.assertRaises(Storage.StorageException, Storage.connect_with, "default")
+
+		# Return one and make sure it can be borrowed again
+		oFirst.__exit__(None, None, None)
+		oThird = Storage.connect_with("default")
+		self.assertIs(oThird.con, oFirst.con)
+		oSecond.__exit__(None, None, None)
+		oThird.__exit__(None, None, None)
+
+	# test_health_check method
+	def test_health_check(self):
+
+		# Return a connection that will fail its check with an unexpected
+		#	error
+		oPool = Storage._pool("default")
+		oPool.conf = dict(oPool.conf, ping=-1)
+		with Storage.connect_with("default") as oCon:
+			pass
+		def fServer():
+			raise ValueError("unexpected")
+		oCon.server = fServer
+
+		# Make sure the error comes through and the slot is freed
+		self.assertRaises(ValueError, oPool.get)
+		self.assertEqual(oPool.count, 0)
+		self.assertEqual(len(oPool.idle), 0)
+
+	# test_fork method
+	def test_fork(self):
+
+		# Pretend the pool was created by a parent process
+		oPool = Storage._pool("default")
+		with Storage.connect_with("default"):
+			pass
+		iPid = Storage.__dict__["__miPoolPid"]
+		setattr(Storage, "__miPoolPid", -1)
+
+		# Make sure clearing it leaves the parent's sockets alone
+		try:
+			Storage._poolClear("default")
+			self.assertFalse(oPool.closed)
+			self.assertEqual(len(oPool.idle), 1)
+			self.assertIsNot(Storage._pool("default"), oPool)
+		finally:
+			setattr(Storage, "__miPoolPid", iPid)
+
+# Revision test case
+class RevisionTest(StorageTestCase):
+	"""Revision Test
+
+	Makes sure updates only go through when the revision matches, and that
+	the instance keeps the revision the DB has
+
+	Extends: StorageTestCase
+	"""
+
+	# test_conflict method
+	def test_conflict(self):
+
+		# Get the same record twice and update the first
+		oFirst = Thing.get(self.ids[0])
+		oSecond = Thing.get(self.ids[0])
+		oFirst["name"] = "first"
+		self.assertTrue(oFirst.update())
+
+		# Make sure the second is refused and keeps its revision
+		sRev = oSecond["_rev"]
+		oSecond["name"] = "second"
+		self.assertRaises(Storage.StorageException, oSecond.update)
+		self.assertEqual(oSecond["_rev"], sRev)
+		self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "first")
+
+	# test_skipped method
+	def test_skipped(self):
+
+		# Get a record, then remove it from the DB
+		oThing = Thing.get(self.ids[0])
+		dOriginal = Thing.get(self.ids[0], raw=True)
+		Thing.deleteGet(self.ids[0])
+
+		# Make sure the update does nothing and keeps the revision
+		oThing["name"] = "changed"
+		self.assertFalse(oThing.update())
+		self.assertEqual(oThing["_rev"], dOriginal["_rev"])
+
+		# Put the record back and make sure the update now goes through
+		#	without a conflict
+		with Storage.connect_with("default") as oCon:
+			r.db("test").table("thing").insert(dOriginal).run(oCon)
+		self.assertTrue(oThing.update())
+		self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "changed")
+
+	# test_failed method
+	def test_failed(self):
+
+		# Get a record and make the next query fail
+		oThing = Thing.get(self.ids[0])
+		sRev = oThing["_rev"]
+		oThing["name"] = "changed"
+		with Storage.connect_with("default") as oCon:
+			fStart = oCon._start
+			def fFail(term, **optargs):
+				raise r.errors.ReqlDriverError("Connection is closed.")
+			oCon._start = fFail
+
+		# Make sure the revision is put back, and the retry goes through
+		try:
+			self.assertRaises(r.errors.ReqlDriverError, oThing.update)
+		finally:
+			oCon._start = fStart
+		self.assertEqual(oThing["_rev"], sRev)
+		self.assertTrue(oThing.update())
+
+	# test_hash method
+	def test_hash(self):
+
+		# Make sure the order of the fields doesn't matter
+		oFirst = Thing({"name": "a", "email": "b"})
+		oSecond = Thing({"email": "b", "name": "a"})
+		oFirst._revision(True)
+		oSecond._revision(True)
+		self.assertEqual(oFirst["_rev"], oSecond["_rev"])
+
+		# Make sure swapping values between fields does
+		oSwapped = Thing({"name": "b", "email": "a"})
+		oSwapped._revision(True)
+		self.assertNotEqual(oFirst["_rev"], oSwapped["_rev"])
+
+		# Make sure changing a field and changing it back is not a change
+		oFirst["name"] = "c"
+		oFirst["name"] = "a"
+		self.assertFalse(oFirst._revision())
+
+	# test_hasher method
+	def test_hasher(self):
+
+		# Use a hasher that counts how often it's called
+		lCalls = []
+		def fHasher(s):
+			lCalls.append(s)
+			return len(s)
+		Storage.revisionHasher(fHasher)
+
+		# Make sure it's used for the revision
+		try:
+			oThing = Thing({"name": "a"})
+			oThing._revision(True)
+			self.assertTrue(lCalls)
+			self.assertEqual(oThing["_rev"], "1-%016x" % len(lCalls[-1]))
+		finally:
+			Storage.revisionHasher(Storage._revisionHash)
+
+	# test_legacy method
+	def test_legacy(self):
+
+		# Store a record with a revision made the old way, an MD5 of the
+		#	whole document
+		oThing = Thing.get(self.ids[0])
+		dData = dict([(k, v) for k,v in oThing._dData.items() if k != "_rev"])
+		oThing._dData["_rev"] = "3-%s" % md5(json.dumps(dData).encode("utf-8")).hexdigest()
+
+		# Make sure it's not seen as changed
+		self.assertFalse(oThing._revision())
+
+		# Make sure a change moves it to the new format
+		oThing["name"] = "changed"
+		self.assertTrue(oThing._revision())
+		sVer, sHash = oThing["_rev"].split("-")
+		self.assertEqual(sVer, "4")
+		self.assertEqual(len(sHash), 16)
+
+# Loader test case
+class LoaderTest(StorageTestCase):
+	"""Loader Test
+
+	Makes sure requests are batched, remembered, and retried after a failure
+
+	Extends: StorageTestCase
+	"""
+
+	# setUp method
+	def setUp(self):
+
+		# Create the records
+		super(LoaderTest, self).setUp()
+
+		# Count the queries run, and fail them on request
+		self.queries = 0
+		self.failing = 0
+		fStart = MemoryStorage.Connection._start
+		def fCount(con, term, **optargs):
+			self.queries += 1
+			if self.failing:
+				self.failing -= 1
+				raise r.errors.ReqlDriverError("Connection is closed.")
+			return fStart(con, term, **optargs)
+		MemoryStorage.Connection._start = fCount
+		self.addCleanup(setattr, MemoryStorage.Connection, "_start", fStart)
+
+	# test_batch method
+	def test_batch(self):
+
+		# Request several records, one of them twice
+		with Storage.Loader() as oLoader:
+			lPromises = oLoader.loadMany(Thing, self.ids[:3])
+			oAgain = oLoader.load(Thing, self.ids[0])
+			self.assertEqual(self.queries, 0)
+
+			# Make sure they all come back with a single query
+			self.assertEqual([o.get()["name"] for o in lPromises], ["n0", "n1", "n2"])
+			self.assertIsInstance(oAgain.get(), Thing)
+			self.assertEqual(self.queries, 1)
+
+			# Make sure they're remembered
+			self.assertEqual(oLoader.load(Thing, self.ids[1]).get()["name"], "n1")
+			self.assertEqual(self.queries, 1)
+
+	# test_missing method
+	def test_missing(self):
+
+		# Request a record that doesn't exist along with one that does
+		with Storage.Loader(raw=True) as oLoader:
+			oMissing = oLoader.load(Thing, "00000000-0000-4000-8000-000000000000")
+			oFound = oLoader.load(Thing, self.ids[0])
+
+			# Make sure the missing one is None and the other a dict
+			self.assertIsNone(oMissing.get())
+			self.assertEqual(oFound.get()["name"], "n0")
+			self.assertIsInstance(oFound.get(), dict)
+
+	# test_failure method
+	def test_failure(self):
+
+		# Make the first fetch fail
+		self.failing = 1
+		with Storage.Loader() as oLoader:
+			oPromise = oLoader.load(Thing, self.ids[0])
+			self.assertRaises(r.errors.ReqlDriverError, oPromise.get)
+
+			# Make sure the request was kept and is tried again
+			self.assertEqual(oPromise.get()["name"], "n0")
+			self.assertEqual(self.queries, 2)
+
+	# test_clear method
+	def test_clear(self):
+
+		# Request a record then clear the loader
+		oLoader = Storage.Loader()
+		oPromise = oLoader.load(Thing, self.ids[0])
+		oLoader.clear()
+
+		# Make sure nothing is fetched
+		self.assertIsNone(oPromise.get())
+		self.assertEqual(self.queries, 0)
+
+# Cache test case
+class CacheTest(StorageTestCase):
+	"""Cache Test
+
+	Makes sure the cache loads the table, follows its changes, reloads when
+	the feed drops or the server changes, and reports its state. The memory
+	engine has no changefeeds so the feed is played from a queue
+
+	Extends: StorageTestCase
+	"""
+
+	# setUp method
+	def setUp(self):
+
+		# Create the records
+		super(CacheTest, self).setUp()
+
+		# Count the feeds started, and play them from the queue
+		self.feeds = 0
+		self.queue = Queue()
+		fStart = MemoryStorage.Connection._start
+		def fFeed(con, term, **optargs):
+			if not isinstance(term, r.ast.Changes):
+				return fStart(con, term, **optargs)
+			self.feeds += 1
+			return self._feed(fStart(con, term._args[0], **optargs))
+		MemoryStorage.Connection._start = fFeed
+		self.addCleanup(setattr, MemoryStorage.Connection, "_start", fStart)
+		self.addCleanup(Thing.cacheStop)
+
+	# feed method
+	def _feed(self, records):
+
+		# Send the initial records, then the changes from the queue until it
+		#	sends None or an error
+		for d in records:
+			yield {"new_val": d}
+		yield {"state": "ready"}
+		while True:
+			mChange = self.queue.get()
+			if mChange is None:
+				return
+			if isinstance(mChange, Exception):
+				raise mChange
+			yield mChange
+
+	# test_serve method
+	def test_serve(self):
+
+		# Start the cache and wait for it
+		self.assertTrue(Thing.cacheStart())
+		self.assertFalse(Thing.cacheStart())
+		self._wait(lambda: Thing.cacheStats()["ready"])
+
+		# Make sure reads are served from memory
+		dStats = Thing.cacheStats()
+		self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "n0")
+		self.assertEqual(len(Thing.get("e1@test", index="email", raw=True)), 3)
+		self.assertEqual(Thing.cacheStats()["hits"], dStats["hits"] + 2)
+
+		# Make sure changes are followed
+		dThing = Thing.get(self.ids[0], raw=True)
+		dChanged = dict(dThing, name="changed")
+		self.queue.put({"old_val": dThing, "new_val": dChanged})
+		self._wait(lambda: Thing.get(self.ids[0], raw=True)["name"] == "changed")
+		self.assertIsNotNone(Thing.cacheStats()["changed"])
+
+		# Stop it and make sure it's gone
+		self.queue.put(None)
+		self.assertTrue(Thing.cacheStop())
+		self.assertIsNone(Thing.cacheStats())
+
+	# test_stats method
+	def test_stats(self):
+
+		# Start the cache and wait for it
+		Thing.cacheStart(retry=0.05)
+		self._wait(lambda: Thing.cacheStats()["ready"])
+
+		# Make sure it's healthy, and being quiet doesn't change that
+		sleep(0.1)
+		dStats = Thing.cacheStats()
+		self.assertTrue(dStats["connected"])
+		self.assertTrue(dStats["healthy"])
+		self.assertGreaterEqual(dStats["synced"], 0.1)
+
+		# Drop the feed and make sure it's reported, and reads go to the DB
+		self.queue.put(r.errors.ReqlDriverError("Connection is closed."))
+		self._wait(lambda: not Thing.cacheStats()["healthy"])
+		self.assertFalse(Thing.cacheStats()["connected"])
+		self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "n0")
+
+		# Make sure it's reloaded
+		self._wait(lambda: Thing.cacheStats()["healthy"])
+		dStats = Thing.cacheStats()
+		self.assertEqual(dStats["restarts"], 1)
+		self.assertLess(dStats["synced"], 0.1)
+		self.assertEqual(self.feeds, 2)
+		self.queue.put(None)
+
+	# test_server method
+	def test_server(self):
+
+		# Start the cache and wait for it
+		Thing.cacheStart()
+		self._wait(lambda: Thing.cacheStats()["ready"])
+		oCache = Storage.Document._dCaches[(Thing, None, None)]
+
+		# Change the server's details, and make sure the cache is reloaded
+		self.queue.put(None)
+		Storage.server("default", {"engine": "memory"}, True)
+		self.assertIsNot(Storage.Document._dCaches[(Thing, None, None)], oCache)
+		self._wait(lambda: Thing.cacheStats()["ready"])
+		self.assertEqual(self.feeds, 2)
+		self.queue.put(None)
+
+# Session test case
+class SessionTest(StorageTestCase):
+	"""Session Test
+
+	Makes sure sessions pin a single connection, and that streams don't
+	depend on it
+
+	Extends: StorageTestCase
+	"""
+
+	# The pool settings used by the server
+	pool = {"size": 2, "timeout": 0.2}
+
+	# test_pin method
+	def test_pin(self):
+
+		# Open nested sessions and make sure everything uses one connection
+		oPool = Storage._pool("default")
+		with Storage.session() as oCon:
+			with Storage.session() as oInner:
+				self.assertIs(oInner, oCon)
+				with Storage.connect_with("default") as oUsed:
+					self.assertIs(oUsed, oCon)
+				self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "n0")
+
+			# Make sure the inner session didn't return it
+			self.assertEqual(len(oPool.idle), 0)
+			self.assertEqual(Thing.count(), 10)
+
+		# Make sure the outer one did
+		self.assertEqual(oPool.count, 1)
+		self.assertEqual(list(oPool.idle)[0][0], oCon)
+
+	# test_errors method
+	def test_errors(self):
+
+		# Fail a query inside the session, and make sure the connection is
+		#	kept
+		oPool = Storage._pool("default")
+		def fFail():
+			with Storage.session():
+				Thing.get("e0@test", index="missing")
+		self.assertRaises(Storage.StorageException, fFail)
+		self.assertEqual(len(oPool.idle), 1)
+		def fOpFailed():
+			with Storage.session():
+				raise r.errors.ReqlOpFailedError("Table `test.thing` does not exist.")
+		self.assertRaises(r.errors.ReqlOpFailedError, fOpFailed)
+		self.assertEqual(len(oPool.idle), 1)
+
+		# Break the connection inside the session, and make sure it's thrown
+		#	away
+		def fBreak():
+			with Storage.session():
+				raise r.errors.ReqlDriverError("Connection is closed.")
+		self.assertRaises(r.errors.ReqlDriverError, fBreak)
+		self.assertEqual(oPool.count, 0)
+
+	# test_stream method
+	def test_stream(self):
+
+		# Start a stream inside a session
+		oPool = Storage._pool("default")
+		with Storage.session() as oCon:
+			itThings = Thing.get(stream=True, raw=True, max_batch_rows=2)
+			lNames = [next(itThings)["name"]]
+
+			# Make sure it has its own connection
+			self.assertEqual(oPool.count, 2)
+
+		# Make sure the session's connection was returned, and the stream can
+		#	still be read
+		self.assertEqual(list(oPool.idle)[0][0], oCon)
+		lNames.extend(d["name"] for d in itThings)
+		self.assertEqual(sorted(lNames), sorted("n%d" % i for i in range(10)))
+		self.assertEqual(len(oPool.idle), 2)
+
+# Delete test case
+class DeleteTest(StorageTestCase):
+	"""Delete Test
+
+	Makes sure deleteGet removes the right records, in one write or in
+	batches
+
+	Extends: StorageTestCase
+	"""
+
+	# setUp method
+	def setUp(self):
+
+		# Create the records
+		super(DeleteTest, self).setUp()
+
+		# Note the durability of every delete run
+		self.deletes = []
+		fStart = MemoryStorage.Connection._start
+		def fNote(con, term, **optargs):
+			if isinstance(term, r.ast.Delete):
+				oDurability = term.optargs.get("durability")
+				self.deletes.append(oDurability and oDurability.data)
+			return fStart(con, term, **optargs)
+		MemoryStorage.Connection._start = fNote
+		self.addCleanup(setattr, MemoryStorage.Connection, "_start", fStart)
+
+	# test_single method
+	def test_single(self):
+
+		# Delete by ID, IDs, and index in one write each
+		self.assertEqual(Thing.deleteGet(self.ids[0]), 1)
+		self.assertEqual(Thing.deleteGet(self.ids[1:3]), 2)
+		self.assertEqual(Thing.deleteGet("e0@test", index="email"), 3)
+		self.assertEqual(Thing.count(), 4)
+		self.assertEqual(self.deletes, [None, None, None])
+
+	# test_all method
+	def test_all(self):
+
+		# Delete everything, three at a time
+		lProgress = []
+		dTotals = Thing.deleteGet(None, batch=3, progress=lProgress.append)
+
+		# Make sure it was done in soft batches, and the progress reported
+		self.assertEqual(dTotals["deleted"], 10)
+		self.assertEqual(dTotals["errors"], 0)
+		self.assertEqual(dTotals["batches"], 4)
+		self.assertEqual([d["deleted"] for d in lProgress], [3, 6, 9, 10])
+		self.assertEqual(self.deletes, ["soft"] * 4)
+		self.assertEqual(Thing.count(), 0)
+
+	# test_ids method
+	def test_ids(self):
+
+		# Delete a list of IDs, some of them missing, two at a time
+		lIDs = self.ids[:4] + ["00000000-0000-4000-8000-000000000000"]
+		dTotals = Thing.deleteGet(lIDs, batch=2, durability="hard")
+
+		# Make sure only those were deleted
+		self.assertEqual(dTotals["deleted"], 4)
+		self.assertEqual(dTotals["batches"], 3)
+		self.assertEqual(self.deletes, ["hard"] * 3)
+		self.assertEqual(sorted(d["_id"] for d in Thing.get(raw=["_id"])), sorted(self.ids[4:]))
+
+	# test_index method
+	def test_index(self):
+
+		# Delete an index match, three at a time
+		dTotals = Thing.deleteGet("e0@test", index="email", batch=3)
+
+		# Make sure only the matches were deleted
+		self.assertEqual(dTotals["deleted"], 4)
+		self.assertEqual(dTotals["batches"], 2)
+		self.assertEqual(Thing.count(), 6)
+		self.assertEqual(Thing.count("e0@test", index="email"), 0)
+
+		# Make sure a missing index is reported
+		self.assertRaises(Storage.StorageException, Thing.deleteGet, "x", index="missing", batch=3)
+
+	# test_rate method
+	def test_rate(self):
+
+		# Delete everything, five at a time, at fifty a second
+		dTotals = Thing.deleteGet(None, batch=5, rate=50)
+
+		# Make sure it took as long as it should have
+		self.assertEqual(dTotals["deleted"], 10)
+		self.assertGreaterEqual(dTotals["seconds"], 0.19)
+
+# Export test case
+class ExportTest(StorageTestCase):
+	"""Export Test
+
+	Makes sure tables can be written to NDJSON files and read back
+
+	Extends: StorageTestCase
+	"""
+
+	# The pool settings used by the server
+	pool = {"size": 4}
+
+	# setUp method
+	def setUp(self):
+
+		# Create the records
+		super(ExportTest, self).setUp()
+
+		# Create a directory for the files
+		self.dir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.dir)
+
+	# records method
+	def _records(self):
+		return sorted(Thing.get(raw=True), key=lambda d: d["_id"])
+
+	# test_round_trip method
+	def test_round_trip(self):
+
+		# Export the table and make sure every record is in the file
+		lRecords = self._records()
+		sPath = os.path.join(self.dir, "thing.ndjson")
+		self.assertEqual(Thing.tableExport(sPath, workers=3, batch=2), 10)
+		with open(sPath, "rb") as oFile:
+			lLines = [json.loads(s.decode("utf-8")) for s in oFile]
+		self.assertEqual(sorted(lLines, key=lambda d: d["_id"]), lRecords)
+
+		# Empty the table, import the file, and make sure nothing changed,
+		#	revisions included
+		Thing.deleteGet(None)
+		self.assertEqual(Thing.tableImport(sPath, workers=3, batch=3), 10)
+		self.assertEqual(self._records(), lRecords)
+
+	# test_compress method
+	def test_compress(self):
+
+		# Export the table gzipped, going by the extension
+		lRecords = self._records()
+		sPath = os.path.join(self.dir, "thing.ndjson.gz")
+		self.assertEqual(Thing.tableExport(sPath), 10)
+		with gzip.open(sPath, "rb") as oFile:
+			self.assertEqual(len([s for s in oFile if s.strip()]), 10)
+
+		# Import it back
+		Thing.deleteGet(None)
+		self.assertEqual(Thing.tableImport(sPath), 10)
+		self.assertEqual(self._records(), lRecords)
+
+	# test_conflict method
+	def test_conflict(self):
+
+		# Export the table and change a record
+		sPath = os.path.join(self.dir, "thing.ndjson")
+		Thing.tableExport(sPath)
+		oThing = Thing.get(self.ids[0])
+		oThing["name"] = "changed"
+		oThing.update()
+
+		# Make sure importing over it is refused, unless told to replace
+		self.assertRaises(Storage.StorageException, Thing.tableImport, sPath)
+		self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "changed")
+		self.assertEqual(Thing.tableImport(sPath, conflict="replace"), 10)
+		self.assertEqual(Thing.get(self.ids[0], raw=True)["name"], "n0")
+		self.assertEqual(Thing.count(), 10)
+
+# Instrument test case
+class InstrumentTest(StorageTestCase):
+	"""Instrument Test
+
+	Makes sure queries are recorded, measured only when asked, and added to
+	the stats
+
+	Extends: StorageTestCase
+	"""
+
+	# setUp method
+	def setUp(self):
+
+		# Create the records
+		super(InstrumentTest, self).setUp()
+
+		# Turn instrumentation off and forget the stats after each test
+		self.records = []
+		self.addCleanup(Storage.instrumentStats, True)
+		self.addCleanup(Storage.instrument, False)
+
+	# test_record method
+	def test_record(self):
+
+		# Run a few queries
+		Storage.instrument(hook=self.records.append)
+		Thing.get(self.ids[0])
+		Thing.count()
+		Thing.deleteGet(self.ids[1])
+
+		# Make sure each was recorded without measuring the rows
+		self.assertEqual([(d["table"], d["op"]) for d in self.records], [
+			("thing", "get"), ("thing", "count"), ("thing", "delete")
+		])
+		self.assertEqual([d["rows"] for d in self.records], [1, 1, 1])
+		self.assertEqual([d["bytes"] for d in self.records], [None, None, None])
+		self.assertIsNone(self.records[0]["profile"])
+		self.assertIsNone(self.records[0]["error"])
+
+		# Make sure they're in the stats
+		dStats = Storage.instrumentStats(True)
+		self.assertEqual(dStats["thing"]["get"]["count"], 1)
+		self.assertEqual(dStats["thing"]["get"]["bytes"], 0)
+		self.assertEqual(sum(dStats["thing"]["count"]["buckets"]), 1)
+		self.assertEqual(Storage.instrumentStats(), {})
+
+		# Turn it off and make sure nothing else is recorded
+		Storage.instrument(False)
+		Thing.count()
+		self.assertEqual(len(self.records), 3)
+
+	# test_size method
+	def test_size(self):
+
+		# Fetch a record, measuring it
+		Storage.instrument(hook=self.records.append, size=True)
+		dThing = Thing.get(self.ids[0], raw=True)
+
+		# Make sure the size is its JSON length
+		self.assertEqual(self.records[0]["bytes"], len(json.dumps(dThing, default=str)))
+		self.assertEqual(Storage.instrumentStats()["thing"]["get"]["bytes"], self.records[0]["bytes"])
+
+	# test_error method
+	def test_error(self):
+
+		# Run a query the server refuses
+		Thing.tableDelete()
+		Storage.instrument(hook=self.records.append)
+		self.assertRaises(r.errors.ReqlOpFailedError, Thing.count)
+
+		# Make sure the error was recorded
+		self.assertIsNotNone(self.records[0]["error"])
+		self.assertEqual(Storage.instrumentStats()["thing"]["count"]["errors"], 1)
+
+	# test_sample method
+	def test_sample(self):
+
+		# Profile every query
+		Storage.instrument(hook=self.records.append, sample=1)
+		dThing = Thing.get(self.ids[0], raw=True)
+
+		# Make sure the profile was captured without changing the result
+		self.assertEqual(dThing["name"], "n0")
+		self.assertIsNotNone(self.records[0]["profile"])
+
+# Writer test case
+class WriterTest(StorageTestCase):
+	"""Writer Test
+
+	Makes sure the write buffer merges writes field by field and keeps
+	documents it failed to write
+
+	Extends: StorageTestCase
+	"""
+
+	# setUp method
+	def setUp(self):
+
+		# Create the records, and the events table with one event
+		super(WriterTest, self).setUp()
+		Event.tableCreate()
+		self.id = Event({"name": "start", "count": 0}).insert()
+
+		# Start the buffer, only writing when flushed
+		Event.writerStart(interval=60)
+		self.addCleanup(Event.writerStop)
+
+	# pending method
+	def _pending(self):
+		return Storage.Document._dWriters[(Event, None, None)].pending
+
+	# test_merge method
+	def test_merge(self):
+
+		# Change a different field of the same event in two instances
+		oFirst = Event.get(self.id)
+		oSecond = Event.get(self.id)
+		oFirst["name"] = "first"
+		oFirst.writeBehind()
+		oSecond["count"] = 2
+		oSecond.writeBehind()
+
+		# Make sure only the changes were buffered, and both are written
+		self.assertEqual(self._pending(), {self.id: {"_id": self.id, "name": "first", "count": 2}})
+		self.assertEqual(Event.writerFlush(), 1)
+		dEvent = Event.get(self.id, raw=True)
+		self.assertEqual((dEvent["name"], dEvent["count"]), ("first", 2))
+		self.assertEqual(Event.writerStats()["merged"], 1)
+
+	# test_new method
+	def test_new(self):
+
+		# Buffer a new event without a key, and make sure it gets one
+		oEvent = Event({"name": "new", "count": 1, "email": "e@test"})
+		oEvent.writeBehind()
+		sID = oEvent["_id"]
+		self.assertIsNotNone(sID)
+		self.assertEqual(self._pending()[sID]["email"], "e@test")
+
+		# Change it again and make sure only the change is added
+		oEvent["count"] = 2
+		oEvent.writeBehind()
+		self.assertEqual(Event.writerStats()["merged"], 1)
+
+		# Make sure it's written in full
+		Event.writerFlush()
+		self.assertEqual(Event.get(sID, raw=True), {"_id": sID, "name": "new", "count": 2, "email": "e@test"})
+
+		# Make sure writing it again without changes buffers nothing
+		oEvent.writeBehind()
+		self.assertEqual(self._pending(), {})
+
+	# test_key method
+	def test_key(self):
+
+		# Make sure events whose keys aren't generated need one
+		class KeyedEvent(Event):
+			_auto_id = False
+		KeyedEvent.writerStart(interval=60)
+		self.addCleanup(KeyedEvent.writerStop)
+		self.assertRaises(Storage.StorageException, KeyedEvent({"name": "keyless"}).writeBehind)
+
+	# test_failure method
+	def test_failure(self):
+
+		# Buffer a change and fail the write
+		oEvent = Event.get(self.id)
+		oEvent["count"] = 5
+		oEvent.writeBehind()
+		fStart = MemoryStorage.Connection._start
+		def fFail(con, term, **optargs):
+			raise r.errors.ReqlDriverError("Connection is closed.")
+		MemoryStorage.Connection._start = fFail
+		try:
+			self.assertRaises(r.errors.ReqlDriverError, Event.writerFlush)
+		finally:
+			MemoryStorage.Connection._start = fStart
+
+		# Make sure a newer change wins over the restored one, and both
+		#	fields get written
+		oEvent = Event.get(self.id)
+		oEvent["name"] = "renamed"
+		oEvent.writeBehind()
+		self.assertEqual(Event.writerFlush(), 1)
+		dEvent = Event.get(self.id, raw=True)
+		self.assertEqual((dEvent["name"], dEvent["count"]), ("renamed", 5))
+
+	# test_revisions method
+	def test_revisions(self):
+
+		# Make sure documents with revisions can't be buffered
+		self.assertRaises(Storage.StorageException, Thing.writerStart)
+
+# TTL test case
+class TTLTest(StorageTestCase):
+	"""TTL Test
+
+	Makes sure expired documents are swept, on demand and in the background
+
+	Extends: StorageTestCase
+	"""
+
+	# setUp method
+	def setUp(self):
+
+		# Create the records, and five expired events, three that haven't,
+		#	and two that never will
+		super(TTLTest, self).setUp()
+		Event.tableCreate()
+		fNow = time()
+		Event.insertMany(
+			[{"name": "expired", "expires": fNow - 100 - i} for i in range(5)] +
+			[{"name": "later", "expires": fNow + 100 + i} for i in range(3)] +
+			[{"name": "never"} for i in range(2)]
+		)
+
+	# names method
+	def _names(self):
+		return sorted(d["name"] for d in Event.get(raw=["name"]))
+
+	# test_sweep method
+	def test_sweep(self):
+
+		# Sweep two at a time
+		lProgress = []
+		dTotals = Event.ttlSweep(batch=2, progress=lProgress.append)
+
+		# Make sure only the expired events were deleted
+		self.assertEqual(dTotals["deleted"], 5)
+		self.assertEqual([d["deleted"] for d in lProgress], [2, 4, 5])
+		self.assertEqual(self._names(), ["later"] * 3 + ["never"] * 2)
+
+		# Make sure there's nothing left to do
+		self.assertEqual(Event.ttlSweep()["deleted"], 0)
+
+	# test_stop method
+	def test_stop(self):
+
+		# Make sure the sweep stops when the progress callback says so
+		dTotals = Event.ttlSweep(batch=2, progress=lambda d: False)
+		self.assertEqual(dTotals["deleted"], 2)
+		self.assertEqual(Event.count(), 8)
+
+	# test_no_ttl method
+	def test_no_ttl(self):
+
+		# Make sure documents without a TTL field can't be swept
+		self.assertRaises(Storage.StorageException, Thing.ttlSweep)
+		self.assertRaises(Storage.StorageException, Thing.ttlStart)
+
+	# test_sweeper method
+	def test_sweeper(self):
+
+		# Start the sweeper and wait for it to delete the expired events
+		self.assertTrue(Event.ttlStart(interval=0.05, batch=2))
+		self.addCleanup(Event.ttlStop)
+		self.assertFalse(Event.ttlStart())
+		self._wait(lambda: Event.ttlStats()["deleted"] == 5)
+		self.assertEqual(self._names(), ["later"] * 3 + ["never"] * 2)
+
+		# Expire another and make sure it's picked up by a later sweep
+		Event({"name": "expired", "expires": time() - 1}).insert()
+		self._wait(lambda: Event.ttlStats()["deleted"] == 6)
+		dStats = Event.ttlStats()
+		self.assertGreater(dStats["sweeps"], 1)
+		self.assertIsNone(dStats["error"])
+
+		# Stop it and make sure it's gone
+		self.assertTrue(Event.ttlStop())
+		self.assertIsNone(Event.ttlStats())
+		self.assertFalse(Event.ttlStop())
+
+# Run the tests if called directly
+if __name__ == "__main__":
+	unittest.main()